@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""
+Python Athena algorithms for event preselection in alignment iterations.
+
+Most raw events never yield a track in the kfalignment output, yet every
+iteration reconstructs all of them. AlignmentEventRecorder writes the
+(run, event) numbers of events with at least one alignment track;
+EventListFilter, run first in a seqAND sequence of the next iteration,
+lets only those events (plus a sampled safety margin) reach space point
+finding and tracking.
+
+Event list format: one ``<run> <event>`` pair per line, ``#`` starts a
+comment. Used by faser_reco_alignment.py (``--recordEvents``,
+``--eventList``, ``--eventMargin``).
+
+InputEntryCounter records, for a job reading several raw files in one
+event loop, how many kfalignment entries each input produced, so the
+merged output can be tagged with the source of every entry.
+"""
+
+import json
+
+from AthenaPython import PyAthena
+from AthenaPython.PyAthena import StatusCode
+
+
+def read_event_list(path: str) -> set[tuple[int, int]]:
+    """Read an event list file into a set of (run, event)."""
+    events = set()
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                run, event = line.split()
+                events.add((int(run), int(event)))
+    return events
+
+
+def in_margin(event: int, margin: float) -> bool:
+    """Deterministically sample a fraction margin of all event numbers."""
+    # NOTE: Multiplicative hash, so the sample is spread over the file
+    # and the same events are kept in every iteration.
+    return (event * 2654435761) % 2 ** 32 < margin * 2 ** 32
+
+
+class EventListFilter(PyAthena.Alg):
+    """Pass events listed in EventList, or sampled by Margin."""
+
+    def __init__(self, name="EventListFilter", **kw):
+        kw['name'] = name
+        super().__init__(**kw)
+        self.EventList = kw.get('EventList', "")
+        self.Margin = kw.get('Margin', 0.0)
+
+    def initialize(self):
+        self.events = read_event_list(self.EventList)
+        self.seen = 0
+        self.passed = 0
+        self.msg.info(f"{len(self.events)} listed events from {self.EventList}, "
+                      f"margin {self.Margin}")
+        return StatusCode.Success
+
+    def execute(self):
+        info = self.evtStore['EventInfo']
+        event = info.eventNumber()
+        keep = ((info.runNumber(), event) in self.events
+                or in_margin(event, self.Margin))
+        self.seen += 1
+        self.passed += keep
+        self.setFilterPassed(keep)
+        return StatusCode.Success
+
+    def finalize(self):
+        self.msg.info(f"Passed {self.passed} of {self.seen} events")
+        return StatusCode.Success
+
+
+class InputEntryCounter(PyAthena.Alg):
+    """Record the kfalignment entries written up to the end of each input.
+
+    Events are read in input order, so the position of an event (Skip plus
+    events seen) and the event counts of the inputs (EventCounts) give its
+    input file. Run after the CKF algorithms, the entry count of the
+    writer's tree (TreeName in the open file matching FilePattern, shared
+    with this process through PyROOT) then includes the entries of the
+    event.
+    """
+
+    def __init__(self, name="InputEntryCounter", **kw):
+        kw['name'] = name
+        super().__init__(**kw)
+        self.EventCounts = kw.get('EventCounts', [])
+        self.Skip = kw.get('Skip', 0)
+        self.FilePattern = kw.get('FilePattern', "kfalignment.root")
+        self.TreeName = kw.get('TreeName', "tree")
+        self.Output = kw.get('Output', "")
+
+    def initialize(self):
+        self.position = self.Skip
+        self.ends = [0] * len(self.EventCounts)
+        self.tree = None
+        return StatusCode.Success
+
+    def _find_tree(self):
+        import ROOT
+        for f in ROOT.gROOT.GetListOfFiles():
+            if f.GetName().endswith(self.FilePattern):
+                tree = f.Get(self.TreeName)
+                if tree:
+                    return tree
+        return None
+
+    def execute(self):
+        if self.tree is None:
+            self.tree = self._find_tree()
+        entries = self.tree.GetEntries() if self.tree is not None else 0
+        end = 0
+        for i, count in enumerate(self.EventCounts):
+            end += count
+            if self.position < end:
+                # Later inputs end no earlier than this one
+                for j in range(i, len(self.ends)):
+                    self.ends[j] = entries
+                break
+        self.position += 1
+        return StatusCode.Success
+
+    def finalize(self):
+        if self.tree is None:
+            self.msg.warning(f"No {self.TreeName} in an open *{self.FilePattern}, "
+                             f"entries are not tagged with their input")
+            return StatusCode.Success
+        with open(self.Output, 'w') as f:
+            json.dump({"file": self.tree.GetCurrentFile().GetName(),
+                       "entry_ends": self.ends,
+                       "entries": int(self.tree.GetEntries())}, f, indent=2)
+        self.msg.info(f"Entries per input end at {self.ends}")
+        return StatusCode.Success
+
+
+class AlignmentEventRecorder(PyAthena.Alg):
+    """Record events with at least one track in TrackCollections to Output."""
+
+    def __init__(self, name="AlignmentEventRecorder", **kw):
+        kw['name'] = name
+        super().__init__(**kw)
+        self.TrackCollections = kw.get('TrackCollections', [])
+        self.Output = kw.get('Output', "")
+
+    def initialize(self):
+        self.events = []
+        return StatusCode.Success
+
+    def execute(self):
+        for key in self.TrackCollections:
+            if not self.evtStore.contains('TrackCollection', key):
+                continue
+            if len(self.evtStore[key]) > 0:
+                info = self.evtStore['EventInfo']
+                self.events.append((info.runNumber(), info.eventNumber()))
+                break
+        return StatusCode.Success
+
+    def finalize(self):
+        with open(self.Output, 'w') as f:
+            f.write(f"# Events with tracks in {', '.join(self.TrackCollections)}\n")
+            for run, event in self.events:
+                f.write(f"{run} {event}\n")
+        self.msg.info(f"Recorded {len(self.events)} events to {self.Output}")
+        return StatusCode.Success
@@ -7,8 +7,14 @@ configuration handling, including path validation, formatting, and
 type checking for alignment workflow parameters.
 """
 
+import math
 from pathlib import Path
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional
 
+from CompiledConfig import (CachePolicy, CompiledConfig, Critical, IterPaths,
+                            PlanPolicy, Quorum, RecoPaths, RecoTask,
+                            ResourcePolicy)
 from Config import Config
 from RawList import RawList
 
@@ -64,6 +70,75 @@ class AlignmentConfig(Config):
         files = self._get_str(self.raw.files)
         return RawList(files)
     
+    @property
+    def files_per_job(self) -> int:
+        """Get number of raw files reconstructed by one Athena process.
+
+        Optional in JSON (key ``raw.files_per_job``). Defaults to 1.
+        """
+        try:
+            raw_per_job = self.raw.files_per_job
+        except AttributeError:
+            return 1
+        per_job = self._get_int(raw_per_job)
+        if per_job < 1:
+            raise ValueError(f"raw.files_per_job must be positive, got {per_job}")
+        return per_job
+    
+    @property
+    def events_per_job(self) -> Optional[tuple[int, int]]:
+        """Get event-range sharding as (events per job, events per file).
+
+        Optional in JSON (keys ``raw.events_per_job`` and
+        ``raw.events_per_file``, the expected number of events in a raw
+        file). Defaults to None: one job per raw file.
+        """
+        try:
+            raw_per_job = self.raw.events_per_job
+        except AttributeError:
+            return None
+        per_job = self._get_int(raw_per_job)
+        try:
+            per_file = self._get_int(self.raw.events_per_file)
+        except AttributeError:
+            raise ValueError("raw.events_per_job needs raw.events_per_file")
+        if per_job < 1 or per_file < 1:
+            raise ValueError("raw.events_per_job and raw.events_per_file must be positive")
+        return per_job, per_file
+    
+    def tasks(self, files: tuple[str, ...],
+              event_counts: Optional[Mapping[str, int]] = None) -> dict[str, RecoTask]:
+        """Split raw files into reco tasks.
+
+        Files are either grouped by files_per_job (label of one file
+        "00101", of a group "00101-00104") or sharded into event ranges by
+        events_per_job (labels "00101_s0", "00101_s1", ...). Sharding uses
+        the counted events of a file if known (raw.index), else
+        events_per_file. The last shard of a file reads all remaining
+        events, so an underestimated events_per_file loses nothing.
+        """
+        per_job = self.files_per_job
+        sharding = self.events_per_job
+        if sharding is not None and per_job > 1:
+            raise ValueError("raw.files_per_job and raw.events_per_job "
+                             "cannot be combined")
+        tasks = {}
+        if sharding is not None:
+            events, per_file = sharding
+            event_counts = event_counts or {}
+            for file_str in files:
+                shards = max(1, math.ceil(event_counts.get(file_str, per_file) / events))
+                for i in range(shards):
+                    label = f"{file_str}_s{i}"
+                    tasks[label] = RecoTask(label, (file_str,), skip=i * events,
+                                            nevents=events if i < shards - 1 else -1)
+            return tasks
+        for start in range(0, len(files), per_job):
+            group = files[start:start + per_job]
+            label = group[0] if len(group) == 1 else f"{group[0]}-{group[-1]}"
+            tasks[label] = RecoTask(label, group)
+        return tasks
+    
     @property
     def iters(self) -> int:
         """Get iterations integer from configuration."""
@@ -108,6 +183,256 @@ class AlignmentConfig(Config):
             )
         return level
     
+    @property
+    def lite(self) -> bool:
+        """Whether reco jobs run the alignment-lite profile (no xAOD output).
+
+        Optional in JSON (key ``raw.lite``). Defaults to ``False``.
+        """
+        try:
+            raw_lite = self.raw.lite
+        except AttributeError:
+            return False
+        return self._get_bool(raw_lite)
+    
+    @property
+    def slim(self) -> bool:
+        """Whether kfalignment outputs keep only the branches millepede reads.
+
+        Optional in JSON (key ``raw.slim``). Defaults to ``False``.
+        """
+        try:
+            raw_slim = self.raw.slim
+        except AttributeError:
+            return False
+        return self._get_bool(raw_slim)
+    
+    @property
+    def profile(self) -> bool:
+        """Whether reco jobs write a per-algorithm PerfMonMT profile.
+
+        Optional in JSON (key ``raw.profile``). Defaults to ``False``.
+        """
+        try:
+            raw_profile = self.raw.profile
+        except AttributeError:
+            return False
+        return self._get_bool(raw_profile)
+    
+    @property
+    def clusters(self) -> bool:
+        """Whether SCT clusters of iteration 0 are cached for later iterations.
+
+        Optional in JSON (key ``raw.clusters``). Defaults to ``False``.
+        """
+        try:
+            raw_clusters = self.raw.clusters
+        except AttributeError:
+            return False
+        return self._get_bool(raw_clusters)
+    
+    @property
+    def event_margin(self) -> Optional[float]:
+        """Get the safety margin of event preselection lists.
+
+        Optional in JSON (key ``raw.event_lists``) with ``margin``, the
+        fraction of unlisted events still reconstructed (default 0.05).
+        Defaults to None: every iteration reconstructs all events.
+        """
+        try:
+            raw_lists = self.raw.event_lists
+        except AttributeError:
+            return None
+        keys = self._get_keys(raw_lists)
+        margin = self._get_number(raw_lists.margin) if "margin" in keys else 0.05
+        if not 0 <= margin <= 1:
+            raise ValueError(f"raw.event_lists.margin must be in [0, 1], got {margin}")
+        return float(margin)
+    
+    @property
+    def checkpoint_events(self) -> Optional[int]:
+        """Get the number of events per checkpointed chunk of a reco job.
+
+        Optional in JSON (key ``raw.checkpoint_events``). Defaults to None:
+        a reco job runs its events in one process and a retry starts over.
+        """
+        try:
+            raw_checkpoint = self.raw.checkpoint_events
+        except AttributeError:
+            return None
+        events = self._get_int(raw_checkpoint)
+        if events < 1:
+            raise ValueError(f"raw.checkpoint_events must be positive, got {events}")
+        return events
+    
+    @property
+    def raw_index(self) -> bool:
+        """Whether raw files get event offset indexes (RawIndex.py).
+
+        Optional in JSON (key ``raw.index``). Defaults to ``False``.
+        Indexes give the planner and event-range sharding exact event
+        counts and let shards read only their own byte range.
+        """
+        try:
+            raw_index = self.raw.index
+        except AttributeError:
+            return False
+        return self._get_bool(raw_index)
+    
+    def raw_paths(self) -> dict[str, Path]:
+        """Raw file path per file number, from plan.path or the EOS default."""
+        policy = self.plan_policy
+        pattern = policy.path if policy is not None else self._RAW_PATH
+        return {file_str: Path(pattern.format(year=self.year, run=self.run, file=file_str))
+                for file_str in self.files}
+    
+    def index_paths(self, data_dir: Optional[Path] = None) -> dict[str, Path]:
+        """Event offset index path per file number, below the data directory.
+
+        The data directory is resolved without being created unless given.
+        """
+        if data_dir is None:
+            data_dir = self._get_path(self.data.dir, format=self.format)
+        index_dir = data_dir / self._INDEX_DIR
+        return {file_str: index_dir / self._INDEX_FILE.format(run=self.run, file=file_str)
+                for file_str in self.files}
+    
+    @property
+    def raw_cache(self) -> Optional[CachePolicy]:
+        """Get the node-local raw file cache of the reco jobs.
+
+        Optional in JSON (key ``raw.cache``) with ``dir`` (local disk of
+        the execute node, required since it lies outside the job sandbox
+        and its request_disk), ``max_gb`` (size cap, default 50) and
+        ``checksum`` (verify cached copies by adler32, default false).
+        Defaults to None: raw files are read from EOS.
+        """
+        try:
+            raw_cache = self.raw.cache
+        except AttributeError:
+            return None
+        keys = self._get_keys(raw_cache)
+        if "dir" not in keys:
+            raise ValueError("raw.cache.dir must be set, a local disk of the execute nodes")
+        cache_dir = self._get_str(raw_cache.dir)
+        max_gb = self._get_number(raw_cache.max_gb) if "max_gb" in keys else 50.0
+        checksum = self._get_bool(raw_cache.checksum) if "checksum" in keys else False
+        if not cache_dir.startswith("/"):
+            raise ValueError(f"raw.cache.dir must be an absolute path, got {cache_dir}")
+        if max_gb <= 0:
+            raise ValueError(f"raw.cache.max_gb must be positive, got {max_gb}")
+        return CachePolicy(dir=cache_dir, max_gb=float(max_gb), checksum=checksum)
+    
+    _CONVERGE_LEVELS = ("station", "layer", "module", "side")
+    
+    @property
+    def converge_tolerances(self) -> dict[str, tuple[float, float]]:
+        """Get convergence tolerances per hierarchy level.
+
+        Optional in JSON (key ``converge.tolerance``), mapping a level
+        (station, layer, module, side) to ``[translation_mm, rotation_rad]``.
+        Defaults to ``{}``, which disables early termination.
+        """
+        try:
+            raw_tol = self.converge.tolerance
+        except AttributeError:
+            return {}
+        tolerances = {}
+        for level in self._get_keys(raw_tol):
+            if level not in self._CONVERGE_LEVELS:
+                raise ValueError(
+                    f"converge.tolerance: unknown level '{level}'. "
+                    f"Expected one of: {', '.join(self._CONVERGE_LEVELS)}")
+            node = getattr(raw_tol, level).value
+            if not isinstance(node, list) or len(node) != 2:
+                raise ValueError(
+                    f"converge.tolerance.{level} must be "
+                    f"[translation, rotation], got {node!r}")
+            trans, rot = node
+            if (isinstance(trans, bool) or isinstance(rot, bool)
+                    or not isinstance(trans, (int, float))
+                    or not isinstance(rot, (int, float))):
+                raise TypeError(
+                    f"converge.tolerance.{level} values must be numbers")
+            tolerances[level] = (float(trans), float(rot))
+        return tolerances
+    
+    @property
+    def resource_policy(self) -> Optional[ResourcePolicy]:
+        """Get the policy for deriving submit requests from user logs.
+
+        Optional in JSON (key ``resources``) with ``percentile`` (0-100,
+        default 95), ``headroom`` (fraction added on top, default 0.2),
+        ``min_samples`` (default 5) and ``history`` (list of DAG directories
+        of earlier campaigns). Defaults to None: fixed requests.
+        """
+        try:
+            raw_res = self.resources
+        except AttributeError:
+            return None
+        keys = self._get_keys(raw_res)
+        q = self._get_number(raw_res.percentile) if "percentile" in keys else 95.0
+        headroom = self._get_number(raw_res.headroom) if "headroom" in keys else 0.2
+        min_samples = self._get_int(raw_res.min_samples) if "min_samples" in keys else 5
+        if not 0 < q <= 100:
+            raise ValueError(f"resources.percentile must be in (0, 100], got {q}")
+        if headroom < 0:
+            raise ValueError(f"resources.headroom must not be negative, got {headroom}")
+        if min_samples < 1:
+            raise ValueError(f"resources.min_samples must be positive, got {min_samples}")
+        history = []
+        if "history" in keys:
+            raw_history = raw_res.history.value
+            if not isinstance(raw_history, list) or not all(
+                    isinstance(h, str) for h in raw_history):
+                raise TypeError("resources.history must be a list of paths")
+            history = [Path(h).expanduser() for h in raw_history]
+        return ResourcePolicy(percentile=q, headroom=headroom,
+                              min_samples=min_samples, history=tuple(history))
+    
+    @property
+    def plan_policy(self) -> Optional[PlanPolicy]:
+        """Get the cost model of the size-aware reco job planner.
+
+        Optional in JSON (key ``plan``) with ``target`` (seconds per job,
+        required), ``seconds_per_mb`` (required), ``startup`` (seconds per
+        Athena process, default 60), ``bytes_per_event`` (default 50000),
+        ``seconds_per_event`` (used when event counts are known),
+        ``slots`` (default 100) and ``path`` (raw file pattern with
+        {year}, {run} and {file}). Defaults to None: tasks from
+        files_per_job/events_per_job.
+        """
+        try:
+            raw_plan = self.plan
+        except AttributeError:
+            return None
+        if self.files_per_job > 1 or self.events_per_job is not None:
+            raise ValueError("plan cannot be combined with raw.files_per_job "
+                             "or raw.events_per_job")
+        keys = self._get_keys(raw_plan)
+        for key in ("target", "seconds_per_mb"):
+            if key not in keys:
+                raise ValueError(f"plan.{key} is required")
+        target = self._get_number(raw_plan.target)
+        startup = self._get_number(raw_plan.startup) if "startup" in keys else 60.0
+        per_mb = self._get_number(raw_plan.seconds_per_mb)
+        per_event = (self._get_number(raw_plan.seconds_per_event)
+                     if "seconds_per_event" in keys else None)
+        bytes_per_event = (self._get_number(raw_plan.bytes_per_event)
+                           if "bytes_per_event" in keys else 50000.0)
+        slots = self._get_int(raw_plan.slots) if "slots" in keys else 100
+        path = self._get_str(raw_plan.path) if "path" in keys else self._RAW_PATH
+        if target <= startup:
+            raise ValueError(f"plan.target must exceed plan.startup, got {target} <= {startup}")
+        if startup < 0 or per_mb <= 0 or bytes_per_event <= 0 or slots < 1:
+            raise ValueError("plan.startup must not be negative; plan.seconds_per_mb, "
+                             "plan.bytes_per_event and plan.slots must be positive")
+        if per_event is not None and per_event <= 0:
+            raise ValueError(f"plan.seconds_per_event must be positive, got {per_event}")
+        return PlanPolicy(target=target, startup=startup, seconds_per_mb=per_mb,
+                          bytes_per_event=bytes_per_event, seconds_per_event=per_event,
+                          slots=slots, path=path)
+    
     # def workflow(self) 
     
     # ============================== Source info ==============================
@@ -139,6 +464,151 @@ class AlignmentConfig(Config):
         """Get path for millepede executable."""
         return self._get_path(self.dag.milleexe, base_path=self.dag_dir)
     
+    @property
+    def dag_vars(self) -> bool:
+        """Whether submit files are shared per job type and fed by DAG VARS.
+
+        Optional in JSON (key ``dag.vars``). Defaults to ``False``, which
+        writes one submit file per (iteration, file).
+        """
+        try:
+            raw_vars = self.dag.vars
+        except AttributeError:
+            return False
+        return self._get_bool(raw_vars)
+    
+    @property
+    def dag_conditions(self) -> bool:
+        """Whether each iteration builds its conditions DB once in a DAG node.
+
+        Optional in JSON (key ``dag.conditions``). Defaults to ``False``,
+        where every reco job builds the conditions itself.
+        """
+        try:
+            raw_conditions = self.dag.conditions
+        except AttributeError:
+            return False
+        return self._get_bool(raw_conditions)
+    
+    @property
+    def dag_env_snapshot(self) -> bool:
+        """Whether job environments are restored from per-campaign snapshots.
+
+        Optional in JSON (key ``dag.env_snapshot``). Defaults to ``False``,
+        where every job runs the full environment setup.
+        """
+        try:
+            raw_snapshot = self.dag.env_snapshot
+        except AttributeError:
+            return False
+        return self._get_bool(raw_snapshot)
+    
+    @property
+    def dag_job_config(self) -> bool:
+        """Whether reco jobs of an iteration share a stored job configuration.
+
+        Optional in JSON (key ``dag.job_config``). Defaults to ``False``,
+        where every reco job runs the full Python configuration.
+        """
+        try:
+            raw_job_config = self.dag.job_config
+        except AttributeError:
+            return False
+        return self._get_bool(raw_job_config)
+    
+    @property
+    def dag_maxjobs(self) -> dict[str, int]:
+        """Get DAG throttles as category -> maximum submitted jobs.
+
+        Optional in JSON (key ``dag.maxjobs``), e.g. ``{"reco": 200}``.
+        Categories are node kinds (``reco``, ``mille``). Defaults to no
+        throttling.
+        """
+        try:
+            raw_maxjobs = self.dag.maxjobs
+        except AttributeError:
+            return {}
+        maxjobs = {}
+        for key in self._get_keys(raw_maxjobs):
+            limit = self._get_int(getattr(raw_maxjobs, key))
+            if limit < 1:
+                raise ValueError(f"dag.maxjobs.{key} must be positive, got {limit}")
+            maxjobs[key] = limit
+        return maxjobs
+    
+    def dag_priority(self, iteration: int) -> Optional[int]:
+        """Get DAG node priority of an iteration.
+
+        Optional in JSON (key ``dag.priority`` with ``base`` and ``step``),
+        priority = base + step * iteration. Defaults to no PRIORITY lines.
+        """
+        try:
+            raw_priority = self.dag.priority
+        except AttributeError:
+            return None
+        base = self._get_int(raw_priority.base)
+        step = self._get_int(raw_priority.step)
+        return base + step * iteration
+    
+    def dag_quorum(self, n_files: int) -> Optional[Quorum]:
+        """Get the reco quorum after which millepede may start.
+
+        Optional in JSON (key ``dag.quorum``) with either ``fraction`` of
+        the reco tasks (0 < fraction <= 1) or an absolute number of
+        ``files`` (reco task outputs), plus optional ``poll`` (default 300) and ``timeout``
+        (default 86400) in seconds. Defaults to None: millepede waits for
+        every reco job.
+        """
+        try:
+            raw_quorum = self.dag.quorum
+        except AttributeError:
+            return None
+        keys = self._get_keys(raw_quorum)
+        if ("fraction" in keys) == ("files" in keys):
+            raise ValueError("dag.quorum needs exactly one of 'fraction' or 'files'")
+        if "fraction" in keys:
+            fraction = self._get_number(raw_quorum.fraction)
+            if not 0 < fraction <= 1:
+                raise ValueError(
+                    f"dag.quorum.fraction must be in (0, 1], got {fraction}")
+            files = max(1, math.ceil(fraction * n_files))
+        else:
+            files = self._get_int(raw_quorum.files)
+            if not 1 <= files <= n_files:
+                raise ValueError(
+                    f"dag.quorum.files must be in [1, {n_files}], got {files}")
+        poll = self._get_int(raw_quorum.poll) if "poll" in keys else 300
+        timeout = self._get_int(raw_quorum.timeout) if "timeout" in keys else 86400
+        if poll < 1 or timeout < 1:
+            raise ValueError("dag.quorum poll and timeout must be positive")
+        return Quorum(files=files, poll=poll, timeout=timeout)
+    
+    _UNIVERSES = ("vanilla", "local", "scheduler")
+    
+    @property
+    def dag_critical(self) -> Optional[Critical]:
+        """Get critical-path scheduling of millepede nodes.
+
+        Optional in JSON (key ``dag.critical``) with ``priority`` (added to
+        the iteration priority, default 100), ``universe`` (vanilla, local
+        or scheduler, default vanilla) and ``flavour`` (``+JobFlavour``,
+        default "workday"). Defaults to None: millepede is scheduled like
+        reco jobs.
+        """
+        try:
+            raw_critical = self.dag.critical
+        except AttributeError:
+            return None
+        keys = self._get_keys(raw_critical)
+        priority = self._get_int(raw_critical.priority) if "priority" in keys else 100
+        universe = self._get_str(raw_critical.universe) if "universe" in keys else "vanilla"
+        flavour = self._get_str(raw_critical.flavour) if "flavour" in keys else "workday"
+        if universe not in self._UNIVERSES:
+            raise ValueError(
+                f"Invalid dag.critical.universe: {universe}. "
+                f"Expected one of: {', '.join(self._UNIVERSES)}")
+        return Critical(priority=priority, universe=universe, flavour=flavour)
+    
     def dag_iter_dir(self, iteration: int) -> Path:
         """Get directory for a specific iteration in the DAG."""
         iter_str = f"{iteration:02d}"
@@ -307,6 +777,30 @@ class AlignmentConfig(Config):
                               base_path=self.tpl_dir,
                               exist=True)
     
+    @property
+    def tpl_condsub(self) -> Path:
+        """Get conditions submit template path.
+
+        Optional in JSON (key ``tpl.condsub``). Defaults to ``cond.sub.tpl``.
+        """
+        path = self._optional_path(self.tpl, "condsub", self.tpl_dir, "cond.sub.tpl")
+        if not path.exists():
+            raise FileNotFoundError(f"tpl.condsub: path does not exist: {path}")
+        return path
+    
+    @property
+    def tpl_condexe(self) -> Path:
+        """Get conditions executable template path.
+
+        Optional in JSON (key ``tpl.condexe``). Defaults to
+        ``buildConditions.sh``.
+        """
+        path = self._optional_path(self.tpl, "condexe", self.tpl_dir,
+                                   "buildConditions.sh")
+        if not path.exists():
+            raise FileNotFoundError(f"tpl.condexe: path does not exist: {path}")
+        return path
+    
     # =========================== Environment info ===========================
     
     @property
@@ -328,3 +822,222 @@ class AlignmentConfig(Config):
     def env_root(self) -> Path:
         """Get ROOT setup script path from configuration."""
         return self._get_path(self.env.root, exist=True)
+    
+    # ============================== Compilation ==============================
+    
+    def compile(self, tasks: Optional[Mapping[str, RecoTask]] = None,
+                event_counts: Optional[Mapping[str, int]] = None) -> CompiledConfig:
+        """
+        Resolve and validate the whole configuration once.
+        
+        Args:
+            tasks: Optional reco tasks replacing the ones derived from the
+                raw section, e.g. a Planner result.
+            event_counts: Optional counted events per raw file (raw.index),
+                used by event-range sharding.
+        
+        Every scalar is type checked, every required path is checked for
+        existence, and all per-iteration and per-file paths are formatted
+        into lookup tables. No directory is created here; use
+        CompiledConfig.dag_dirs()/data_dirs() to create them in one pass.
+        
+        Returns:
+            Immutable CompiledConfig snapshot.
+        
+        Raises:
+            FileNotFoundError: If a required path doesn't exist
+            TypeError: If configuration values have incorrect types
+            ValueError: If configuration values are invalid
+        """
+        fmt = self.format
+        files = tuple(self.files)
+        tasks = dict(tasks) if tasks is not None else self.tasks(files, event_counts)
+        iters = self.iters
+        if iters < 1:
+            raise ValueError(f"raw.iters must be positive, got {iters}")
+        dag_dir = self._get_path(self.dag.dir, format=fmt)
+        data_dir = self._get_path(self.data.dir, format=fmt)
+        run = self.run
+        conditions = self.dag_conditions
+        clusters_dir = data_dir / self._CLUSTERS_DIR if self.clusters else None
+        clusters = {}
+        if clusters_dir is not None:
+            clusters = {label: clusters_dir / self._CLUSTERS_FILE.format(run=run, label=label)
+                        for label in tasks}
+        iterations = tuple(self._compile_iteration(it, dag_dir, data_dir,
+                                                   run, tasks)
+                           for it in range(iters))
+        return CompiledConfig(
+            year=self.year,
+            run=run,
+            files=files,
+            files_str=str(self.files),
+            tasks=MappingProxyType(tasks),
+            iters=iters,
+            stations=self.stations,
+            format=fmt,
+            verbosity=self.verbosity,
+            lite=self.lite,
+            slim=self.slim,
+            profile=self.profile,
+            event_margin=self.event_margin,
+            checkpoint_events=self.checkpoint_events,
+            converge=MappingProxyType(self.converge_tolerances),
+            resources=self.resource_policy,
+            plan=self.plan_policy,
+            raw_cache=self.raw_cache,
+            src_dir=self.src_dir,
+            dag_dir=dag_dir,
+            dag_file=self._get_path(self.dag.file, base_path=dag_dir),
+            dag_recoexe=self._get_path(self.dag.recoexe, base_path=dag_dir),
+            dag_milleexe=self._get_path(self.dag.milleexe, base_path=dag_dir),
+            dag_vars=self.dag_vars,
+            dag_maxjobs=MappingProxyType(self.dag_maxjobs),
+            dag_recosub=self._optional_path(self.dag, "recosub", dag_dir, "reco.sub"),
+            dag_millesub=self._optional_path(self.dag, "millesub", dag_dir,
+                                             "millepede.sub"),
+            dag_quorum=self.dag_quorum(len(tasks)),
+            dag_critical=self.dag_critical,
+            dag_conditions=conditions,
+            dag_condexe=self._optional_path(self.dag, "condexe", dag_dir,
+                                            "buildConditions.sh"),
+            dag_condsub=self._optional_path(self.dag, "condsub", dag_dir,
+                                            "conditions.sub"),
+            dag_env_snapshot=self.dag_env_snapshot,
+            dag_job_config=self.dag_job_config,
+            dag_calypsoenv=dag_dir / self._ENV_DIR / "calypso.env",
+            dag_pedeenv=dag_dir / self._ENV_DIR / "millepede.env",
+            dag_recolog_glob=self._log_glob(self.dag.iter.logs.recolog),
+            dag_millelog_glob=self._log_glob(self.dag.iter.logs.millelog),
+            data_dir=data_dir,
+            data_config=self._get_path(self.data.config, base_path=data_dir),
+            data_initial=iterations[0].constants_in,
+            data_clusters=clusters_dir,
+            data_index=data_dir / self._INDEX_DIR if self.raw_index else None,
+            indexes=MappingProxyType(self.index_paths(data_dir) if self.raw_index else {}),
+            clusters=MappingProxyType(clusters),
+            tpl_dir=self.tpl_dir,
+            tpl_inputforalign=self.tpl_inputforalign,
+            tpl_recosub=self.tpl_recosub,
+            tpl_recoexe=self.tpl_recoexe,
+            tpl_millesub=self.tpl_millesub,
+            tpl_milleexe=self.tpl_milleexe,
+            tpl_condsub=self.tpl_condsub if conditions else None,
+            tpl_condexe=self.tpl_condexe if conditions else None,
+            env_calypso_asetup=self.env_calypso_asetup,
+            env_calypso_setup=self.env_calypso_setup,
+            env_pede=self.env_pede,
+            env_root=self.env_root,
+            iterations=iterations,
+        )
+    
+    def _optional_path(self, node, key: str, base_path: Path,
+                       default: str) -> Path:
+        """Resolve an optional relative path key without touching the disk."""
+        try:
+            child = getattr(node, key)
+        except AttributeError:
+            return base_path / default
+        return self._get_path(child, base_path=base_path)
+    
+    def _log_glob(self, node) -> str:
+        """Turn a log name pattern into a recursive glob over all iterations."""
+        name = self._get_str(node, iter="*", file="*")
+        return f"**/{name}"
+    
+    # NOTE: Names fixed by runAlignment.sh and millepede.py, not configurable.
+    _KFALIGN_OUTPUT = "kfalignment_{run}_{file}.root"
+    _CONSTANTS_OUT = "inputforalign.txt"
+    # Written by check_quorum.py, read by runAlignment.sh
+    _QUORUM_MARKER = ".quorum"
+    # Written by check_quorum.py when it first waits, for its timeout
+    _QUORUM_WAIT = ".quorum_wait"
+    # Conditions DB node of an iteration, not configurable
+    _COND_JOB = "conditions_iter{iter}"
+    _COND_OUTPUT = "conditions.tar"
+    # Cluster cache of a reco task, shared by all iterations
+    _CLUSTERS_DIR = "clusters"
+    _CLUSTERS_FILE = "Faser-Physics-{run}-{label}-Clusters.root"
+    # Event offset index of a raw file, built once per campaign
+    _INDEX_DIR = "index"
+    _INDEX_FILE = "Faser-Physics-{run}-{file}.idx"
+    # Environment snapshots of the campaign, below the DAG directory
+    _ENV_DIR = "env"
+    # Event preselection list written by a reco task, read by the next iteration
+    _EVENTS_DIR = "events"
+    # Pickled job configurations of an iteration, one per flag set
+    _JOBCONFIG_DIR = "jobconfig"
+    # Checkpoints of interrupted reco jobs, one directory per task
+    _CHECKPOINT_DIR = "checkpoints"
+    _EVENTS_FILE = "events_{run}_{file}.txt"
+    # Where runAlignment.sh reads raw files from; default of plan.path
+    _RAW_PATH = "/eos/experiment/faser/raw/{year}/{run}/Faser-Physics-{run}-{file}.raw"
+    
+    def _compile_iteration(self, iteration: int, dag_dir: Path, data_dir: Path,
+                           run: str, labels: Iterable[str]) -> IterPaths:
+        """Resolve all paths of one iteration without touching the disk."""
+        iter_str = f"{iteration:02d}"
+        dag_iter_dir = self._get_path(self.dag.iter.dir,
+                                      base_path=dag_dir, iter=iter_str)
+        logs_dir = self._get_path(self.dag.iter.logs.dir,
+                                  base_path=dag_iter_dir, iter=iter_str)
+        data_iter_dir = self._get_path(self.data.iter.dir,
+                                       base_path=data_dir, iter=iter_str)
+        reco_dir = self._get_path(self.data.iter.reco, base_path=data_iter_dir)
+        kfalign_dir = self._get_path(self.data.iter.kfalign,
+                                     base_path=data_iter_dir)
+        cond_job = self._COND_JOB.format(iter=iter_str)
+        events_dir = data_iter_dir / self._EVENTS_DIR
+        checkpoint_dir = data_iter_dir / self._CHECKPOINT_DIR
+        reco = {}
+        for file_str in labels:
+            reco[file_str] = RecoPaths(
+                job=self._get_str(self.dag.iter.recojob,
+                                  iter=iter_str, file=file_str),
+                sub=self._get_path(self.dag.iter.recosub, base_path=dag_iter_dir,
+                                   iter=iter_str, file=file_str),
+                out=self._get_path(self.dag.iter.logs.recoout, base_path=logs_dir,
+                                   iter=iter_str, file=file_str),
+                err=self._get_path(self.dag.iter.logs.recoerr, base_path=logs_dir,
+                                   iter=iter_str, file=file_str),
+                log=self._get_path(self.dag.iter.logs.recolog, base_path=logs_dir,
+                                   iter=iter_str, file=file_str),
+                output=kfalign_dir / self._KFALIGN_OUTPUT.format(run=run,
+                                                                 file=file_str),
+                events=events_dir / self._EVENTS_FILE.format(run=run, file=file_str),
+                checkpoint=checkpoint_dir / file_str,
+            )
+        return IterPaths(
+            iteration=iteration,
+            priority=self.dag_priority(iteration),
+            dag_dir=dag_iter_dir,
+            logs_dir=logs_dir,
+            mille_job=self._get_str(self.dag.iter.millejob, iter=iter_str),
+            mille_sub=self._get_path(self.dag.iter.millesub,
+                                     base_path=dag_iter_dir, iter=iter_str),
+            mille_out=self._get_path(self.dag.iter.logs.milleout,
+                                     base_path=logs_dir, iter=iter_str),
+            mille_err=self._get_path(self.dag.iter.logs.milleerr,
+                                     base_path=logs_dir, iter=iter_str),
+            mille_log=self._get_path(self.dag.iter.logs.millelog,
+                                     base_path=logs_dir, iter=iter_str),
+            data_dir=data_iter_dir,
+            reco_dir=reco_dir,
+            kfalign_dir=kfalign_dir,
+            millepede_dir=self._get_path(self.data.iter.millepede,
+                                         base_path=data_iter_dir),
+            constants_in=self._get_path(self.data.initial, base_path=reco_dir),
+            constants_out=data_iter_dir / self._CONSTANTS_OUT,
+            quorum_marker=kfalign_dir / self._QUORUM_MARKER,
+            quorum_wait=kfalign_dir / self._QUORUM_WAIT,
+            cond_job=cond_job,
+            cond_sub=dag_iter_dir / f"{cond_job}.sub",
+            cond_out=logs_dir / f"{cond_job}.out",
+            cond_err=logs_dir / f"{cond_job}.err",
+            cond_log=logs_dir / f"{cond_job}.log",
+            conditions=data_iter_dir / self._COND_OUTPUT,
+            events_dir=events_dir,
+            jobconfig_dir=data_iter_dir / self._JOBCONFIG_DIR,
+            checkpoint_dir=checkpoint_dir,
+            reco=MappingProxyType(reco),
+        )
@@ -1,9 +1,11 @@
 import ROOT
 import os
 import argparse
-from Dataset import Dataset
+from pathlib import Path
+from Dataset import Dataset, IterDir
 
 # python3 draw_chi2_hist.py -y 2023 -r 011705 -f 450-500
+# python3 draw_chi2_hist.py -c ../config.json
 
 def draw_chi2_hist_for_dir(in_dir, out_path, iter_num, canvas):
     chain = ROOT.TChain("tree")
@@ -26,23 +28,34 @@ def draw_chi2_hist_for_dir(in_dir, out_path, iter_num, canvas):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Draw chi2/ndf hist for all iterations.")
-    parser.add_argument('-y', '--year', type=str, required=True, help='Year (e.g., 2022-2025)')
-    parser.add_argument('-r', '--run', type=str, required=True, help='Run number (e.g., 011705)')
-    parser.add_argument('-f', '--files', type=str, required=True, help='Raw file number or range (e.g., 400-500)')
+    parser.add_argument('-y', '--year', type=str, help='Year (e.g., 2022-2025)')
+    parser.add_argument('-r', '--run', type=str, help='Run number (e.g., 011705)')
+    parser.add_argument('-f', '--files', type=str, help='Raw file number or range (e.g., 400-500)')
+    parser.add_argument('-c', '--config', type=str,
+                        help='Alignment config.json; read iteration dirs from its compiled snapshot')
     args = parser.parse_args()
 
     base_dir = os.path.abspath(os.path.dirname(__file__))
-    dataset = Dataset(args.year, args.run, args.files, base_dir)
-    data_dir = dataset.data_dir
     draw_dir = os.path.join(base_dir, "Draw")
-    
+    if args.config:
+        from AlignmentConfig import AlignmentConfig
+        snap = AlignmentConfig(Path(args.config)).compile()
+        name = snap.format
+        kfalign_dirs = [IterDir(num=ip.iteration, dir=str(ip.kfalign_dir))
+                        for ip in snap if ip.kfalign_dir.is_dir()]
+    elif args.year and args.run and args.files:
+        dataset = Dataset(args.year, args.run, args.files, base_dir)
+        name = dataset.name
+        kfalign_dirs = [IterDir(num=it.num, dir=os.path.join(it.dir, "2kfalignment"))
+                        for it in dataset.iter_dirs()]
+    else:
+        parser.error("either --config or all of --year/--run/--files is required")
     
     # 遍历 iterXX/2kfalignment 目录
     out_name = "chi2_hist.pdf"
-    out_path = os.path.join(draw_dir, dataset.name, out_name)
+    out_path = os.path.join(draw_dir, name, out_name)
     c1 = ROOT.TCanvas("c1", "Chi2 Histogram", 800, 600)
     c1.SaveAs(out_path + "[")
-    for it in dataset.iter_dirs():
-        in_dir = os.path.join(it.dir, "2kfalignment")
-        draw_chi2_hist_for_dir(in_dir, out_path, it.num, c1)
+    for it in kfalign_dirs:
+        draw_chi2_hist_for_dir(it.dir, out_path, it.num, c1)
     c1.SaveAs(out_path + "]")
\ No newline at end of file
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Idempotent writer for generated DAG artifacts.
+
+Files are rendered into memory first and flushed in one go. Each file is
+compared by content hash with what is already on disk, unchanged files are
+skipped, and changed files are replaced atomically by a small thread pool.
+A manifest of (hash, size, mtime) lets a re-run decide "unchanged"
+from a single stat call instead of re-reading every file.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+import ColorfulPrint
+
+
+@dataclass
+class _Staged:
+    """A rendered file waiting to be flushed.
+
+    Content is held either in memory (content) or, for streamed files,
+    in a temporary file next to the destination (tmp).
+    """
+    path:    Path
+    digest:  str
+    size:    int
+    mode:    Optional[int]
+    content: Optional[bytes] = None
+    tmp:     Optional[Path] = None
+
+
+class ArtifactWriter:
+    """Stage, compare and atomically write generated files."""
+
+    _MANIFEST_VERSION = 1
+
+    # ---------------------------- Constructor ---------------------------- #
+
+    def __init__(self, manifest: Path, max_workers: int = 8):
+        """
+        Initialize writer.
+
+        Args:
+            manifest: JSON file recording what was written by previous runs.
+            max_workers: Number of threads used to flush changed files.
+        """
+        self._manifest_path = manifest
+        self._max_workers = max_workers
+        self._templates: dict[Path, str] = {}
+        self._staged: dict[Path, _Staged] = {}
+        self._manifest: dict[str, dict] = self._load_manifest()
+
+    def _load_manifest(self) -> dict[str, dict]:
+        """Load manifest, ignoring a missing or unreadable file."""
+        try:
+            with open(self._manifest_path, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        if data.get("version") != self._MANIFEST_VERSION:
+            return {}
+        return data.get("files", {})
+
+    # ---------------------------- Staging ---------------------------- #
+
+    def template(self, path: Path) -> str:
+        """Read a template once and return the cached content."""
+        if path not in self._templates:
+            with open(path, 'r') as f:
+                self._templates[path] = f.read()
+        return self._templates[path]
+
+    def stage(self, path: Path, content: str,
+              mode: Optional[int] = None) -> None:
+        """
+        Stage rendered content for path.
+
+        Args:
+            path: Destination file.
+            content: Full file content.
+            mode: Permission bits to apply (None keeps the default).
+        """
+        data = content.encode()
+        digest = hashlib.sha256(data).hexdigest()
+        self._discard(path)
+        self._staged[path] = _Staged(path, digest, len(data), mode,
+                                     content=data)
+
+    def stream(self, path: Path, lines: Iterable[str],
+               mode: Optional[int] = None) -> None:
+        """
+        Stage content produced line by line, without building one string.
+
+        Lines are written to a temporary file next to path while being
+        hashed; flush() then renames or discards it.
+
+        Args:
+            path: Destination file.
+            lines: Iterable of text chunks (usually a generator).
+            mode: Permission bits to apply (None keeps the default).
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for line in lines:
+                    data = line.encode()
+                    sha.update(data)
+                    size += len(data)
+                    f.write(data)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._discard(path)
+        self._staged[path] = _Staged(path, sha.hexdigest(), size, mode,
+                                     tmp=Path(tmp))
+
+    def _discard(self, path: Path) -> None:
+        """Drop a previously staged version of path."""
+        old = self._staged.pop(path, None)
+        if old is not None and old.tmp is not None:
+            old.tmp.unlink(missing_ok=True)
+
+    def stage_copy(self, source: Path, path: Path) -> None:
+        """Stage a copy of source, keeping its permission bits."""
+        mode = source.stat().st_mode & 0o7777
+        self.stage(path, self.template(source), mode=mode)
+
+    # ---------------------------- Flushing ---------------------------- #
+
+    def _unchanged(self, item: _Staged) -> bool:
+        """Check whether the file on disk already holds the staged content."""
+        try:
+            st = item.path.stat()
+        except FileNotFoundError:
+            return False
+        if item.mode is not None and (st.st_mode & 0o7777) != item.mode:
+            return False
+        if st.st_size != item.size:
+            return False
+        entry = self._manifest.get(str(item.path))
+        if (entry is not None
+                and entry["size"] == st.st_size
+                and entry["mtime_ns"] == st.st_mtime_ns):
+            # NOTE: File untouched since we wrote it, trust the recorded hash.
+            return entry["sha256"] == item.digest
+        with open(item.path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest() == item.digest
+
+    @staticmethod
+    def _write_atomic(item: _Staged) -> None:
+        """Write to a temporary file in the same directory, then rename."""
+        if item.tmp is not None:
+            tmp = str(item.tmp)
+        else:
+            item.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=item.path.parent,
+                                       prefix=f".{item.path.name}.")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(item.content)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        try:
+            os.chmod(tmp, item.mode if item.mode is not None else 0o644)
+            os.replace(tmp, item.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _record(self, item: _Staged) -> None:
+        """Record the on-disk state of a flushed or verified file."""
+        st = item.path.stat()
+        self._manifest[str(item.path)] = {
+            "sha256":   item.digest,
+            "size":     st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+        }
+
+    def _flush_one(self, item: _Staged) -> bool:
+        """Flush one staged file. Returns True if it was written."""
+        if self._unchanged(item):
+            written = False
+            if item.tmp is not None:
+                item.tmp.unlink()
+        else:
+            self._write_atomic(item)
+            written = True
+        self._record(item)
+        return written
+
+    def flush(self) -> tuple[int, int]:
+        """
+        Write all staged files that differ from disk.
+
+        Returns:
+            Tuple of (written, unchanged) file counts.
+        """
+        items = list(self._staged.values())
+        self._staged.clear()
+        with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            results = list(pool.map(self._flush_one, items))
+        self._save_manifest()
+        written = sum(results)
+        return written, len(results) - written
+
+    def _save_manifest(self) -> None:
+        """Persist the manifest atomically."""
+        content = json.dumps({"version": self._MANIFEST_VERSION,
+                              "files": self._manifest},
+                             indent=0, sort_keys=True)
+        data = content.encode()
+        self._write_atomic(_Staged(self._manifest_path, "", len(data), None,
+                                   content=data))
+
+    def report(self, written: int, unchanged: int) -> None:
+        """Print a one-line summary of a flush."""
+        if written:
+            ColorfulPrint.print_yellow("Updated: ")
+            print(f"{written} file(s) written, {unchanged} unchanged")
+        else:
+            ColorfulPrint.print_green("Up to date: ")
+            print(f"{unchanged} file(s) unchanged")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Crash-resumable reco jobs: run an event range in checkpointed chunks.
+
+The kfalignment writer only closes its file when the event loop finishes,
+so an evicted job loses everything and HTCondor retries it from event 0.
+run() processes the job's events as a sequence of reco processes of at
+most ``chunk`` events each (``--skip``/``--nevents`` appended to the
+command). After every chunk its outputs are moved into the checkpoint
+directory, which lives on the shared data disk so a retry on another node
+finds it:
+
+    <dir>/checkpoint.json     range, chunk size and offset of the next event
+    <dir>/part-000-<name>     outputs of the first chunk, ...
+
+A retry skips the chunks already done and starts at the first event not
+fully processed. When all chunks are done, the kfalignment parts are merged
+with hadd and event lists are concatenated into the working directory,
+under the names a single reco process would have written.
+
+Used by runAlignment.sh (``--checkpoint``).
+
+Usage:
+    Checkpoint.py run <DIR> --chunk N [--skip S] [--nevents N] --raw <RAW>... -- <CMD>...
+    Checkpoint.py status <DIR>
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+import RawIndex
+
+STATE = "checkpoint.json"
+# Outputs collected after each chunk: merged by hadd, or concatenated
+MERGE_GLOB = "*kfalignment.root"
+CONCAT_GLOB = "*-events.txt"
+
+
+def count_events(raws: list[Path], indexes: list[Path]) -> int:
+    """Events in all raw files, from their indexes where usable."""
+    total = 0
+    for i, raw in enumerate(raws):
+        index = RawIndex.load(indexes[i], raw) if i < len(indexes) else None
+        total += (index or RawIndex.scan(raw)).count
+    return total
+
+
+def chunks(skip: int, nevents: int, total: int, chunk: int) -> list[tuple[int, int]]:
+    """(skip, nevents) of every chunk of the range, nevents -1 for all."""
+    end = total if nevents < 0 else min(total, skip + nevents)
+    # An empty range still runs once, so the job writes its (empty) outputs
+    return ([(start, min(chunk, end - start)) for start in range(skip, end, chunk)]
+            or [(skip, nevents)])
+
+
+def read_state(path: Path) -> Optional[dict]:
+    try:
+        with open(path / STATE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_state(path: Path, state: dict) -> None:
+    """Write the checkpoint atomically, it is only valid once complete."""
+    tmp = path / f".{STATE}.{os.getpid()}.part"
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path / STATE)
+
+
+def _store(src: Path, dst: Path) -> None:
+    """Move a chunk output into the checkpoint, visible only once complete."""
+    tmp = dst.with_name(f".{dst.name}.part")
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+    src.unlink()
+
+
+def merge(path: Path, state: dict, work_dir: Path) -> None:
+    """Merge the parts of all chunks into work_dir under their own names."""
+    parts: dict[str, list[Path]] = {}
+    for i in range(len(state["done"])):
+        for part in sorted(path.glob(f"part-{i:03d}-*")):
+            parts.setdefault(part.name[len(f"part-{i:03d}-"):], []).append(part)
+    for name, files in parts.items():
+        out = work_dir / name
+        if len(files) == 1:
+            shutil.copyfile(files[0], out)
+        elif Path(name).match(MERGE_GLOB):
+            # -ff keeps the compression of the parts (LZ4 when slimmed)
+            subprocess.run(["hadd", "-ff", str(out), *map(str, files)],
+                           check=True, stdout=subprocess.DEVNULL)
+        else:
+            with open(out, 'wb') as dst:
+                for part in files:
+                    with open(part, 'rb') as src:
+                        shutil.copyfileobj(src, dst)
+
+
+def run(path: Path, command: list[str], raws: list[Path], indexes: list[Path],
+        skip: int, nevents: int, chunk: int, work_dir: Path) -> int:
+    """
+    Run command over the event range in checkpointed chunks and merge.
+
+    Returns:
+        Exit status of the first failed chunk or merge, 0 on success.
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    key = {"raws": [raw.name for raw in raws], "skip": skip,
+           "nevents": nevents, "chunk": chunk}
+    state = read_state(path)
+    if state is None or state.get("key") != key:
+        # No checkpoint or one of another range: start over
+        for old in path.glob("part-*"):
+            old.unlink()
+        state = {"key": key, "chunks": chunks(skip, nevents, count_events(raws, indexes), chunk),
+                 "done": []}
+        write_state(path, state)
+    else:
+        print(f"=== Resuming from checkpoint: {len(state['done'])} of "
+              f"{len(state['chunks'])} chunk(s) done ===")
+
+    for i, (start, n) in enumerate(state["chunks"]):
+        if i < len(state["done"]):
+            continue
+        for stale in [*work_dir.glob(MERGE_GLOB), *work_dir.glob(CONCAT_GLOB)]:
+            stale.unlink()
+        print(f"=== Chunk {i + 1}/{len(state['chunks'])}: events {start} to {start + n - 1} ===",
+              flush=True)
+        status = subprocess.run([*command, "--skip", str(start), "--nevents", str(n)],
+                                cwd=work_dir).returncode
+        if status != 0:
+            return status
+        for output in [*work_dir.glob(MERGE_GLOB), *work_dir.glob(CONCAT_GLOB)]:
+            _store(output, path / f"part-{i:03d}-{output.name}")
+        # NOTE: The checkpoint is written after the parts, so a crash in
+        # between only repeats this chunk.
+        state["done"].append({"skip": start, "nevents": n, "last_event": start + n - 1})
+        write_state(path, state)
+
+    try:
+        merge(path, state, work_dir)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Error: merging checkpoint parts failed: {e}")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a reco job in checkpointed chunks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_cmd = sub.add_parser("run", help="Run or resume a reco command")
+    run_cmd.add_argument("dir", type=Path, help="Checkpoint directory of the job")
+    run_cmd.add_argument("--chunk", type=int, required=True, help="Events per chunk")
+    run_cmd.add_argument("--skip", type=int, default=0, help="First event of the range")
+    run_cmd.add_argument("--nevents", type=int, default=-1,
+                         help="Events in the range, -1 for all remaining")
+    run_cmd.add_argument("--raw", type=Path, nargs="+", required=True,
+                         help="Raw input files, to count their events")
+    run_cmd.add_argument("--index", type=Path, nargs="*", default=[],
+                         help="Event offset indexes of the raw files, in the same order")
+    status = sub.add_parser("status", help="Show the progress of a checkpoint")
+    status.add_argument("dir", type=Path, help="Checkpoint directory of the job")
+    # NOTE: The reco command after "--" has options of its own, so it is
+    # split off before parsing.
+    argv = sys.argv[1:]
+    reco = argv[argv.index("--") + 1:] if "--" in argv else []
+    args = parser.parse_args(argv[:len(argv) - len(reco) - ("--" in argv)])
+
+    if args.command == "status":
+        state = read_state(args.dir)
+        if state is None:
+            print(f"No checkpoint in {args.dir}")
+            return 1
+        done = state["done"]
+        last = done[-1]["last_event"] if done else "none"
+        print(f"{len(done)} of {len(state['chunks'])} chunk(s) done, "
+              f"last processed event offset {last}")
+        return 0
+
+    if not reco or args.chunk < 1:
+        parser.error("run needs a positive --chunk and a reco command after --")
+    try:
+        return run(args.dir, reco, args.raw, args.index, args.skip, args.nevents,
+                   args.chunk, Path.cwd())
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
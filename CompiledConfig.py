@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Compiled, immutable snapshot of an alignment configuration.
+
+AlignmentConfig resolves every value lazily: each property walks the
+ConfigNode tree, formats the string and, for directories, issues mkdir.
+CompiledConfig is produced once by AlignmentConfig.compile(); all values
+are validated at that point and every per-iteration and per-file path is
+stored in lookup tables, so reading from it never touches the filesystem.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Mapping, Optional
+
+
+@dataclass(frozen=True)
+class RecoTask:
+    """Raw input of one reconstruction job: whole files or an event range."""
+    label:   str
+    files:   tuple[str, ...]
+    skip:    int = 0
+    # Number of events to process, -1 for all remaining events
+    nevents: int = -1
+
+
+@dataclass(frozen=True)
+class RecoPaths:
+    """Names and paths of one reconstruction job in one iteration."""
+    job:    str
+    sub:    Path
+    out:    Path
+    err:    Path
+    log:    Path
+    output: Path
+    # Events with alignment tracks, written with raw.event_lists
+    events: Path
+    # Checkpoint directory of the job (raw.checkpoint_events)
+    checkpoint: Path
+
+
+@dataclass(frozen=True)
+class Quorum:
+    """Minimum number of reco outputs after which millepede may start."""
+    files:   int
+    # Seconds between two checks of the kfalign directory
+    poll:    int
+    # Seconds after which an unreached quorum fails the millepede node
+    timeout: int
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Node-local read-through cache of raw files (RawCache.py)."""
+    # Directory on the execute node's local disk, kept between jobs
+    dir:      str
+    max_gb:   float
+    # Verify the adler32 of a cached copy on every hit
+    checksum: bool
+
+
+@dataclass(frozen=True)
+class Critical:
+    """Scheduling of millepede nodes, the serial path between iterations."""
+    # Added to the iteration priority of millepede nodes
+    priority: int
+    universe: str
+    flavour:  str
+
+
+@dataclass(frozen=True)
+class ResourcePolicy:
+    """How submit requests are derived from measured usage."""
+    percentile:  float
+    headroom:    float
+    min_samples: int
+    # Earlier campaign DAG directories whose user logs are read as well
+    history:     tuple[Path, ...]
+
+
+@dataclass(frozen=True)
+class PlanPolicy:
+    """Cost model of the size-aware reco job planner."""
+    # Wall-time a planned job should take, in seconds
+    target:            float
+    # Athena startup paid once per job, in seconds
+    startup:           float
+    seconds_per_mb:    float
+    # Used to turn a file size into an event count for splitting
+    bytes_per_event:   float
+    # Used instead of seconds_per_mb when event counts are known
+    seconds_per_event: Optional[float]
+    # Expected number of concurrent job slots, for the makespan estimate
+    slots:             int
+    # Raw file path pattern with {year}, {run} and {file}
+    path:              str
+
+
+@dataclass(frozen=True)
+class IterPaths:
+    """All resolved paths of a single iteration."""
+    iteration: int
+    priority:  Optional[int]
+    # DAG side
+    dag_dir:     Path
+    logs_dir:    Path
+    mille_job:   str
+    mille_sub:   Path
+    mille_out:   Path
+    mille_err:   Path
+    mille_log:   Path
+    cond_job:    str
+    cond_sub:    Path
+    cond_out:    Path
+    cond_err:    Path
+    cond_log:    Path
+    # Data side
+    data_dir:      Path
+    reco_dir:      Path
+    kfalign_dir:   Path
+    millepede_dir: Path
+    constants_in:  Path
+    constants_out: Path
+    quorum_marker: Path
+    quorum_wait:   Path
+    # Conditions DB archive built once per iteration (dag.conditions)
+    conditions:    Path
+    events_dir:    Path
+    # Stored reco job configurations (dag.job_config)
+    jobconfig_dir: Path
+    # Checkpoints of interrupted reco jobs (raw.checkpoint_events)
+    checkpoint_dir: Path
+    # Reconstruction jobs keyed by task label
+    reco: Mapping[str, RecoPaths]
+
+    @property
+    def iter_str(self) -> str:
+        """Two digit iteration string used in job and file names."""
+        return f"{self.iteration:02d}"
+
+
+@dataclass(frozen=True)
+class CompiledConfig:
+    """
+    Frozen, typed view of an AlignmentConfig.
+
+    Build it with AlignmentConfig.compile(). Iterations are looked up by
+    index (``snap[it]``) and reconstruction jobs by file string
+    (``snap[it].reco[label]``), where a label names a reco task of one or
+    more raw files or an event range of one file (``snap.tasks``).
+    """
+
+    # ------------------------------ Raw info ------------------------------ #
+    year:      str
+    run:       str
+    files:     tuple[str, ...]
+    files_str: str
+    # Reco task label -> raw input of the job
+    tasks:     Mapping[str, RecoTask]
+    iters:     int
+    stations:  int
+    format:    str
+    verbosity: str
+    lite:      bool
+    slim:      bool
+    profile:   bool
+    # Fraction of unlisted events kept by event preselection, None if disabled
+    event_margin: Optional[float]
+    # Events per checkpointed chunk of a reco job, None if disabled
+    checkpoint_events: Optional[int]
+    converge:  Mapping[str, tuple[float, float]]
+    resources: Optional[ResourcePolicy]
+    plan:      Optional[PlanPolicy]
+    raw_cache: Optional[CachePolicy]
+
+    # ----------------------------- Source info ----------------------------- #
+    src_dir: Path
+
+    # ------------------------------ DAG info ------------------------------ #
+    dag_dir:        Path
+    dag_file:       Path
+    dag_recoexe:    Path
+    dag_milleexe:   Path
+    dag_vars:       bool
+    dag_maxjobs:    Mapping[str, int]
+    dag_recosub:    Path
+    dag_millesub:   Path
+    dag_quorum:     Optional[Quorum]
+    dag_critical:   Optional[Critical]
+    dag_conditions: bool
+    dag_condexe:    Path
+    dag_condsub:    Path
+    # Environment snapshots restored by the job scripts (dag.env_snapshot)
+    dag_env_snapshot: bool
+    dag_calypsoenv:   Path
+    dag_pedeenv:      Path
+    # Reco jobs load the stored configuration of their iteration (dag.job_config)
+    dag_job_config:   bool
+    # Glob patterns matching reco/millepede user logs below a DAG directory
+    dag_recolog_glob:  str
+    dag_millelog_glob: str
+
+    # ------------------------------ Data info ------------------------------ #
+    data_dir:     Path
+    data_config:  Path
+    data_initial: Path
+    # SCT cluster cache (raw.clusters): directory and file per task label,
+    # empty when disabled
+    data_clusters: Optional[Path]
+    clusters:      Mapping[str, Path]
+    # Event offset indexes (raw.index): directory and file per raw file
+    # number, empty when disabled
+    data_index:    Optional[Path]
+    indexes:       Mapping[str, Path]
+
+    # ---------------------------- Template info ---------------------------- #
+    tpl_dir:           Path
+    tpl_inputforalign: Path
+    tpl_recosub:       Path
+    tpl_recoexe:       Path
+    tpl_millesub:      Path
+    tpl_milleexe:      Path
+    tpl_condsub:       Optional[Path]
+    tpl_condexe:       Optional[Path]
+
+    # -------------------------- Environment info -------------------------- #
+    env_calypso_asetup: Path
+    env_calypso_setup:  Path
+    env_pede:           Path
+    env_root:           Path
+
+    # ------------------------- Per-iteration table ------------------------- #
+    iterations: tuple[IterPaths, ...]
+
+    # -------------------------- Helper Methods -------------------------- #
+
+    def __getitem__(self, iteration: int) -> IterPaths:
+        return self.iterations[iteration]
+
+    def __iter__(self) -> Iterator[IterPaths]:
+        return iter(self.iterations)
+
+    def __len__(self) -> int:
+        return len(self.iterations)
+
+    def dag_dirs(self) -> list[Path]:
+        """Directories needed on the DAG side, parents first."""
+        dirs = [self.dag_dir]
+        for ip in self.iterations:
+            dirs.extend((ip.dag_dir, ip.logs_dir))
+        return dirs
+
+    def data_dirs(self) -> list[Path]:
+        """Directories needed on the data side, parents first."""
+        dirs = [self.data_dir]
+        for ip in self.iterations:
+            dirs.extend((ip.data_dir, ip.reco_dir,
+                         ip.kfalign_dir, ip.millepede_dir))
+        if self.event_margin is not None:
+            dirs.extend(ip.events_dir for ip in self.iterations)
+        if self.dag_job_config:
+            dirs.extend(ip.jobconfig_dir for ip in self.iterations)
+        if self.checkpoint_events is not None:
+            dirs.extend(ip.checkpoint_dir for ip in self.iterations)
+        if self.data_clusters is not None:
+            dirs.append(self.data_clusters)
+        if self.data_index is not None:
+            dirs.append(self.data_index)
+        return dirs
@@ -138,7 +138,7 @@ class Config(ABC):
         val = config.value  # raises TypeError automatically if config is a branch
         if not isinstance(val, expected_types):
             raise TypeError(
-                f"{config.path} type: {type(val).__name__} not valid.\n"
+                f"{config._path} type: {type(val).__name__} not valid.\n"
                 f"Expected: {', '.join(t.__name__ for t in expected_types)}"
             )
         return val
@@ -146,6 +146,26 @@ class Config(ABC):
     def _get_int(self, config: ConfigNode) -> int:
         return self._ensure_type(config, (int,))
     
+    def _get_bool(self, config: ConfigNode) -> bool:
+        return self._ensure_type(config, (bool,))
+    
+    def _get_number(self, config: ConfigNode) -> float:
+        if isinstance(config.value, bool):
+            raise TypeError(f"{config._path} type: bool not valid.\n"
+                            f"Expected: int, float")
+        return float(self._ensure_type(config, (int, float)))
+    
+    def _get_keys(self, config: ConfigNode) -> list[str]:
+        """
+        Get child keys of a branch node.
+
+        Raises:
+            TypeError: If config is a leaf node.
+        """
+        if config._is_leaf:
+            raise TypeError(f"'{config._path}' is a leaf node, expected a dict.")
+        return list(config._data.keys())
+    
     def _get_str(self, config: ConfigNode, **kwargs) -> str:
         """
         Get a string value with optional formatting.
@@ -165,7 +185,7 @@ class Config(ABC):
                 return string_value.format(**kwargs)
             except KeyError as e:
                 raise ValueError(
-                    f"{config.path}: missing key {e} in string: {string_value}")
+                    f"{config._path}: missing key {e} in string: {string_value}")
         
         return string_value
     
@@ -205,7 +225,7 @@ class Config(ABC):
         if exist:
             if not path.exists():
                 raise FileNotFoundError(
-                    f"{config.path}: path does not exist: {path}")
+                    f"{config._path}: path does not exist: {path}")
         # Creation mode: ensure path exists if requested
         elif ensure:
             path.mkdir(parents=True, exist_ok=True)
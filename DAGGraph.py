@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+In-memory node graph of the alignment DAG and its streaming emitter.
+
+DAGManager yields DAGNode objects in dependency order (every parent before
+its children). emit_dag() turns that stream into DAG file lines one node at
+a time, so the file is never held as one growing string.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Optional
+
+
+@dataclass
+class DAGNode:
+    """One JOB of the DAG with everything DAGMan needs to know about it."""
+    name:      str
+    kind:      str
+    iteration: int
+    submit:    Path
+    vars:      dict[str, str] = field(default_factory=dict)
+    parents:   tuple[str, ...] = ()
+    retry:     int = 0
+    category:  Optional[str] = None
+    priority:  Optional[int] = None
+    # PRE script command line, run on the submit host before the job
+    pre:       tuple[str, ...] = ()
+    # (exit value, seconds): PRE exit value that makes DAGMan retry it later
+    pre_defer: Optional[tuple[int, int]] = None
+    # POST script command line, run on the submit host after the job
+    post:      tuple[str, ...] = ()
+    # (exit value, DAG return value) aborting the whole DAG
+    abort_on:  Optional[tuple[int, int]] = None
+
+
+def _vars_line(node: DAGNode) -> str:
+    """Format a VARS line, escaping backslashes and quotes in values."""
+    pairs = []
+    for key, val in node.vars.items():
+        escaped = str(val).replace('\\', '\\\\').replace('"', '\\"')
+        pairs.append(f'{key}="{escaped}"')
+    return f"VARS {node.name} {' '.join(pairs)}\n"
+
+
+def emit_node(node: DAGNode) -> Iterator[str]:
+    """Yield all DAG lines describing a single node."""
+    yield f"JOB {node.name} {node.submit}\n"
+    if node.vars:
+        yield _vars_line(node)
+    if node.category is not None:
+        yield f"CATEGORY {node.name} {node.category}\n"
+    if node.priority is not None:
+        yield f"PRIORITY {node.name} {node.priority}\n"
+    if node.retry:
+        yield f"RETRY {node.name} {node.retry}\n"
+    if node.pre:
+        defer = ""
+        if node.pre_defer is not None:
+            defer = f"DEFER {node.pre_defer[0]} {node.pre_defer[1]} "
+        yield f"SCRIPT {defer}PRE {node.name} {' '.join(node.pre)}\n"
+    if node.post:
+        yield f"SCRIPT POST {node.name} {' '.join(node.post)}\n"
+    if node.abort_on is not None:
+        exit_value, return_value = node.abort_on
+        yield f"ABORT-DAG-ON {node.name} {exit_value} RETURN {return_value}\n"
+    if node.parents:
+        yield f"PARENT {' '.join(node.parents)} CHILD {node.name}\n"
+
+
+def emit_dag(nodes: Iterable[DAGNode],
+             maxjobs: Optional[Mapping[str, int]] = None) -> Iterator[str]:
+    """
+    Yield the lines of a DAG file.
+
+    Args:
+        nodes: Nodes in dependency order (parents before children).
+        maxjobs: Optional category -> maximum concurrently submitted jobs.
+    """
+    yield "# HTCondor DAG for FASER alignment workflow\n\n"
+    if maxjobs:
+        yield "# Throttles\n"
+        for category, limit in maxjobs.items():
+            yield f"MAXJOBS {category} {limit}\n"
+        yield "\n"
+    iteration = None
+    for node in nodes:
+        if node.iteration != iteration:
+            if iteration is not None:
+                yield "\n"
+            iteration = node.iteration
+            yield f"# Iteration {iteration}\n"
+        yield from emit_node(node)
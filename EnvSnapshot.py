@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Snapshots of the job environment, captured once per campaign.
+
+Every reco job sources atlasLocalSetup.sh, runs asetup and sources the
+Calypso setup; every millepede job sources the ROOT setup. capture() runs
+such a setup once on the submit host and stores the variables it changed
+as a bash file of ``export``/``unset`` lines. The job scripts source that
+file instead of the setup when the snapshot was taken on the same OS
+(``EnvSnapshot.py check``), and fall back to the full setup otherwise.
+
+Snapshot header:
+
+    # os: almalinux9-x86_64
+    # key: <sha256 of the setup commands and their check>
+
+Usage:
+    EnvSnapshot.py check <SNAPSHOT>
+"""
+
+import hashlib
+import os
+import platform
+import re
+import shlex
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+# Differ between shells without being part of the setup
+_VOLATILE = {"PWD", "OLDPWD", "SHLVL", "_"}
+_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def os_tag() -> str:
+    """OS name, major version and architecture of this host."""
+    release = {}
+    try:
+        with open("/etc/os-release") as f:
+            for line in f:
+                key, _, val = line.strip().partition("=")
+                release[key] = val.strip('"')
+    except OSError:
+        pass
+    version = release.get("VERSION_ID", "").split(".")[0]
+    return f"{release.get('ID', platform.system().lower())}{version}-{platform.machine()}"
+
+
+def setup_key(setup: str, verify: str = "") -> str:
+    """Hash identifying the setup commands a snapshot was taken from."""
+    return hashlib.sha256(f"{setup}\n{verify}".encode()).hexdigest()
+
+
+def read_header(path: Path) -> dict[str, str]:
+    """Read the ``# name: value`` header lines of a snapshot."""
+    header = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                if not line.startswith("# "):
+                    break
+                key, _, val = line[2:].partition(":")
+                header[key.strip()] = val.strip()
+    except OSError:
+        pass
+    return header
+
+
+def usable(path: Path, setup: Optional[str] = None, verify: str = "") -> bool:
+    """Check a snapshot exists for this OS (and, if given, for setup)."""
+    header = read_header(path)
+    if header.get("os") != os_tag():
+        return False
+    return setup is None or header.get("key") == setup_key(setup, verify)
+
+
+def _environ(script: str) -> dict[str, str]:
+    """Environment at the end of a bash script."""
+    proc = subprocess.run(["bash", "-c", f"{script}\nenv -0"],
+                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          check=True)
+    env = {}
+    for entry in proc.stdout.split(b"\0"):
+        name, sep, val = entry.decode(errors="surrogateescape").partition("=")
+        if sep and _NAME.match(name) and name not in _VOLATILE:
+            env[name] = val
+    return env
+
+
+def capture(setup: str, path: Path, verify: str = "") -> None:
+    """
+    Run setup in a fresh bash and store the variables it changed.
+
+    Every line of setup must succeed, and then verify, a command checking
+    the setup worked (a setup script may fail with status 0). Otherwise
+    nothing is written: every job would source the broken snapshot.
+
+    Raises:
+        subprocess.CalledProcessError: If the setup or verify fails.
+    """
+    before = _environ(":")
+    # NOTE: Each line is checked on its own; set -e would also apply inside
+    # the sourced setup scripts. Output goes to /dev/null so only env -0
+    # reaches stdout.
+    checked = "".join(f"{line} || exit 1\n" for line in setup.splitlines() if line.strip())
+    if verify:
+        checked += f"{verify} || exit 1\n"
+    after = _environ(f"{{\n{checked}}} >/dev/null 2>&1")
+    lines = [f"# os: {os_tag()}\n", f"# key: {setup_key(setup, verify)}\n"]
+    for name in sorted(before.keys() - after.keys()):
+        lines.append(f"unset {name}\n")
+    for name, val in sorted(after.items()):
+        if before.get(name) != val:
+            lines.append(f"export {name}={shlex.quote(val)}\n")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.")
+    with os.fdopen(fd, 'w') as f:
+        f.writelines(lines)
+    os.replace(tmp, path)
+
+
+def main() -> int:
+    if len(sys.argv) != 3 or sys.argv[1] != "check":
+        print("Usage: EnvSnapshot.py check <SNAPSHOT>")
+        return 2
+    path = Path(sys.argv[2])
+    if usable(path):
+        return 0
+    header = read_header(path)
+    if not header:
+        print(f"No environment snapshot at {path}")
+    else:
+        print(f"Environment snapshot taken on {header.get('os')}, this host is {os_tag()}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""
+Stored ComponentAccumulator shared by the reco jobs of an iteration.
+
+All reco jobs of an iteration build the same ComponentAccumulator; only the
+input files, the output file stem, the event range and the event list
+differ. The first job with a given flag set pickles its accumulator to
+``<dir>/<key>.pkl`` (key: hash of the flags, see config_key()), later jobs
+load it and patch the job-dependent values instead of running the Python
+configuration again. Used by faser_reco_alignment.py (``--jobConfig``).
+
+When storing, the properties holding a job value (a string containing the
+file stem, event list path or work directory, or a list equal to the input
+files) are located once and their paths recorded with the value split
+around the job values. Loading rewrites only those properties, rebuilt from
+their recorded parts, so no other property is touched and no component
+names need to be known here.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+from pathlib import Path
+from typing import Optional
+
+# Arguments that differ between the jobs of an iteration, patched on load
+_JOB_ARGS = {"file_path", "filelist", "skip", "nevents", "eventList", "jobConfig",
+             "inputIndex"}
+
+
+def config_key(args: dict, runtype: str) -> str:
+    """Hash of everything shaping the configuration except job values."""
+    fields = {key: val for key, val in args.items() if key not in _JOB_ARGS}
+    fields["eventList"] = bool(args.get("eventList"))
+    fields["runtype"] = runtype
+    # NOTE: A pickle is only valid for the release that wrote it.
+    fields["release"] = os.environ.get("AtlasVersion", "")
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()[:16]
+
+
+# Components reachable from a ComponentAccumulator, first step of every path
+_GETTERS = ("getServices", "getPublicTools", "getEventAlgos", "getCondAlgos")
+# Marks a property holding the input file list
+_INPUTS = "inputs"
+
+
+def _properties(comp) -> dict:
+    props = getattr(comp, "_properties", None)
+    if props is None:
+        props = {k: v for k, v in vars(comp).items() if not k.startswith("_")}
+    return props
+
+
+def _children(value) -> list[tuple[Optional[int], object]]:
+    """Configurables held by a property value (private tools), by position."""
+    if hasattr(value, "_properties"):
+        return [(None, value)]
+    if isinstance(value, (list, tuple)):
+        return [(i, v) for i, v in enumerate(value) if hasattr(v, "_properties")]
+    return []
+
+
+def _split(value: str, values: dict[str, str]) -> Optional[list]:
+    """
+    Split value into literal strings and (key,) for each job value in it.
+
+    A job value only counts with no letter or digit on either side, so a
+    label merely starting with the file stem (``<stem>0``) is not one.
+    Longer job values go first, so one containing another (an event list in
+    the work directory) is kept whole.
+
+    Returns:
+        The parts, or None if value contains no job value.
+    """
+    parts: list = [value]
+    for key, job_value in sorted(values.items(), key=lambda kv: -len(kv[1])):
+        if not job_value:
+            continue
+        split: list = []
+        for part in parts:
+            if isinstance(part, tuple):
+                split.append(part)
+                continue
+            pattern = rf"(?<![A-Za-z0-9]){re.escape(job_value)}(?![A-Za-z0-9])"
+            for i, piece in enumerate(re.split(pattern, part)):
+                if i:
+                    split.append((key,))
+                if piece:
+                    split.append(piece)
+        parts = split
+    return parts if any(isinstance(part, tuple) for part in parts) else None
+
+
+def _find(comp, path: list, values: dict[str, str], inputs: list[str],
+          found: list, seen: set[int]) -> None:
+    """Append (path, property, parts) of every job property in comp's tree."""
+    if id(comp) in seen:
+        return
+    seen.add(id(comp))
+    for name, value in _properties(comp).items():
+        children = _children(value)
+        if children:
+            for index, child in children:
+                _find(child, [*path, (name, index)], values, inputs, found, seen)
+        elif isinstance(value, str):
+            parts = _split(value, values)
+            if parts is not None:
+                found.append((path, name, parts))
+        elif isinstance(value, (list, tuple)) and list(value) == inputs:
+            found.append((path, name, _INPUTS))
+
+
+def _job_properties(acc, inputs: list[str], values: dict[str, str]) -> list:
+    """Paths of the properties of acc holding a job value, see _find()."""
+    found: list = []
+    seen: set[int] = set()
+    for getter in _GETTERS:
+        for i, comp in enumerate(getattr(acc, getter)()):
+            _find(comp, [(getter, i)], values, list(inputs), found, seen)
+    return found
+
+
+def _resolve(acc, path: list):
+    """Component at path, see _find()."""
+    getter, index = path[0]
+    comp = getattr(acc, getter)()[index]
+    for name, index in path[1:]:
+        value = getattr(comp, name)
+        comp = value if index is None else value[index]
+    return comp
+
+
+def _job_values(filestem: str, event_list: str) -> dict[str, str]:
+    return {"workdir": os.getcwd(), "filestem": filestem, "eventList": event_list}
+
+
+def store_config(acc, path: Path, inputs: list[str], filestem: str,
+                 event_list: str) -> None:
+    """Pickle acc with the paths of its job properties, atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.part")
+    properties = _job_properties(acc, inputs, _job_values(filestem, event_list))
+    with open(tmp, 'wb') as f:
+        pickle.dump({"properties": properties}, f)
+        pickle.dump(acc, f)
+    # NOTE: Concurrent first jobs write identical files, the last one wins.
+    os.replace(tmp, path)
+
+
+def load_config(path: Path, inputs: list[str], filestem: str, skip: int,
+                event_list: str) -> Optional[object]:
+    """
+    Load a stored accumulator and patch it for this job.
+
+    Returns:
+        The patched accumulator, or None if path does not exist.
+    """
+    if not path.is_file():
+        return None
+    with open(path, 'rb') as f:
+        stored = pickle.load(f)
+        acc = pickle.load(f)
+    values = _job_values(filestem, event_list)
+    for comp_path, name, parts in stored["properties"]:
+        if parts == _INPUTS:
+            value = list(inputs)
+        else:
+            value = "".join(values[part[0]] if isinstance(part, tuple) else part
+                            for part in parts)
+        setattr(_resolve(acc, comp_path), name, value)
+    acc.getService("EventSelector").SkipEvents = skip
+    print(f"Loaded job configuration {path}, patched {len(stored['properties'])} properties")
+    return acc
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Run the alignment DAG on the local machine instead of HTCondor.
+
+LocalExecutor consumes the DAGNode graph produced by DAGManager.iter_nodes()
+and runs each node's executable with the arguments of its submit file in a
+bounded pool. It honours parents, RETRY, CATEGORY/MAXJOBS, PRIORITY,
+PRE scripts with DEFER, POST scripts and ABORT-DAG-ON, and writes
+stdout/stderr/log to the same paths a condor job would.
+"""
+
+import bisect
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Mapping, Optional
+
+import ColorfulPrint
+from DAGGraph import DAGNode
+
+
+@dataclass(frozen=True)
+class SubmitDescription:
+    """The parts of a submit file needed to run a job locally."""
+    executable: str
+    arguments:  str
+    output:     str
+    error:      str
+    log:        str
+
+    @classmethod
+    def parse(cls, path: Path) -> 'SubmitDescription':
+        """Parse ``key = value`` lines of a submit file."""
+        values: dict[str, str] = {}
+        with open(path, 'r') as f:
+            for raw in f:
+                line = raw.strip()
+                if not line or line.startswith('#') or '=' not in line:
+                    continue
+                key, _, val = line.partition('=')
+                values[key.strip().lower()] = val.strip()
+        if "executable" not in values:
+            raise ValueError(f"{path}: no executable")
+        return cls(executable=values["executable"],
+                   arguments=values.get("arguments", ""),
+                   output=values.get("output", "/dev/null"),
+                   error=values.get("error", "/dev/null"),
+                   log=values.get("log", "/dev/null"))
+
+    def expand(self, text: str, macros: Mapping[str, str]) -> str:
+        """Replace $(name) macros with node VARS values."""
+        for key, val in macros.items():
+            text = text.replace(f"$({key})", str(val))
+        return text
+
+
+def _du_kb(path: Path) -> int:
+    """Disk usage of a directory tree in KB."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total // 1024
+
+
+@dataclass
+class _Result:
+    """Outcome of one node."""
+    node:     DAGNode
+    status:   int
+    attempts: int
+
+
+class _SlotGate:
+    """
+    Job slots shared by all nodes, handed out by PRIORITY.
+
+    Only the job itself holds a slot; PRE and POST scripts run outside of
+    it, like on the DAGMan submit host. A waiting job may start when a slot
+    is free, its category is below MAXJOBS, and every better-placed waiter
+    is blocked by its own category throttle.
+    """
+
+    def __init__(self, slots: int, maxjobs: Mapping[str, int]):
+        self._cond = threading.Condition()
+        self._free = slots
+        self._maxjobs = dict(maxjobs)
+        self._running: dict[Optional[str], int] = {}
+        self._waiting: list[tuple[tuple[int, int], Optional[str]]] = []
+
+    def _throttled(self, category: Optional[str]) -> bool:
+        limit = self._maxjobs.get(category)
+        return limit is not None and self._running.get(category, 0) >= limit
+
+    def _may_start(self, key: tuple[int, int], category: Optional[str]) -> bool:
+        if self._free == 0 or self._throttled(category):
+            return False
+        for other, other_category in self._waiting:
+            if other == key:
+                return True
+            if not self._throttled(other_category):
+                return False
+        return True
+
+    def acquire(self, key: tuple[int, int], category: Optional[str],
+                cancel: threading.Event) -> bool:
+        """Block until the job may start. Returns False if cancelled."""
+        entry = (key, category)
+        with self._cond:
+            bisect.insort(self._waiting, entry)
+            try:
+                while not self._may_start(key, category):
+                    if cancel.is_set():
+                        return False
+                    self._cond.wait()
+            finally:
+                self._waiting.remove(entry)
+            self._free -= 1
+            self._running[category] = self._running.get(category, 0) + 1
+            self._cond.notify_all()
+        return True
+
+    def release(self, category: Optional[str]) -> None:
+        with self._cond:
+            self._free += 1
+            self._running[category] -= 1
+            self._cond.notify_all()
+
+    def wake(self) -> None:
+        """Let waiters re-check their cancel event."""
+        with self._cond:
+            self._cond.notify_all()
+
+
+class LocalExecutor:
+    """Execute DAG nodes with a bounded local process pool."""
+
+    # ---------------------------- Constructor ---------------------------- #
+
+    def __init__(self, nodes: Iterable[DAGNode], max_workers: int = 4,
+                 maxjobs: Optional[Mapping[str, int]] = None,
+                 cwd: Optional[Path] = None):
+        """
+        Initialize executor.
+
+        Args:
+            nodes: DAG nodes in dependency order.
+            max_workers: Maximum number of concurrently running jobs.
+            maxjobs: Optional category -> concurrent job limit.
+            cwd: Directory POST scripts run in (the DAG directory).
+        """
+        self._nodes: dict[str, DAGNode] = {}
+        self._children: dict[str, list[str]] = {}
+        for node in nodes:
+            for parent in node.parents:
+                if parent not in self._nodes:
+                    raise ValueError(
+                        f"Node {node.name}: parent {parent} not defined before it")
+                self._children[parent].append(node.name)
+            self._nodes[node.name] = node
+            self._children[node.name] = []
+        self._order = {name: i for i, name in enumerate(self._nodes)}
+        self._gate = _SlotGate(max_workers, maxjobs or {})
+        self._cwd = cwd
+        self._submits: dict[Path, SubmitDescription] = {}
+        self._procs: dict[str, subprocess.Popen] = {}
+        self._lock = threading.Lock()
+        self._aborted = threading.Event()
+
+    def _submit(self, path: Path) -> SubmitDescription:
+        """Parse each submit file once."""
+        if path not in self._submits:
+            self._submits[path] = SubmitDescription.parse(path)
+        return self._submits[path]
+
+    # ---------------------------- Execution ---------------------------- #
+
+    @staticmethod
+    def _log_event(log: Path, code: str, text: str) -> None:
+        """Append an event line in the spirit of an HTCondor user log."""
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        with open(log, 'a') as f:
+            f.write(f"{code} (local) {stamp} {text}\n...\n")
+
+    def _run_job(self, node: DAGNode) -> int:
+        """Run the node's executable once; return its exit status."""
+        desc = self._submit(node.submit)
+        argv = [desc.expand(desc.executable, node.vars)]
+        argv += desc.expand(desc.arguments, node.vars).split()
+        out = Path(desc.expand(desc.output, node.vars))
+        err = Path(desc.expand(desc.error, node.vars))
+        log = Path(desc.expand(desc.log, node.vars))
+        for path in (out, err, log):
+            path.parent.mkdir(parents=True, exist_ok=True)
+        # NOTE: Like a condor slot, every job gets its own scratch directory.
+        scratch = Path(tempfile.mkdtemp(prefix=f"{node.name}."))
+        env = dict(os.environ, _CONDOR_SCRATCH_DIR=str(scratch))
+        self._log_event(log, "000", "Job submitted from local executor.")
+        start = time.monotonic()
+        try:
+            with open(out, 'w') as fout, open(err, 'w') as ferr:
+                proc = subprocess.Popen(argv, cwd=scratch, env=env,
+                                        stdout=fout, stderr=ferr)
+                with self._lock:
+                    self._procs[node.name] = proc
+                # NOTE: wait4 instead of wait() to get the job's own rusage.
+                _, wait_status, rusage = os.wait4(proc.pid, 0)
+                status = os.waitstatus_to_exitcode(wait_status)
+                proc.returncode = status
+            wall = max(time.monotonic() - start, 1e-6)
+            usage = (f"\tPartitionable Resources :    Usage\n"
+                     f"\t   Cpus                 : {(rusage.ru_utime + rusage.ru_stime) / wall:8.2f}\n"
+                     f"\t   Disk (KB)            : {_du_kb(scratch):8d}\n"
+                     f"\t   Memory (MB)          : {rusage.ru_maxrss // 1024:8d}\n")
+        except OSError as e:
+            with open(err, 'a') as ferr:
+                ferr.write(f"LocalExecutor: cannot run {argv[0]}: {e}\n")
+            status = 127
+            usage = ""
+        finally:
+            with self._lock:
+                self._procs.pop(node.name, None)
+            shutil.rmtree(scratch, ignore_errors=True)
+        self._log_event(log, "005", f"Job terminated.\n\t(1) Normal termination "
+                                    f"(return value {status})\n{usage}".rstrip("\n"))
+        return status
+
+    def _run_pre(self, node: DAGNode) -> int:
+        """Run the PRE script, re-running it later while it asks to defer."""
+        while True:
+            status = subprocess.run(node.pre, cwd=self._cwd).returncode
+            if node.pre_defer is None or status != node.pre_defer[0]:
+                return status
+            if self._aborted.wait(node.pre_defer[1]):
+                return status
+    
+    def _run_post(self, node: DAGNode, status: int) -> int:
+        """Run the POST script, whose exit status replaces the job's."""
+        argv = [arg.replace("$RETURN", str(status)) for arg in node.post]
+        return subprocess.run(argv, cwd=self._cwd).returncode
+
+    def _run_node(self, node: DAGNode) -> _Result:
+        """Run a node with its POST script, retrying on failure."""
+        attempts = 0
+        while True:
+            attempts += 1
+            # NOTE: As in DAGMan, a failed PRE script skips job and POST.
+            status = self._run_pre(node) if node.pre else 0
+            if status == 0:
+                key = (-(node.priority or 0), self._order[node.name])
+                if not self._gate.acquire(key, node.category, self._aborted):
+                    break
+                print(f"Start: {node.name}")
+                try:
+                    status = self._run_job(node)
+                finally:
+                    self._gate.release(node.category)
+                if node.post:
+                    status = self._run_post(node, status)
+            if status == 0 or self._aborted.is_set():
+                break
+            if node.abort_on is not None and status == node.abort_on[0]:
+                break
+            if attempts > node.retry:
+                break
+            ColorfulPrint.print_yellow("Retry: ")
+            print(f"{node.name} (exit {status}), attempt {attempts + 1}")
+        return _Result(node, status, attempts)
+    
+    def _abort(self) -> None:
+        """Stop waiting nodes and terminate all running jobs."""
+        self._aborted.set()
+        self._gate.wake()
+        self._terminate()
+
+    def _terminate(self) -> None:
+        """Terminate all running jobs."""
+        with self._lock:
+            procs = list(self._procs.values())
+        for proc in procs:
+            proc.terminate()
+
+    def run(self) -> int:
+        """
+        Execute the whole graph.
+
+        Returns:
+            0 if every node succeeded, the ABORT-DAG-ON return value if the
+            DAG was aborted, 1 otherwise.
+        """
+        pending = {name: len(node.parents) for name, node in self._nodes.items()}
+        running: dict[Future, DAGNode] = {}
+        failed: list[str] = []
+        abort_return: Optional[int] = None
+
+        # NOTE: Every ready node gets a thread; _SlotGate bounds how many
+        # jobs actually run, so nodes waiting in a PRE script hold no slot.
+        with ThreadPoolExecutor(max_workers=max(len(self._nodes), 1)) as pool:
+            for name, count in pending.items():
+                if count == 0:
+                    running[pool.submit(self._run_node, self._nodes[name])] = self._nodes[name]
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    result = future.result()
+                    if abort_return is not None:
+                        continue
+                    if result.status == 0:
+                        ColorfulPrint.print_green("Done: ")
+                        print(node.name)
+                        for child in self._children[node.name]:
+                            pending[child] -= 1
+                            if pending[child] == 0:
+                                child_node = self._nodes[child]
+                                running[pool.submit(self._run_node, child_node)] = child_node
+                    elif node.abort_on is not None and result.status == node.abort_on[0]:
+                        ColorfulPrint.print_yellow("Abort: ")
+                        print(f"{node.name} exited {result.status}, stopping DAG")
+                        abort_return = node.abort_on[1]
+                        self._abort()
+                    else:
+                        ColorfulPrint.print_red("Failed: ")
+                        print(f"{node.name} (exit {result.status}) "
+                              f"after {result.attempts} attempt(s)")
+                        failed.append(node.name)
+
+        if abort_return is not None:
+            return abort_return
+        unrun = [name for name, count in pending.items() if count > 0]
+        if failed or unrun:
+            ColorfulPrint.print_red("Error: ")
+            print(f"{len(failed)} node(s) failed, {len(unrun)} node(s) not run")
+            return 1
+        return 0
+
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Size-aware planning of reco jobs.
+
+RawList yields one job per raw file whatever its size, so a few large files
+become stragglers while runs of small files pay Athena startup for every
+file. Planner stats all raw files in parallel, estimates the cost of each
+from its size (or event count, when known), packs consecutive small files
+into one job and splits large files into event ranges, aiming at a target
+wall-time per job. The resulting RecoTask table replaces the default one
+in AlignmentConfig.compile().
+"""
+
+import heapq
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Mapping, Optional
+
+import ColorfulPrint
+from CompiledConfig import PlanPolicy, RecoTask
+
+
+@dataclass
+class Plan:
+    """Planned reco tasks with their estimated cost in seconds."""
+    tasks:   dict[str, RecoTask] = field(default_factory=dict)
+    costs:   dict[str, float] = field(default_factory=dict)
+    sizes:   dict[str, Optional[int]] = field(default_factory=dict)
+    # Raw files that could not be stat'ed
+    missing: list[str] = field(default_factory=list)
+
+    def add(self, task: RecoTask, cost: float) -> None:
+        self.tasks[task.label] = task
+        self.costs[task.label] = cost
+
+    def makespan(self, slots: int) -> float:
+        """Expected wall-time of all tasks on slots, longest task first (LPT)."""
+        loads = [0.0] * max(1, min(slots, len(self.costs)))
+        for cost in sorted(self.costs.values(), reverse=True):
+            heapq.heapreplace(loads, loads[0] + cost)
+        return max(loads) if self.costs else 0.0
+
+    def print(self, policy: PlanPolicy) -> None:
+        """Print the plan table and a summary."""
+        print(f"{'task':<18s} {'files':>5s} {'skip':>8s} {'nevents':>8s} {'est. time':>10s}")
+        for label, task in self.tasks.items():
+            print(f"{label:<18s} {len(task.files):5d} {task.skip:8d} "
+                  f"{task.nevents:8d} {_hms(self.costs[label]):>10s}")
+        total = sum(self.costs.values())
+        packed = sum(1 for t in self.tasks.values() if len(t.files) > 1)
+        split = len({t.files[0] for t in self.tasks.values() if t.nevents != -1 or t.skip})
+        ColorfulPrint.print_blue("Plan: ")
+        print(f"{len(self.sizes)} raw file(s) -> {len(self.tasks)} job(s) "
+              f"({packed} packed, {split} file(s) split), "
+              f"target {_hms(policy.target)} per job")
+        ColorfulPrint.print_blue("Plan: ")
+        print(f"total {_hms(total)}, expected makespan {_hms(self.makespan(policy.slots))} "
+              f"on {policy.slots} slot(s)")
+        if self.missing:
+            ColorfulPrint.print_yellow("Warning: ")
+            print(f"{len(self.missing)} raw file(s) not found: {', '.join(self.missing)}")
+
+
+def _hms(seconds: float) -> str:
+    """Format seconds as H:MM:SS."""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class Planner:
+    """Pack and split raw files into reco tasks near a target wall-time."""
+
+    # ---------------------------- Constructor ---------------------------- #
+
+    def __init__(self, policy: PlanPolicy, max_workers: int = 32):
+        """
+        Initialize planner.
+
+        Args:
+            policy: Cost model and target from the ``plan`` config section.
+            max_workers: Number of threads used to stat raw files.
+        """
+        self.policy = policy
+        self._max_workers = max_workers
+
+    # ---------------------------- Inputs ---------------------------- #
+
+    def raw_path(self, year: str, run: str, file_str: str) -> Path:
+        """Path of one raw file."""
+        return Path(self.policy.path.format(year=year, run=run, file=file_str))
+
+    def stat(self, year: str, run: str,
+             files: tuple[str, ...]) -> dict[str, Optional[int]]:
+        """Sizes of all raw files in bytes (None if missing), stat'ed in parallel."""
+        def size(file_str: str) -> Optional[int]:
+            try:
+                return os.stat(self.raw_path(year, run, file_str)).st_size
+            except OSError:
+                return None
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            return dict(zip(files, pool.map(size, files)))
+
+    # ---------------------------- Cost model ---------------------------- #
+
+    def events(self, size: int, counted: Optional[int]) -> int:
+        """Number of events of a file, counted or estimated from its size."""
+        if counted is not None:
+            return counted
+        return max(1, math.ceil(size / self.policy.bytes_per_event))
+
+    def cost(self, size: int, counted: Optional[int]) -> float:
+        """Estimated processing time of a file in seconds, without startup."""
+        policy = self.policy
+        if counted is not None and policy.seconds_per_event is not None:
+            return counted * policy.seconds_per_event
+        return size / 1e6 * policy.seconds_per_mb
+
+    # ---------------------------- Planning ---------------------------- #
+
+    def plan(self, year: str, run: str, files: tuple[str, ...],
+             event_counts: Optional[Mapping[str, int]] = None) -> Plan:
+        """
+        Plan reco tasks for files.
+
+        Consecutive small files are packed while the job stays below the
+        target; a file above the target is split into equal event ranges,
+        the last of which reads to the end of the file. Missing files keep a
+        job of their own at the median cost, so the DAG still reports them.
+
+        Args:
+            year, run: Used to build raw file paths.
+            files: Raw file numbers in order.
+            event_counts: Optional exact event counts per file.
+        """
+        policy = self.policy
+        event_counts = event_counts or {}
+        plan = Plan(sizes=self.stat(year, run, files))
+        known = sorted(self.cost(size, event_counts.get(f))
+                       for f, size in plan.sizes.items() if size is not None)
+        median = known[len(known) // 2] if known else policy.target - policy.startup
+
+        group: list[str] = []
+        group_cost = 0.0
+
+        def close_group() -> None:
+            nonlocal group, group_cost
+            if group:
+                label = group[0] if len(group) == 1 else f"{group[0]}-{group[-1]}"
+                plan.add(RecoTask(label, tuple(group)), policy.startup + group_cost)
+            group, group_cost = [], 0.0
+
+        for file_str in files:
+            size = plan.sizes[file_str]
+            if size is None:
+                plan.missing.append(file_str)
+                close_group()
+                plan.add(RecoTask(file_str, (file_str,)), policy.startup + median)
+                continue
+            counted = event_counts.get(file_str)
+            cost = self.cost(size, counted)
+            if policy.startup + cost > policy.target:
+                close_group()
+                shards = math.ceil(cost / (policy.target - policy.startup))
+                events = self.events(size, counted)
+                per_shard = math.ceil(events / shards)
+                for i in range(shards):
+                    label = f"{file_str}_s{i}"
+                    plan.add(RecoTask(label, (file_str,), skip=i * per_shard,
+                                      nevents=per_shard if i < shards - 1 else -1),
+                             policy.startup + cost / shards)
+                continue
+            if group and policy.startup + group_cost + cost > policy.target:
+                close_group()
+            group.append(file_str)
+            group_cost += cost
+        close_group()
+        return plan
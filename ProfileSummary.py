@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Per-algorithm profile of the reco jobs of an iteration.
+
+With ``raw.profile`` every reco job runs PerfMonMT (``--profile``) and
+stores its JSON next to the kfalignment output as
+``kfalignment_<run>_<task>-perfmon.json``. The ``componentLevel`` section
+of such a file holds, per step (Initialize, FirstEvent, Execute, ...) and
+component, the call count, CPU time (ms), virtual memory and malloc (kB)
+increments:
+
+    {"componentLevel": {"Execute": {"CKF_Back": {"count": 1000,
+        "cpuTime": 51234.5, "vmem": 1024, "malloc": 512}, ...}, ...}, ...}
+
+summarize() merges the files of many jobs into per-component percentiles,
+so the algorithms worth optimizing stand out.
+
+Usage:
+    ProfileSummary.py <KFALIGN_DIR|JSON>... [--step Execute] [--top 20]
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from ResourceUsage import percentile
+
+PROFILE_GLOB = "kfalignment_*-perfmon.json"
+_QUANTILES = (50.0, 90.0, 100.0)
+
+
+@dataclass(frozen=True)
+class ComponentProfile:
+    """Percentiles of one component over all jobs that ran it."""
+    name:      str
+    jobs:      int
+    calls:     int
+    # Per job: total CPU (s), CPU per call (ms), vmem and malloc (MB)
+    cpu_s:     tuple[float, ...]
+    cpu_ms:    tuple[float, ...]
+    vmem_mb:   tuple[float, ...]
+    malloc_mb: tuple[float, ...]
+
+
+def find_profiles(paths: Iterable[Path]) -> list[Path]:
+    """Expand directories to the profile files they hold."""
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(path.glob(PROFILE_GLOB)))
+        else:
+            files.append(path)
+    return files
+
+
+def read_step(path: Path, step: str) -> dict[str, dict]:
+    """Components of one step of a PerfMonMT JSON; empty if unreadable."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data.get("componentLevel", {}).get(step, {})
+
+
+def summarize(files: Iterable[Path], step: str,
+              quantiles: tuple[float, ...] = _QUANTILES) -> list[ComponentProfile]:
+    """Per-component percentiles, sorted by median total CPU time."""
+    samples: dict[str, list[dict]] = {}
+    for path in files:
+        for name, entry in read_step(path, step).items():
+            samples.setdefault(name, []).append(entry)
+
+    def pct(values: list[float]) -> tuple[float, ...]:
+        return tuple(percentile(values, q) for q in quantiles)
+
+    profiles = []
+    for name, entries in samples.items():
+        counts = [int(e.get("count", 0)) for e in entries]
+        cpu = [float(e.get("cpuTime", 0.0)) for e in entries]
+        profiles.append(ComponentProfile(
+            name=name,
+            jobs=len(entries),
+            calls=sum(counts),
+            cpu_s=pct([c / 1000 for c in cpu]),
+            cpu_ms=pct([c / n for c, n in zip(cpu, counts) if n]
+                       or [0.0]),
+            vmem_mb=pct([float(e.get("vmem", 0.0)) / 1024 for e in entries]),
+            malloc_mb=pct([float(e.get("malloc", 0.0)) / 1024 for e in entries]),
+        ))
+    return sorted(profiles, key=lambda p: p.cpu_s[0], reverse=True)
+
+
+def print_table(profiles: list[ComponentProfile], step: str, top: int = 0,
+                quantiles: tuple[float, ...] = _QUANTILES) -> None:
+    """Print the top profiles (all if 0) as a fixed-width table."""
+    labels = "/".join("max" if q == 100 else f"p{q:g}" for q in quantiles)
+    total = sum(p.cpu_s[0] for p in profiles) or 1.0
+    print(f"Step {step}, columns are {labels} over jobs")
+    print(f"{'Component':<40s} {'Jobs':>5s} {'Share':>6s} {'CPU (s)':>22s} "
+          f"{'CPU/call (ms)':>22s} {'Vmem (MB)':>20s} {'Malloc (MB)':>20s}")
+
+    def cols(values: tuple[float, ...], fmt: str) -> str:
+        return "/".join(format(v, fmt) for v in values)
+
+    for p in profiles[:top] if top else profiles:
+        print(f"{p.name[:40]:<40s} {p.jobs:5d} {100 * p.cpu_s[0] / total:5.1f}% "
+              f"{cols(p.cpu_s, '.1f'):>22s} {cols(p.cpu_ms, '.2f'):>22s} "
+              f"{cols(p.vmem_mb, '.0f'):>20s} {cols(p.malloc_mb, '.0f'):>20s}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Merge PerfMonMT profiles of reco jobs")
+    parser.add_argument("paths", nargs="+", type=Path,
+                        help="kfalignment directories or PerfMonMT JSON files")
+    parser.add_argument("--step", default="Execute",
+                        help="PerfMonMT step: Initialize, FirstEvent, Execute, Finalize (default: Execute)")
+    parser.add_argument("--top", type=int, default=20,
+                        help="Number of components shown, 0 for all (default: 20)")
+    parser.add_argument("--json", type=Path, default=None,
+                        help="Also write the table to this JSON file")
+    args = parser.parse_args()
+
+    files = find_profiles(args.paths)
+    if not files:
+        print("No profiles found")
+        return 1
+    profiles = summarize(files, args.step)
+    print(f"Merged {len(files)} profile(s)")
+    print_table(profiles, args.step, args.top)
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump({"step": args.step, "files": len(files),
+                       "quantiles": list(_QUANTILES),
+                       "components": [vars(p) for p in profiles]}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
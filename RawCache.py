@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Node-local read-through cache of raw input files.
+
+Every iteration reads the same raw files from EOS. A reco job that lands on
+a machine where an earlier job already read its file can read a local copy
+instead. fetch() returns the cached copy of a source file, copying it into
+the cache first if needed:
+
+    <cache>/<key>/<name>  copy of the source file, under its own name
+    <cache>/<key>.json    source path, size and mtime, optional adler32
+    <cache>/<key>.lock    held while the entry is filled or checked
+    <cache>/<key>.use     shared lock of every job reading the copy
+    <cache>/.lock         held while space is reserved (eviction)
+
+An entry is valid while the source still has the size and mtime recorded
+at fill time; with checksum=True the copy's adler32 is also verified on
+every hit. The metadata file's mtime records the last use, and the least
+recently used entries are evicted to stay below the size cap. Any error
+falls back to the source path.
+
+A job gets a path from fetch() long before Athena opens it, so the copy
+must not disappear in between: the job takes a shared flock on
+``<key>.use`` (runAlignment.sh, held until it exits) and reads the source
+instead if the copy is gone by then. Eviction and refills take that lock
+exclusively without waiting and skip entries in use.
+
+Usage:
+    RawCache.py fetch <CACHE_DIR> <SOURCE>... [--max-gb 50] [--checksum]
+    RawCache.py status <CACHE_DIR>
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Optional
+
+_CHUNK = 8 * 1024 ** 2
+
+
+def adler32(path: Path) -> str:
+    """Adler-32 of a file as 8 hex digits, the checksum EOS stores."""
+    value = 1
+    with open(path, 'rb') as f:
+        while chunk := f.read(_CHUNK):
+            value = zlib.adler32(chunk, value)
+    return f"{value:08x}"
+
+
+class _Lock:
+    """Exclusive flock on a lock file for the duration of a with block.
+
+    With blocking=False the lock is only taken if it is free; ``held``
+    tells whether it was.
+    """
+
+    def __init__(self, path: Path, blocking: bool = True):
+        self.path = path
+        self.blocking = blocking
+        self.held = False
+
+    def __enter__(self):
+        self.file = open(self.path, 'a')
+        try:
+            fcntl.flock(self.file, fcntl.LOCK_EX | (0 if self.blocking else fcntl.LOCK_NB))
+            self.held = True
+        except BlockingIOError:
+            pass
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+
+
+class RawCache:
+    """Size-capped LRU cache directory of raw files."""
+
+    def __init__(self, root: Path, max_bytes: int, checksum: bool = False):
+        """
+        Initialize cache.
+
+        Args:
+            root: Cache directory on local disk, created if missing.
+            max_bytes: Size cap of all cached copies.
+            checksum: Also verify the adler32 of a copy on every hit.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.checksum = checksum
+
+    # ---------------------------- Entries ---------------------------- #
+
+    def key(self, src: Path) -> str:
+        """Entry name of a source file, a hash of its path."""
+        return hashlib.sha1(str(src).encode()).hexdigest()[:16]
+
+    def _data(self, key: str) -> Optional[Path]:
+        """The cached copy of an entry, None if there is none."""
+        files = list((self.root / key).glob("*"))
+        return files[0] if len(files) == 1 else None
+
+    def _read_meta(self, meta: Path) -> Optional[dict]:
+        try:
+            with open(meta) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _valid(self, data: Path, meta: Path, src_stat: os.stat_result) -> bool:
+        """Whether a cached copy still matches its source."""
+        info = self._read_meta(meta)
+        if info is None or not data.is_file():
+            return False
+        if info.get("size") != src_stat.st_size or info.get("mtime") != src_stat.st_mtime_ns:
+            return False
+        if data.stat().st_size != src_stat.st_size:
+            return False
+        if self.checksum and info.get("adler32") != adler32(data):
+            return False
+        return True
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        """(last use, size, key) of all complete entries."""
+        found = []
+        for meta in self.root.glob("*.json"):
+            data = self._data(meta.stem)
+            try:
+                found.append((meta.stat().st_mtime, data.stat().st_size, meta.stem))
+            except (OSError, AttributeError):
+                continue
+        return found
+
+    def _remove(self, key: str) -> bool:
+        """Remove an entry unless a job is reading it; return whether removed."""
+        # NOTE: Lock files are never removed, another process may hold them.
+        with _Lock(self.root / f"{key}.use", blocking=False) as use:
+            if not use.held:
+                return False
+            try:
+                (self.root / f"{key}.json").unlink()
+            except FileNotFoundError:
+                pass
+            shutil.rmtree(self.root / key, ignore_errors=True)
+            return True
+
+    # ---------------------------- Space ---------------------------- #
+
+    def reserve(self, size: int, keep: str) -> bool:
+        """Evict least recently used entries not in use until size fits under the cap."""
+        if size > self.max_bytes:
+            return False
+        with _Lock(self.root / ".lock"):
+            entries = sorted(e for e in self.entries() if e[2] != keep)
+            used = sum(e[1] for e in entries)
+            for _, entry_size, key in entries:
+                if used + size <= self.max_bytes:
+                    break
+                if self._remove(key):
+                    used -= entry_size
+            # NOTE: Copies still being filled are not counted, concurrent
+            # fills may overshoot the cap by their sizes.
+            return used + size <= self.max_bytes
+
+    # ---------------------------- Fetch ---------------------------- #
+
+    def fetch(self, src: Path) -> Path:
+        """Path to read src from: the cached copy, or src itself on failure."""
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            src_stat = src.stat()
+            key = self.key(src)
+            # NOTE: The copy keeps the source name, which the reco script
+            # parses for the run number and output names.
+            data = self.root / key / src.name
+            meta = self.root / f"{key}.json"
+            # NOTE: Jobs asking for the same file wait for a single fill.
+            with _Lock(self.root / f"{key}.lock"):
+                if self._valid(data, meta, src_stat):
+                    os.utime(meta)
+                    return data
+                # An outdated copy still read by a job is left to it
+                if not self._remove(key) or not self.reserve(src_stat.st_size, key):
+                    return src
+                data.parent.mkdir()
+                tmp = data.with_name(f".{src.name}.{os.getpid()}.part")
+                try:
+                    shutil.copyfile(src, tmp)
+                    os.replace(tmp, data)
+                finally:
+                    if tmp.exists():
+                        tmp.unlink()
+                info = {"source": str(src), "size": src_stat.st_size,
+                        "mtime": src_stat.st_mtime_ns, "filled": time.time()}
+                if self.checksum:
+                    info["adler32"] = adler32(data)
+                tmp_meta = meta.with_name(f".{meta.name}.part")
+                with open(tmp_meta, 'w') as f:
+                    json.dump(info, f, indent=2)
+                os.replace(tmp_meta, meta)
+                return data
+        except OSError as e:
+            print(f"Raw cache: {e}, reading {src} directly", file=sys.stderr)
+            return src
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Node-local cache of raw input files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fetch = sub.add_parser("fetch", help="Print the local path of each source file")
+    fetch.add_argument("cache", type=Path, help="Cache directory")
+    fetch.add_argument("sources", nargs="+", type=Path, help="Source files")
+    fetch.add_argument("--max-gb", type=float, default=50.0,
+                       help="Size cap of the cache in GB (default: 50)")
+    fetch.add_argument("--checksum", action="store_true",
+                       help="Verify the adler32 of cached copies on every hit")
+    status = sub.add_parser("status", help="Show cached files")
+    status.add_argument("cache", type=Path, help="Cache directory")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        cache = RawCache(args.cache, 0)
+        entries = sorted(cache.entries(), reverse=True) if args.cache.is_dir() else []
+        for last_use, size, key in entries:
+            age = time.time() - last_use
+            print(f"{key:<50s} {size / 1024 ** 2:10.1f} MB  used {age / 3600:6.1f} h ago")
+        print(f"{len(entries)} file(s), {sum(e[1] for e in entries) / 1024 ** 3:.2f} GB")
+        return 0
+
+    cache = RawCache(args.cache, int(args.max_gb * 1024 ** 3), checksum=args.checksum)
+    for src in args.sources:
+        print(cache.fetch(src))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
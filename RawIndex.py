@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Event offset index of FASER raw bytestream files.
+
+A raw file is a plain sequence of events, each starting with an event
+header (little endian):
+
+    uint8  marker          0xBB
+    uint8  event_tag
+    uint16 trigger_bits
+    uint16 version_number
+    uint16 header_size     bytes of this header
+    uint32 payload_size    bytes of the fragments following it
+    ...
+
+so one pass over the headers finds every event boundary. The index stores
+the source size and the size of every event as uint32, 4 bytes per event:
+
+    b"FASERIDX" uint64 source_size uint32 count uint32 sizes[count]
+
+With it, an event range of a raw file is a byte range: slice_events() copies
+events [skip, skip + nevents) into a new, valid raw file, so a shard reads
+only its own events instead of decoding all skipped ones. Indexes also
+give exact event counts to the job planner.
+
+Usage:
+    RawIndex.py build <RAW>... --out-dir <DIR>
+    RawIndex.py count <INDEX>...
+    RawIndex.py slice <INDEX> <RAW> <SKIP> <NEVENTS> <OUT>
+"""
+
+import argparse
+import os
+import struct
+import sys
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import accumulate
+from pathlib import Path
+from typing import Optional
+
+EVENT_MARKER = 0xBB
+_MAGIC = b"FASERIDX"
+_FILE_HEADER = struct.Struct("<8sQI")
+# marker, event_tag, trigger_bits, version_number, header_size, payload_size
+_EVENT_HEADER = struct.Struct("<BBHHHI")
+_BUFFER = 4 * 1024 ** 2
+_CHUNK = 8 * 1024 ** 2
+
+
+@dataclass(frozen=True)
+class RawIndex:
+    """Event sizes of one raw file."""
+    source_size: int
+    sizes:       array
+
+    @property
+    def count(self) -> int:
+        return len(self.sizes)
+
+    def offsets(self) -> list[int]:
+        """Start offset of every event, followed by the end of the last."""
+        return [0, *accumulate(self.sizes)]
+
+    def byte_range(self, skip: int, nevents: int) -> tuple[int, int]:
+        """Byte range of events [skip, skip + nevents), nevents -1 for all."""
+        end = self.count if nevents < 0 else min(self.count, skip + nevents)
+        offsets = self.offsets()
+        if skip >= end:
+            raise ValueError(f"No events in range skip={skip}, nevents={nevents} "
+                             f"of {self.count}")
+        return offsets[skip], offsets[end]
+
+
+def scan(raw: Path) -> RawIndex:
+    """
+    Walk the event headers of a raw file.
+
+    A truncated last event is left out of the index.
+
+    Raises:
+        ValueError: If an event does not start with the event marker.
+    """
+    sizes = array('I')
+    source_size = raw.stat().st_size
+    pos = 0
+    with open(raw, 'rb', buffering=_BUFFER) as f:
+        while pos + _EVENT_HEADER.size <= source_size:
+            f.seek(pos)
+            marker, _, _, _, header_size, payload_size = _EVENT_HEADER.unpack(
+                f.read(_EVENT_HEADER.size))
+            if marker != EVENT_MARKER:
+                raise ValueError(f"{raw}: no event marker at offset {pos} "
+                                 f"(0x{marker:02X})")
+            size = header_size + payload_size
+            if pos + size > source_size:
+                print(f"Warning: {raw}: truncated event at offset {pos}, ignored")
+                break
+            sizes.append(size)
+            pos += size
+    return RawIndex(source_size=source_size, sizes=sizes)
+
+
+def write(index: RawIndex, path: Path) -> None:
+    """Write an index atomically."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.part")
+    sizes = array('I', index.sizes)
+    if sys.byteorder != "little":
+        sizes.byteswap()
+    with open(tmp, 'wb') as f:
+        f.write(_FILE_HEADER.pack(_MAGIC, index.source_size, index.count))
+        f.write(sizes.tobytes())
+    os.replace(tmp, path)
+
+
+def read(path: Path) -> RawIndex:
+    """
+    Read an index.
+
+    Raises:
+        ValueError: If the file is not a complete index.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(_FILE_HEADER.size)
+        if len(header) != _FILE_HEADER.size:
+            raise ValueError(f"{path}: not an event index")
+        magic, source_size, count = _FILE_HEADER.unpack(header)
+        if magic != _MAGIC:
+            raise ValueError(f"{path}: not an event index")
+        sizes = array('I')
+        sizes.frombytes(f.read())
+    if sys.byteorder != "little":
+        sizes.byteswap()
+    if len(sizes) != count:
+        raise ValueError(f"{path}: {len(sizes)} of {count} events")
+    return RawIndex(source_size=source_size, sizes=sizes)
+
+
+def load(path: Path, raw: Optional[Path] = None) -> Optional[RawIndex]:
+    """Read an index, None if missing, unreadable or stale for raw."""
+    try:
+        index = read(path)
+        if raw is not None and raw.stat().st_size != index.source_size:
+            return None
+        return index
+    except (OSError, ValueError):
+        return None
+
+
+def build_all(raws: dict[str, Path], indexes: dict[str, Path],
+              max_workers: int = 8) -> dict[str, int]:
+    """
+    Build missing or stale indexes in parallel.
+
+    Args:
+        raws: Raw file path per file label.
+        indexes: Index path per file label.
+        max_workers: Number of files scanned at once.
+
+    Returns:
+        Event count per label whose index exists or could be built.
+    """
+    def one(label: str) -> Optional[int]:
+        raw, path = raws[label], indexes[label]
+        index = load(path, raw)
+        if index is None:
+            try:
+                index = scan(raw)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                write(index, path)
+            except (OSError, ValueError) as e:
+                print(f"Warning: cannot index {raw}: {e}")
+                return None
+        return index.count
+
+    labels = list(raws)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        counts = dict(zip(labels, pool.map(one, labels)))
+    return {label: n for label, n in counts.items() if n is not None}
+
+
+def slice_events(index: RawIndex, raw: Path, skip: int, nevents: int,
+                 out: Path) -> int:
+    """
+    Copy events [skip, skip + nevents) of raw into out.
+
+    Returns:
+        Number of events written.
+
+    Raises:
+        ValueError: If the index does not match raw or the range is empty.
+    """
+    if raw.stat().st_size != index.source_size:
+        raise ValueError(f"Index is stale for {raw}")
+    start, end = index.byte_range(skip, nevents)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(f".{out.name}.part")
+    with open(raw, 'rb') as src, open(tmp, 'wb') as dst:
+        src.seek(start)
+        left = end - start
+        while left > 0:
+            chunk = src.read(min(_CHUNK, left))
+            if not chunk:
+                raise ValueError(f"{raw} ended before offset {end}")
+            dst.write(chunk)
+            left -= len(chunk)
+    os.replace(tmp, out)
+    return (index.count if nevents < 0 else min(index.count, skip + nevents)) - skip
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Event offset index of FASER raw files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Index raw files")
+    build.add_argument("raws", nargs="+", type=Path, help="Raw files")
+    build.add_argument("--out-dir", type=Path, required=True, help="Index directory")
+    build.add_argument("-j", "--jobs", type=int, default=8,
+                       help="Files scanned in parallel (default: 8)")
+    count = sub.add_parser("count", help="Print the event count of indexes")
+    count.add_argument("indexes", nargs="+", type=Path, help="Index files")
+    cut = sub.add_parser("slice", help="Copy an event range into a new raw file")
+    cut.add_argument("index", type=Path, help="Index of the raw file")
+    cut.add_argument("raw", type=Path, help="Raw file")
+    cut.add_argument("skip", type=int, help="Events to skip")
+    cut.add_argument("nevents", type=int, help="Events to copy, -1 for all remaining")
+    cut.add_argument("out", type=Path, help="Output raw file")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        raws = {raw.name: raw for raw in args.raws}
+        indexes = {raw.name: args.out_dir / f"{raw.stem}.idx" for raw in args.raws}
+        counts = build_all(raws, indexes, max_workers=args.jobs)
+        for name in raws:
+            print(f"{name:<40s} {counts.get(name, 'failed')}")
+        return 0 if len(counts) == len(raws) else 1
+    if args.command == "count":
+        status = 0
+        for path in args.indexes:
+            index = load(path)
+            print(f"{path.name:<40s} {index.count if index else 'unreadable'}")
+            status |= index is None
+        return status
+
+    try:
+        written = slice_events(read(args.index), args.raw, args.skip,
+                               args.nevents, args.out)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Wrote {written} events to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
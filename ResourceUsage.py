@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Measured resource usage of finished jobs, read from HTCondor user logs.
+
+Every "Job terminated" event (code 005) of a user log ends with a
+partitionable resources table:
+
+    Partitionable Resources :    Usage  Request Allocated
+       Cpus                 :     0.98        2         2
+       Disk (KB)            :   812345  8388608   8400000
+       Memory (MB)          :     2311     4096      4096
+
+parse_user_log() collects the Usage column of these tables, and
+recommend() turns many of them into submit requests at a percentile with
+headroom, so jobs stop asking for far more memory than they use.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+# Header and rows of the resources table; a row whose usage is empty has
+# one value fewer than the header has columns
+_HEADER = re.compile(r"^\s*Partitionable Resources\s*:(.*)$")
+_ROW = re.compile(r"^\s*(Cpus|Disk \(KB\)|Memory \(MB\))\s*:(.*)$")
+
+
+@dataclass(frozen=True)
+class Usage:
+    """Usage of one terminated job."""
+    cpus:      Optional[float]
+    memory_mb: Optional[float]
+    disk_kb:   Optional[float]
+
+
+@dataclass(frozen=True)
+class Requests:
+    """Submit file resource requests."""
+    cpus:      int
+    memory_mb: int
+    disk_kb:   int
+
+    def template_fields(self) -> dict[str, str]:
+        """Values for the request_* placeholders of the submit templates."""
+        return dict(request_cpus=str(self.cpus),
+                    request_memory=format_size(self.memory_mb * 1024),
+                    request_disk=format_size(self.disk_kb))
+
+
+def format_size(kb: int) -> str:
+    """Format a size in KB with the largest unit that divides it."""
+    for unit, factor in (("GB", 1024 ** 2), ("MB", 1024)):
+        if kb % factor == 0:
+            return f"{kb // factor} {unit}"
+    return f"{kb} KB"
+
+
+def parse_user_log(path: Path) -> list[Usage]:
+    """
+    Parse all terminated events of a user log.
+
+    Events are separated by lines of "...". Logs that cannot be read
+    yield no records.
+    """
+    try:
+        with open(path, 'r', errors='replace') as f:
+            text = f.read()
+    except OSError:
+        return []
+    usages = []
+    for event in text.split("\n...\n"):
+        event = event.lstrip("\n")
+        if not event.startswith("005 "):
+            continue
+        values: dict[str, float] = {}
+        columns = 0
+        for line in event.splitlines():
+            header = _HEADER.match(line)
+            if header:
+                columns = len(header.group(1).split())
+                continue
+            match = _ROW.match(line)
+            if match:
+                row = match.group(2).split()
+                if columns and len(row) == columns:
+                    values[match.group(1)] = float(row[0])
+        if values:
+            usages.append(Usage(cpus=values.get("Cpus"),
+                                memory_mb=values.get("Memory (MB)"),
+                                disk_kb=values.get("Disk (KB)")))
+    return usages
+
+
+def collect(logs: Iterable[Path]) -> list[Usage]:
+    """Parse many user logs into one list of records."""
+    usages = []
+    for path in logs:
+        usages.extend(parse_user_log(path))
+    return usages
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Percentile q (0-100) with linear interpolation between ranks."""
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def recommend(usages: list[Usage], default: Requests, q: float,
+              headroom: float, min_samples: int) -> tuple[Requests, int]:
+    """
+    Derive requests from measured usage.
+
+    Memory and disk are set to the q-th percentile times (1 + headroom).
+    CPUs are the percentile rounded up, without headroom, since a job cannot
+    use a fraction of a core more. Resources with fewer than min_samples
+    measurements keep their default.
+
+    Returns:
+        Tuple of (requests, number of records used).
+    """
+    def pick(values: list[Optional[float]], fallback: int,
+             scale: float, unit: int) -> int:
+        measured = [v for v in values if v is not None]
+        if len(measured) < min_samples:
+            return fallback
+        # Round up to whole units so the request stays readable
+        return max(unit, math.ceil(percentile(measured, q) * scale / unit) * unit)
+
+    scale = 1 + headroom
+    requests = Requests(
+        cpus=pick([u.cpus for u in usages], default.cpus, 1.0, 1),
+        memory_mb=pick([u.memory_mb for u in usages], default.memory_mb, scale, 128),
+        disk_kb=pick([u.disk_kb for u in usages], default.disk_kb, scale, 1024),
+    )
+    return requests, len(usages)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+"""
+Slim kfalignment files down to the branches millepede reads.
+
+The CKF alignment writer fills the kfalignment ``tree`` with every fit
+parameter it has. The millepede conversion (millepede/src/main.cpp,
+convert2mille_v2_ss.C) reads only the branches in SLIM_BRANCHES, and the
+chi2 monitoring (Analysis/draw_chi2_hist.py) adds ``fitParam_ndf``.
+slim() rewrites a file with only those branches, LZ4 compressed and with
+large baskets, since the conversion reads every entry in order.
+
+Branches keep their double precision: the readers bind them with
+SetBranchAddress to ``double`` and ``std::vector<double>*``, which ROOT
+refuses for float branches, and residuals and derivatives of micrometre
+size would lose digits millepede needs in float.
+
+tag_sources() adds the ``source_index`` branch to the output of a job
+reading several raw files in one event loop: the position of the entry's
+input file in the job's ``-inputs.json``. slim() keeps it.
+
+Used by faser_reco_alignment.py (``--alignmentSlim``, several inputs).
+
+Usage:
+    SlimOutput.py <KFALIGNMENT_ROOT>...
+"""
+
+import os
+import sys
+from pathlib import Path
+
+TREE = "tree"
+SLIM_BRANCHES = (
+    "fitParam_x",
+    "fitParam_y",
+    "fitParam_chi2",
+    "fitParam_ndf",
+    "fitParam_px",
+    "fitParam_py",
+    "fitParam_pz",
+    "fitParam_charge",
+    "fitParam_align_id",
+    "fitParam_align_global_derivation_y_x",
+    "fitParam_align_global_derivation_y_y",
+    "fitParam_align_global_derivation_y_z",
+    "fitParam_align_global_derivation_y_rx",
+    "fitParam_align_global_derivation_y_ry",
+    "fitParam_align_global_derivation_y_rz",
+    "fitParam_align_local_derivation_x_x",
+    "fitParam_align_local_derivation_x_y",
+    "fitParam_align_local_derivation_x_z",
+    "fitParam_align_local_derivation_x_rx",
+    "fitParam_align_local_derivation_x_ry",
+    "fitParam_align_local_derivation_x_rz",
+    "fitParam_align_local_residual_x",
+    "fitParam_align_local_measured_x",
+    "fitParam_align_local_measured_xe",
+    "fitParam_align_local_derivation_x_par_x",
+    "fitParam_align_local_derivation_x_par_y",
+    "fitParam_align_local_derivation_x_par_theta",
+    "fitParam_align_local_derivation_x_par_phi",
+    "fitParam_align_local_derivation_x_par_qop",
+    # Not read by millepede, tags the entries of a merged output
+    "source_index",
+)
+SOURCE_BRANCH = "source_index"
+# LZ4 decompresses several times faster than the default ZLIB
+_COMPRESSION_LEVEL = 4
+# Entries per basket cluster, few large reads for the sequential conversion
+_AUTO_FLUSH = 10000
+
+
+def slim(path: Path) -> tuple[int, int]:
+    """
+    Rewrite a kfalignment file with only SLIM_BRANCHES, in place.
+
+    Returns:
+        Tuple of (size before, size after) in bytes.
+
+    Raises:
+        RuntimeError: If the file has no kfalignment tree.
+    """
+    import ROOT
+
+    before = path.stat().st_size
+    df = ROOT.RDataFrame(TREE, str(path))
+    present = set(str(name) for name in df.GetColumnNames())
+    if not present:
+        raise RuntimeError(f"No {TREE} in {path}")
+    columns = ROOT.std.vector["std::string"]()
+    for name in SLIM_BRANCHES:
+        if name in present:
+            columns.push_back(name)
+
+    opts = ROOT.RDF.RSnapshotOptions()
+    opts.fCompressionAlgorithm = ROOT.RCompressionSetting.EAlgorithm.kLZ4
+    opts.fCompressionLevel = _COMPRESSION_LEVEL
+    opts.fAutoFlush = _AUTO_FLUSH
+    tmp = path.with_name(f"{path.name}.slim.part")
+    df.Snapshot(TREE, str(tmp), columns, opts)
+    os.replace(tmp, path)
+    return before, path.stat().st_size
+
+
+def tag_sources(path: Path, entry_ends: list[int]) -> None:
+    """
+    Add SOURCE_BRANCH to a kfalignment file, in place.
+
+    Entry i gets the index of the first input whose entry_ends value, the
+    number of entries written up to the end of that input, exceeds i.
+
+    Raises:
+        RuntimeError: If the file has no kfalignment tree, or its entry
+            count is not the last entry_ends value.
+    """
+    import ROOT
+
+    df = ROOT.RDataFrame(TREE, str(path))
+    columns = ROOT.std.vector["std::string"]()
+    for name in df.GetColumnNames():
+        columns.push_back(str(name))
+    if columns.empty():
+        raise RuntimeError(f"No {TREE} in {path}")
+    entries = df.Count().GetValue()
+    if not entry_ends or entries != entry_ends[-1]:
+        raise RuntimeError(f"{path} has {entries} entries, the inputs end at {entry_ends}")
+    index = str(len(entry_ends) - 1)
+    for i in reversed(range(len(entry_ends) - 1)):
+        index = f"rdfentry_ < {entry_ends[i]} ? {i} : ({index})"
+    columns.push_back(SOURCE_BRANCH)
+
+    tmp = path.with_name(f"{path.name}.tag.part")
+    df.Define(SOURCE_BRANCH, f"(int)({index})").Snapshot(TREE, str(tmp), columns)
+    os.replace(tmp, path)
+
+
+def main() -> int:
+    if len(sys.argv) < 2:
+        print("Usage: SlimOutput.py <KFALIGNMENT_ROOT>...")
+        return 2
+    for name in sys.argv[1:]:
+        before, after = slim(Path(name))
+        print(f"{name}: {before / 1024 ** 2:.1f} MB -> {after / 1024 ** 2:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
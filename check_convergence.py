@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+DAG POST script: stop iterating once alignment constants stop moving.
+
+Runs after each millepede node. Compares the constants the iteration
+started from with the ones millepede produced, using the keyed 6-parameter
+model of InputAlign, and checks the largest change of every hierarchy level
+against its tolerance. When all levels are within tolerance the script
+exits with a dedicated code that the DAG maps to ABORT-DAG-ON ... RETURN 0.
+Unreadable constants count as "not converged", never as a failure.
+
+Usage:
+    check_convergence.py <RETURN> <OLD> <NEW> --tol layer=1e-3,1e-5 ...
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "smalltask"))
+from InputAlign import InputAlign  # noqa: E402
+
+# Hierarchy level of a component key, by number of digits
+LEVELS = {1: "station", 2: "layer", 3: "module", 4: "side"}
+
+
+def parse_tolerance(text: str) -> tuple[str, tuple[float, float]]:
+    """Parse ``level=translation,rotation``."""
+    try:
+        level, values = text.split('=')
+        trans, rot = (float(v) for v in values.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Invalid tolerance {text!r}, expected level=translation,rotation")
+    if level not in LEVELS.values():
+        raise argparse.ArgumentTypeError(
+            f"Unknown level {level!r}, expected one of {list(LEVELS.values())}")
+    return level, (trans, rot)
+
+
+def max_deltas(old: InputAlign, new: InputAlign) -> dict[str, tuple[float, float]]:
+    """
+    Largest |translation| and |rotation| change per hierarchy level.
+
+    Components missing from old count as nominal (all zero): iteration 0
+    starts from the empty template.
+    """
+    result: dict[str, tuple[float, float]] = {}
+    old_data = old.to_dict()
+    for key, params in new.to_dict().items():
+        level = LEVELS.get(len(key))
+        if level is None:
+            continue
+        delta = [p - q for p, q in zip(params, old_data.get(key, (0.0,) * 6))]
+        trans = max(abs(p) for p in delta[:3])
+        rot = max(abs(p) for p in delta[3:])
+        prev_trans, prev_rot = result.get(level, (0.0, 0.0))
+        result[level] = (max(prev_trans, trans), max(prev_rot, rot))
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Check convergence of alignment constants (DAG POST script)")
+    parser.add_argument('ret', type=int,
+                        help='Return value of the node job ($RETURN)')
+    parser.add_argument('old', type=Path, help='Constants the iteration started from')
+    parser.add_argument('new', type=Path, help='Constants produced by millepede')
+    parser.add_argument('--tol', type=parse_tolerance, action='append', default=[],
+                        help='Tolerance per level: level=translation_mm,rotation_rad')
+    parser.add_argument('--converged-code', type=int, default=42,
+                        help='Exit code signalling convergence (default: 42)')
+    args = parser.parse_args()
+
+    # Propagate failure of the millepede job itself
+    if args.ret != 0:
+        return args.ret
+    if not args.tol:
+        return 0
+
+    try:
+        old = InputAlign(args.old)
+        new = InputAlign(args.new)
+        deltas = max_deltas(old, new)
+    except (FileNotFoundError, ValueError) as e:
+        # NOTE: A failed check must not fail the millepede node, it only
+        # means the iterations continue.
+        print(f"Warning: cannot check convergence, continuing: {e}")
+        return 0
+
+    converged = True
+    for level, (tol_trans, tol_rot) in dict(args.tol).items():
+        if level not in deltas:
+            print(f"{level:8s}: no components, skipped")
+            continue
+        trans, rot = deltas[level]
+        ok = trans <= tol_trans and rot <= tol_rot
+        converged = converged and ok
+        print(f"{level:8s}: max|dT| = {trans:.3e} (tol {tol_trans:.1e}), "
+              f"max|dR| = {rot:.3e} (tol {tol_rot:.1e}) "
+              f"{'OK' if ok else 'MOVING'}")
+
+    if converged:
+        print("Alignment constants converged, stopping remaining iterations.")
+        return args.converged_code
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
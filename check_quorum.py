@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+DAG PRE script: let millepede start once enough reco outputs exist.
+
+With a quorum configured, millepede does not have its reco jobs as DAG
+parents. Instead this script runs before it and counts the
+``kfalignment_*.root`` files of the iteration. Below the quorum it exits
+with the DEFER code, so DAGMan re-runs it after the poll interval. Once
+the quorum is reached it writes a marker listing the outputs present at
+that moment into the kfalign directory. runAlignment.sh checks the marker
+and drops outputs of late jobs, but a job that checked just before the
+marker was written may still rename its output into the directory, so
+runMillepede.sh reads only the files listed in the marker. Outputs of an
+earlier run are moved aside by dag_manager.py when a new run starts.
+
+Usage:
+    check_quorum.py <KFALIGN_DIR> <REQUIRED> <TOTAL> --timeout 86400
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Records when the script first ran for an iteration, for the timeout
+WAIT_STAMP = ".quorum_wait"
+MARKER = ".quorum"
+
+
+def write_marker(marker: Path, outputs: list[str], total: int) -> None:
+    """Atomically write the marker listing outputs included in the iteration."""
+    content = json.dumps({"files": outputs, "total": total,
+                          "time": time.strftime("%Y-%m-%d %H:%M:%S")}, indent=2)
+    fd, tmp = tempfile.mkstemp(dir=marker.parent, prefix=f"{marker.name}.")
+    with os.fdopen(fd, 'w') as f:
+        f.write(content)
+    os.replace(tmp, marker)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Check the reco quorum of an iteration (DAG PRE script)")
+    parser.add_argument('kfalign_dir', type=Path,
+                        help='Directory collecting kfalignment_*.root outputs')
+    parser.add_argument('required', type=int, help='Number of outputs needed')
+    parser.add_argument('total', type=int, help='Number of reco jobs')
+    parser.add_argument('--timeout', type=int, default=86400,
+                        help='Fail after waiting this many seconds (default: 86400)')
+    parser.add_argument('--defer-code', type=int, default=75,
+                        help='Exit code asking DAGMan to run the script later (default: 75)')
+    args = parser.parse_args()
+
+    marker = args.kfalign_dir / MARKER
+    if marker.is_file():
+        print(f"Quorum already reached: {marker}")
+        return 0
+
+    outputs = sorted(p.name for p in args.kfalign_dir.glob("kfalignment_*.root"))
+    if len(outputs) >= args.required:
+        write_marker(marker, outputs, args.total)
+        print(f"Quorum reached: {len(outputs)}/{args.total} reco outputs "
+              f"(required {args.required}), ignoring late jobs.")
+        return 0
+
+    stamp = args.kfalign_dir / WAIT_STAMP
+    if not stamp.exists():
+        stamp.touch()
+    waited = time.time() - stamp.stat().st_mtime
+    if waited > args.timeout:
+        print(f"Error: quorum not reached after {waited:.0f} s: "
+              f"{len(outputs)}/{args.total} reco outputs (required {args.required})")
+        return 1
+
+    print(f"Waiting for quorum: {len(outputs)}/{args.total} reco outputs "
+          f"(required {args.required})")
+    return args.defer_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,180 +7,534 @@ replacing the daemon-based approach with a more robust DAGman-based solution.
 """
 
 import argparse
-import shutil
+import subprocess
+import time
 from pathlib import Path
+from typing import Iterator, Optional
 
-from AlignmentConfig import AlignmentConfig
 import ColorfulPrint
+import RawIndex
+from AlignmentConfig import AlignmentConfig
+from ArtifactWriter import ArtifactWriter
+from CompiledConfig import CompiledConfig, IterPaths
+from DAGGraph import DAGNode, emit_dag
+from EnvSnapshot import capture, usable
+from LocalExecutor import LocalExecutor
+from Planner import Plan, Planner
+from ResourceUsage import Requests, collect, recommend
 
 # Test: python3 dag_manager.py --submit
 
-# TODO: 运行前检查 config.json 中的路径是否存在，以及各种语法合理性
-# TODO: 支持断点执行
 class DAGManager:
     """Manages HTCondor DAG generation for alignment workflow."""
     
-    def __init__(self, config: AlignmentConfig):
+    _RECO_RETRY = 2
+    _MILLE_RETRY = 1
+    _COND_RETRY = 2
+    # POST script exit code meaning "converged, stop the DAG successfully"
+    _CONVERGED_EXIT = 42
+    # Requests used when no usage has been measured yet
+    _RECO_REQUESTS = Requests(cpus=2, memory_mb=4096, disk_kb=8 * 1024 ** 2)
+    _MILLE_REQUESTS = Requests(cpus=1, memory_mb=2048, disk_kb=2 * 1024 ** 2)
+    # PRE script exit code meaning "quorum not reached yet, run me later"
+    _QUORUM_DEFER = 75
+    # Outputs of an earlier run, set aside below the kfalign directory
+    _STALE_DIR = "stale_{time}"
+    # Environment setups of the job scripts, captured by create_env_snapshots()
+    _CALYPSO_SETUP = ("export ATLAS_LOCAL_ROOT_BASE=/cvmfs/atlas.cern.ch/repo/ATLASLocalRootBase\n"
+                      "source ${{ATLAS_LOCAL_ROOT_BASE}}/user/atlasLocalSetup.sh\n"
+                      "asetup --input={asetup} Athena,24.0.41\n"
+                      "source {setup}")
+    _PEDE_SETUP = 'export PATH="{pede}:$PATH"\nsource {root}'
+    # Checks that a setup worked, asetup can fail with status 0
+    _CALYPSO_VERIFY = '[ -n "$AtlasVersion" ] && command -v athena.py'
+    _PEDE_VERIFY = 'command -v pede && command -v root'
+    
+    def __init__(self, config: AlignmentConfig, resume: bool = False):
         """
         Initialize DAG manager.
         
         Args:
             config: AlignmentConfig instance
+            resume: Skip iterations whose outputs are already complete
+        
+        Raises:
+            FileNotFoundError: If required paths don't exist
+            TypeError: If configuration values have incorrect types
+            ValueError: If configuration values are invalid
         """
         self.config = config
+        # NOTE: Indexes are only read here (build_indexes() writes them before
+        # generation); their exact event counts feed the planner and
+        # event-range sharding.
+        event_counts = self.read_indexes() if config.raw_index else None
+        # NOTE: The planner stats raw files, so it runs before compile() and
+        # its tasks replace the ones derived from the raw section.
+        policy = config.plan_policy
+        self.plan: Optional[Plan] = None
+        if policy is not None:
+            self.plan = Planner(policy).plan(config.year, config.run,
+                                             tuple(config.files), event_counts)
+        # NOTE: All generation steps read from the compiled snapshot, which
+        # validates paths once and holds every per-iteration path in tables.
+        self.snap: CompiledConfig = config.compile(
+            self.plan.tasks if self.plan is not None else None, event_counts)
+        # NOTE: Generated files are staged in memory and written by flush().
+        self.writer = ArtifactWriter(self.snap.dag_dir / ".artifacts.json")
+        # First iteration to put into the DAG
+        self.start: int = self.first_incomplete() if resume else 0
+    
+    def read_indexes(self) -> dict[str, int]:
+        """Event counts per file of the existing, up-to-date indexes."""
+        raws = self.config.raw_paths()
+        counts = {}
+        for file_str, path in self.config.index_paths().items():
+            index = RawIndex.load(path, raws[file_str])
+            if index is not None:
+                counts[file_str] = index.count
+        return counts
+    
+    # ================================ Resume ================================
+    
+    def iteration_done(self, ip: IterPaths) -> bool:
+        """Check an iteration produced all reco outputs and new constants."""
+        if not ip.constants_out.is_file():
+            return False
+        if self.snap.dag_quorum is not None and ip.quorum_marker.is_file():
+            return True
+        return all(ip.reco[file_str].output.is_file()
+                   for file_str in self.snap.tasks)
+    
+    def first_incomplete(self) -> int:
+        """Index of the first iteration without complete outputs."""
+        for ip in self.snap:
+            if not self.iteration_done(ip):
+                return ip.iteration
+        return self.snap.iters
+    
+    @property
+    def active(self) -> tuple[IterPaths, ...]:
+        """Iterations that are put into the DAG."""
+        return self.snap.iterations[self.start:]
     
     def archive_config(self) -> None:
         """Archive the config file to the data directory."""
         self.config.archive()
 
     def validate_paths(self) -> None:
-        """Validate necessary paths exist."""
-        _ = self.config.src_dir
-        _ = self.config.tpl_dir
-        _ = self.config.tpl_inputforalign
-        _ = self.config.tpl_recosub
-        _ = self.config.tpl_recoexe
-        _ = self.config.tpl_millesub
-        _ = self.config.tpl_milleexe
-        _ = self.config.env_calypso_asetup
-        _ = self.config.env_calypso_setup
-        _ = self.config.env_pede
-        _ = self.config.env_root
+        """Validate necessary paths exist (already done by compile)."""
+        _ = self.snap.src_dir
 
     def create_data_dirs(self) -> None:
         """Create data directories for all iterations."""
-        _ = self.config.data_dir
-        for it in range(self.config.iters):
-            _ = self.config.data_iter_dir(it)
-            _ = self.config.reco_dir(it)
-            _ = self.config.kfalign_dir(it)
-            _ = self.config.millepede_dir(it)
+        for path in self.snap.data_dirs():
+            path.mkdir(parents=True, exist_ok=True)
+    
+    def create_env_snapshots(self) -> None:
+        """Capture the job environments once per campaign (dag.env_snapshot).
+
+        A snapshot taken on this OS from the same setup commands is reused.
+        If the setup cannot run here or does not pass its check (release set
+        up, executables on PATH), the snapshot is removed and the jobs fall
+        back to the full setup.
+        """
+        snap = self.snap
+        if not snap.dag_env_snapshot:
+            return
+        setups = {
+            snap.dag_calypsoenv: (self._CALYPSO_SETUP.format(
+                asetup=snap.env_calypso_asetup, setup=snap.env_calypso_setup),
+                self._CALYPSO_VERIFY),
+            snap.dag_pedeenv: (self._PEDE_SETUP.format(
+                pede=snap.env_pede, root=snap.env_root), self._PEDE_VERIFY),
+        }
+        for path, (setup, verify) in setups.items():
+            if usable(path, setup, verify):
+                print(f"Reusing environment snapshot {path}")
+                continue
+            print(f"Capturing environment snapshot {path} ...")
+            try:
+                capture(setup, path, verify)
+            except (OSError, subprocess.CalledProcessError) as e:
+                ColorfulPrint.print_yellow("Warning: ")
+                print(f"cannot capture {path.name} ({e}), jobs run the full setup")
+                path.unlink(missing_ok=True)
+    
+    def reset_quorum(self) -> None:
+        """Remove quorum markers and wait stamps of the active iterations."""
+        for ip in self.active:
+            ip.quorum_marker.unlink(missing_ok=True)
+            ip.quorum_wait.unlink(missing_ok=True)
+    
+    def set_aside_outputs(self) -> None:
+        """Move outputs of an earlier run out of the quorum's way.
+        
+        The quorum counts the outputs in the kfalign directory, so outputs
+        of an earlier run would satisfy it before any reco job of this run
+        finished. Called only when a run starts; the files are moved into a
+        ``stale_<time>`` subdirectory, not removed.
+        """
+        if self.snap.dag_quorum is None:
+            return
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        for ip in self.active:
+            outputs = sorted(ip.kfalign_dir.glob("kfalignment_*"))
+            if not outputs:
+                continue
+            stale = ip.kfalign_dir / self._STALE_DIR.format(time=stamp)
+            stale.mkdir()
+            for output in outputs:
+                output.rename(stale / output.name)
+            ColorfulPrint.print_yellow("Note: ")
+            print(f"moved {len(outputs)} output(s) of an earlier run to {stale}")
     
     def create_dag_dirs(self) -> None:
         """Create DAG working directories for all iterations."""
-        _ = self.config.dag_dir
-        for it in range(self.config.iters):
-            _ = self.config.dag_iter_dir(it)
-            _ = self.config.logs_dir(it)
+        for path in self.snap.dag_dirs():
+            path.mkdir(parents=True, exist_ok=True)
     
     def copy_first_inputforalign(self) -> None:
-        initial = self.config.data_initial
-        if initial.exists():
-            ColorfulPrint.print_yellow(f"Warning: ")
-            print(f"Overwritting initial inputforalign file: {initial}")
-        shutil.copy(self.config.tpl_inputforalign, initial)
+        """
+        Stage initial alignment constants for the first active iteration.
+        
+        A fresh campaign starts from the template. A resumed campaign is
+        seeded with the constants produced by the last complete iteration.
+        """
+        if self.start == 0:
+            self.writer.stage_copy(self.snap.tpl_inputforalign,
+                                   self.snap.data_initial)
+        elif self.start < self.snap.iters:
+            last = self.snap[self.start - 1]
+            self.writer.stage_copy(last.constants_out,
+                                   self.snap[self.start].constants_in)
+    
+    # =============================== Resources ===============================
+    
+    def measured_requests(self, kind: str, pattern: str,
+                          default: Requests) -> Requests:
+        """
+        Derive submit requests of one job kind from earlier user logs.
+        
+        Logs are searched below this campaign's DAG directory (iterations
+        that already ran) and the history directories of the policy.
+        """
+        policy = self.snap.resources
+        if policy is None:
+            return default
+        logs = []
+        for dag_dir in (self.snap.dag_dir, *policy.history):
+            logs.extend(sorted(dag_dir.glob(pattern)))
+        requests, records = recommend(collect(logs), default, policy.percentile,
+                                      policy.headroom, policy.min_samples)
+        fields = requests.template_fields()
+        ColorfulPrint.print_blue("Resources: ")
+        print(f"{kind}: {records} record(s) in {len(logs)} log(s) -> "
+              f"cpus={fields['request_cpus']}, memory={fields['request_memory']}, "
+              f"disk={fields['request_disk']}")
+        return requests
     
     def create_reco_exe_files(self) -> None:
-        """Create reco executable script in DAG directory."""
-        dag_recoexe = self.config.dag_recoexe
-        if dag_recoexe.exists():
-            ColorfulPrint.print_yellow(f"Warning: ")
-            print(f"Overwritting reco executable: {dag_recoexe}")
-        shutil.copy(self.config.tpl_recoexe, dag_recoexe)
+        """Stage reco executable script in DAG directory."""
+        self.writer.stage_copy(self.snap.tpl_recoexe, self.snap.dag_recoexe)
+    
+    def _reco_common(self) -> dict:
+        """Reco template fields shared by every job."""
+        snap = self.snap
+        return dict(
+            year=snap.year,
+            run=snap.run,
+            stations=snap.stations,
+            exe_path=snap.dag_recoexe,
+            src_dir=snap.src_dir,
+            calypso_asetup=snap.env_calypso_asetup,
+            calypso_setup=snap.env_calypso_setup,
+            verbosity=snap.verbosity,
+            **self.measured_requests("reco", snap.dag_recolog_glob,
+                                     self._RECO_REQUESTS).template_fields(),
+        )
+    
+    def _reco_vars(self, ip: IterPaths, file_str: str) -> dict:
+        """Reco template fields that differ between jobs."""
+        paths = ip.reco[file_str]
+        return dict(
+            file_str=file_str,
+            out_path=paths.out,
+            err_path=paths.err,
+            log_path=paths.log,
+            reco_dir=ip.reco_dir,
+            kfalign_dir=ip.kfalign_dir,
+            extra_args=self._reco_options(ip, file_str),
+        )
+    
+    def _reco_options(self, ip: IterPaths, file_str: str) -> str:
+        """Optional runAlignment.sh flags after the positional arguments."""
+        options = []
+        task = self.snap.tasks[file_str]
+        if task.files != (file_str,):
+            options += ["--inputs", ','.join(task.files)]
+        if task.skip or task.nevents != -1:
+            options += ["--skip", str(task.skip), "--nevents", str(task.nevents)]
+        # Shards read only their events, several inputs are tagged with their source
+        if self.snap.indexes and (len(task.files) > 1 or task.skip or task.nevents != -1):
+            options += ["--index", ','.join(str(self.snap.indexes[f]) for f in task.files)]
+        if self.snap.lite:
+            options.append("--lite")
+        if self.snap.slim:
+            options.append("--slim")
+        if self.snap.profile:
+            options.append("--profile")
+        if self.snap.dag_conditions:
+            options += ["--conditions", str(ip.conditions)]
+        if self.snap.clusters:
+            options += ["--clusters", str(self.snap.clusters[file_str])]
+        if self.snap.raw_cache is not None:
+            cache = self.snap.raw_cache
+            options += ["--raw-cache", cache.dir, "--raw-cache-gb", f"{cache.max_gb:g}"]
+            if cache.checksum:
+                options.append("--raw-cache-checksum")
+        if self.snap.dag_env_snapshot:
+            options += ["--env-snapshot", str(self.snap.dag_calypsoenv)]
+        if self.snap.dag_job_config:
+            options += ["--job-config", str(ip.jobconfig_dir)]
+        if self.snap.checkpoint_events is not None:
+            options += ["--checkpoint", str(ip.reco[file_str].checkpoint),
+                        "--checkpoint-events", str(self.snap.checkpoint_events)]
+        if self.snap.event_margin is not None:
+            options += ["--record-events", str(ip.reco[file_str].events)]
+            if ip.iteration > 0:
+                options += ["--event-list", str(self.snap[ip.iteration - 1].reco[file_str].events),
+                            "--event-margin", str(self.snap.event_margin)]
+        return ' '.join(options)
     
     def create_reco_submit_files(self) -> None:
-        """Create reco submit files for all iterations and raw files."""
-        for it in range(self.config.iters):
-            for file_str in self.config.files:
-                with open(self.config.tpl_recosub, 'r') as tpl_file:
-                    tpl_content = tpl_file.read()
-                sub_content = tpl_content.format(
-                    year=self.config.year,
-                    run=self.config.run,
-                    stations=self.config.stations,
-                    file_str=file_str,
-                    exe_path=self.config.dag_recoexe,
-                    out_path=self.config.logs_reco_out(it, file_str),
-                    err_path=self.config.logs_reco_err(it, file_str),
-                    log_path=self.config.logs_reco_log(it, file_str),
-                    reco_dir=self.config.reco_dir(it),
-                    kfalign_dir=self.config.kfalign_dir(it),
-                    src_dir=self.config.src_dir,
-                    calypso_asetup=self.config.env_calypso_asetup,
-                    calypso_setup=self.config.env_calypso_setup,
-                    verbosity=self.config.verbosity,
-                )
-                recosub = self.config.dag_recosub(it, file_str)
-                if recosub.exists():
-                    ColorfulPrint.print_yellow(f"Warning: ")
-                    print(f"Overwritting reco submit file: {recosub}")
-                with open(recosub, 'w') as sub_file:
-                    sub_file.write(sub_content)
+        """Stage reco submit files for all iterations and raw files."""
+        snap = self.snap
+        tpl_content = self.writer.template(snap.tpl_recosub)
+        common = self._reco_common()
+        if snap.dag_vars:
+            # One submit description, per-node values come from DAG VARS
+            macros = {key: f"$({key})" for key in self._reco_vars(snap[0], next(iter(snap.tasks)))}
+            self.writer.stage(snap.dag_recosub,
+                              tpl_content.format(**common, **macros))
+            return
+        for ip in self.active:
+            for file_str in snap.tasks:
+                sub_content = tpl_content.format(**common,
+                                                 **self._reco_vars(ip, file_str))
+                self.writer.stage(ip.reco[file_str].sub, sub_content)
 
     def create_mille_exe_files(self) -> None:
-        """Create millepede executable script in DAG directory."""
-        dag_milleexe = self.config.dag_milleexe
-        if dag_milleexe.exists():
-            ColorfulPrint.print_yellow(f"Warning: ")
-            print(f"Overwritting millepede executable: {dag_milleexe}")
-        shutil.copy(self.config.tpl_milleexe, dag_milleexe)
+        """Stage millepede executable script in DAG directory."""
+        self.writer.stage_copy(self.snap.tpl_milleexe, self.snap.dag_milleexe)
+    
+    def _mille_common(self) -> dict:
+        """Millepede template fields shared by every job."""
+        snap = self.snap
+        return dict(
+            exe_path=snap.dag_milleexe,
+            src_dir=snap.src_dir,
+            env_pede=snap.env_pede,
+            env_root=snap.env_root,
+            env_snapshot=snap.dag_pedeenv if snap.dag_env_snapshot else "",
+            universe=snap.dag_critical.universe if snap.dag_critical else "vanilla",
+            flavour=snap.dag_critical.flavour if snap.dag_critical else "workday",
+            **self.measured_requests("mille", snap.dag_millelog_glob,
+                                     self._MILLE_REQUESTS).template_fields(),
+        )
+    
+    def _mille_vars(self, ip: IterPaths) -> dict:
+        """Millepede template fields that differ between iterations."""
+        snap = self.snap
+        to_next_iter = ip.iteration < snap.iters - 1
+        return dict(
+            out_path=ip.mille_out,
+            err_path=ip.mille_err,
+            log_path=ip.mille_log,
+            to_next_iter=to_next_iter,
+            kfalign_dir=ip.kfalign_dir,
+            next_reco_dir=snap[ip.iteration + 1].reco_dir if to_next_iter else "",
+        )
     
     def create_mille_submit_files(self) -> None:
-        """Create millepede submit files for all iterations."""
-        for it in range(self.config.iters):
-            with open(self.config.tpl_millesub, 'r') as tpl_file:
-                tpl_content = tpl_file.read()
-            sub_content = tpl_content.format(
-                exe_path=self.config.dag_milleexe,
-                out_path=self.config.logs_mille_out(it),
-                err_path=self.config.logs_mille_err(it),
-                log_path=self.config.logs_mille_log(it),
-                to_next_iter=(it < self.config.iters - 1),
-                src_dir=self.config.src_dir,
-                kfalign_dir=self.config.kfalign_dir(it),
-                next_reco_dir=self.config.reco_dir(it + 1) if it < self.config.iters - 1 else "",
-                env_pede=self.config.env_pede,
-                env_root=self.config.env_root
-            )
-            millesub = self.config.dag_millesub(it)
-            if millesub.exists():
-                ColorfulPrint.print_yellow(f"Warning: ")
-                print(f"Overwritting millepede submit file: {millesub}")
-            with open(millesub, 'w') as sub_file:
-                sub_file.write(sub_content)
+        """Stage millepede submit files for all iterations."""
+        snap = self.snap
+        tpl_content = self.writer.template(snap.tpl_millesub)
+        common = self._mille_common()
+        if snap.dag_vars:
+            macros = {key: f"$({key})" for key in self._mille_vars(snap[0])}
+            self.writer.stage(snap.dag_millesub,
+                              tpl_content.format(**common, **macros))
+            return
+        for ip in self.active:
+            sub_content = tpl_content.format(**common, **self._mille_vars(ip))
+            self.writer.stage(ip.mille_sub, sub_content)
 
+    def create_cond_exe_files(self) -> None:
+        """Stage conditions executable script in DAG directory."""
+        if self.snap.dag_conditions:
+            self.writer.stage_copy(self.snap.tpl_condexe, self.snap.dag_condexe)
+    
+    def _cond_common(self) -> dict:
+        """Conditions template fields shared by every iteration."""
+        snap = self.snap
+        return dict(
+            exe_path=snap.dag_condexe,
+            src_dir=snap.src_dir,
+            calypso_asetup=snap.env_calypso_asetup,
+            calypso_setup=snap.env_calypso_setup,
+            env_snapshot=snap.dag_calypsoenv if snap.dag_env_snapshot else "",
+        )
+    
+    def _cond_vars(self, ip: IterPaths) -> dict:
+        """Conditions template fields that differ between iterations."""
+        return dict(
+            out_path=ip.cond_out,
+            err_path=ip.cond_err,
+            log_path=ip.cond_log,
+            constants=ip.constants_in,
+            conditions=ip.conditions,
+        )
+    
+    def create_cond_submit_files(self) -> None:
+        """Stage conditions submit files for all iterations."""
+        snap = self.snap
+        if not snap.dag_conditions:
+            return
+        tpl_content = self.writer.template(snap.tpl_condsub)
+        common = self._cond_common()
+        if snap.dag_vars:
+            macros = {key: f"$({key})" for key in self._cond_vars(snap[0])}
+            self.writer.stage(snap.dag_condsub,
+                              tpl_content.format(**common, **macros))
+            return
+        for ip in self.active:
+            sub_content = tpl_content.format(**common, **self._cond_vars(ip))
+            self.writer.stage(ip.cond_sub, sub_content)
+    
+    def _cond_node(self, ip: IterPaths, parents: tuple[str, ...]) -> DAGNode:
+        """Build the DAG node building the conditions DB of an iteration."""
+        snap = self.snap
+        node = DAGNode(name=ip.cond_job, kind="cond", iteration=ip.iteration,
+                       submit=ip.cond_sub, parents=parents,
+                       retry=self._COND_RETRY, priority=ip.priority)
+        if snap.dag_vars:
+            node.submit = snap.dag_condsub
+            node.vars = self._cond_vars(ip)
+        if "cond" in snap.dag_maxjobs:
+            node.category = "cond"
+        # NOTE: Serial like millepede, so it shares the critical-path boost.
+        if snap.dag_critical is not None:
+            node.priority = (ip.priority or 0) + snap.dag_critical.priority
+        return node
+    
+    def _reco_node(self, ip: IterPaths, file_str: str,
+                   parents: tuple[str, ...]) -> DAGNode:
+        """Build the DAG node of one reconstruction job."""
+        snap = self.snap
+        reco = ip.reco[file_str]
+        node = DAGNode(name=reco.job, kind="reco", iteration=ip.iteration,
+                       submit=reco.sub, parents=parents,
+                       retry=self._RECO_RETRY, priority=ip.priority)
+        if snap.dag_vars:
+            node.submit = snap.dag_recosub
+            node.vars = self._reco_vars(ip, file_str)
+        if "reco" in snap.dag_maxjobs:
+            node.category = "reco"
+        return node
+    
+    def _mille_node(self, ip: IterPaths, parents: tuple[str, ...]) -> DAGNode:
+        """Build the DAG node of one millepede job."""
+        snap = self.snap
+        node = DAGNode(name=ip.mille_job, kind="mille", iteration=ip.iteration,
+                       submit=ip.mille_sub, parents=parents,
+                       retry=self._MILLE_RETRY, priority=ip.priority)
+        if snap.dag_vars:
+            node.submit = snap.dag_millesub
+            node.vars = self._mille_vars(ip)
+        if "mille" in snap.dag_maxjobs:
+            node.category = "mille"
+        if snap.dag_critical is not None:
+            node.priority = (ip.priority or 0) + snap.dag_critical.priority
+        if snap.dag_quorum is not None:
+            node.pre = self._quorum_pre(ip)
+            node.pre_defer = (self._QUORUM_DEFER, snap.dag_quorum.poll)
+        if snap.converge and ip.iteration < snap.iters - 1:
+            node.post = self._converge_post(ip)
+            node.abort_on = (self._CONVERGED_EXIT, 0)
+        return node
+    
+    def _quorum_pre(self, ip: IterPaths) -> tuple[str, ...]:
+        """PRE script holding millepede back until enough reco outputs exist."""
+        snap = self.snap
+        quorum = snap.dag_quorum
+        return (str(snap.src_dir / "check_quorum.py"), str(ip.kfalign_dir),
+                str(quorum.files), str(len(snap.tasks)),
+                "--timeout", str(quorum.timeout),
+                "--defer-code", str(self._QUORUM_DEFER))
+    
+    def _converge_post(self, ip: IterPaths) -> tuple[str, ...]:
+        """POST script comparing constants before and after millepede."""
+        snap = self.snap
+        post = [str(snap.src_dir / "check_convergence.py"), "$RETURN",
+                str(ip.constants_in), str(ip.constants_out)]
+        for level, (trans, rot) in snap.converge.items():
+            post += ["--tol", f"{level}={trans},{rot}"]
+        post += ["--converged-code", str(self._CONVERGED_EXIT)]
+        return tuple(post)
+    
+    def iter_nodes(self) -> Iterator[DAGNode]:
+        """Yield all DAG nodes in dependency order."""
+        snap = self.snap
+        last_mille: tuple[str, ...] = ()
+        for ip in self.active:
+            reco_parents = last_mille
+            if snap.dag_conditions:
+                cond = self._cond_node(ip, last_mille)
+                reco_parents = (cond.name,)
+                yield cond
+            reco_jobs = []
+            for file_str in snap.tasks:
+                node = self._reco_node(ip, file_str, reco_parents)
+                reco_jobs.append(node.name)
+                yield node
+            # NOTE: With a quorum, millepede is gated by its PRE script
+            # instead of waiting for every reco job as a parent.
+            if snap.dag_quorum is not None:
+                mille = self._mille_node(ip, last_mille)
+            else:
+                mille = self._mille_node(ip, tuple(reco_jobs))
+            last_mille = (mille.name,)
+            yield mille
+    
     def create_dag_file(self) -> Path:
-        """Create DAG file for complete alignment workflow."""
-        dag_file = self.config.dag_file
-        dag_content = "# HTCondor DAG for FASER alignment workflow\n\n"
-        for it in range(self.config.iters):
-            # reco jobs
-            dag_content += f"# Iteration {it} reconstruction jobs\n"
-            for file_str in self.config.files:
-                reco_sub = self.config.dag_recosub(it, file_str)
-                reco_job = self.config.dag_recojob(it, file_str)
-                dag_content += f"JOB {reco_job} {reco_sub}\n"
-            # mille jobs
-            dag_content += f"\n# Iteration {it} millepede job\n"
-            mille_sub = self.config.dag_millesub(it)
-            mille_job = self.config.dag_millejob(it)
-            dag_content += f"JOB {mille_job} {mille_sub}\n"
-            # add dependencies
-            dag_content += f"\n# Iteration {it} dependencies\n"
-            for file_str in self.config.files:
-                reco_job = self.config.dag_recojob(it, file_str)
-                dag_content += f"PARENT {reco_job} CHILD {mille_job}\n"
-                if it != 0:
-                    last_mille_job = self.config.dag_millejob(it-1)
-                    dag_content += f"PARENT {last_mille_job} CHILD {reco_job}\n"
-            dag_content += "\n"
-        # Add retry settings
-        dag_content += "# Retry settings\n"
-        for it in range(self.config.iters):
-            for file_str in self.config.files:
-                reco_job = self.config.dag_recojob(it, file_str)
-                dag_content += f"RETRY {reco_job} 2\n"
-            mille_job = self.config.dag_millejob(it)
-            dag_content += f"RETRY {mille_job} 1\n"
-        # Write DAG file
-        if dag_file.exists():
-            ColorfulPrint.print_yellow(f"Warning: ")
-            print(f"Overwritting DAG file: {dag_file}")
-        with open(dag_file, 'w') as f:
-            f.write(dag_content)
+        """Stream DAG file for complete alignment workflow."""
+        dag_file = self.snap.dag_file
+        self.writer.stream(dag_file,
+                           emit_dag(self.iter_nodes(), self.snap.dag_maxjobs))
         return dag_file
+    
+    def flush(self) -> None:
+        """Write all staged files that changed since the last run."""
+        written, unchanged = self.writer.flush()
+        self.writer.report(written, unchanged)
+    
+    def run_local(self, max_workers: int) -> int:
+        """Run the DAG on this machine instead of submitting it."""
+        executor = LocalExecutor(self.iter_nodes(), max_workers=max_workers,
+                                 maxjobs=self.snap.dag_maxjobs,
+                                 cwd=self.snap.dag_dir)
+        return executor.run()
+
 
 
+def build_indexes(config: AlignmentConfig) -> None:
+    """Build missing or stale event offset indexes of the raw files (raw.index)."""
+    raws = config.raw_paths()
+    counts = RawIndex.build_all(raws, config.index_paths())
+    if len(counts) < len(raws):
+        ColorfulPrint.print_yellow(f"Indexed {len(counts)} of {len(raws)} raw files, "
+                                   f"the others read all events up to their range")
+
 
 def main():
     """Main entry point for DAG manager."""
@@ -204,12 +558,27 @@ def main():
                         help='Path to configuration file')
     parser.add_argument('--submit', action='store_true', default=False,
                         help='Automatically submit DAG to HTCondor')
+    parser.add_argument('--local', type=int, metavar='N', default=None,
+                        help='Run the DAG locally with N concurrent jobs instead of HTCondor')
+    parser.add_argument('--resume', action='store_true', default=False,
+                        help='Skip iterations that already have complete outputs')
+    parser.add_argument('--plan', action='store_true', default=False,
+                        help='Print the reco job plan (needs a "plan" config section) and exit')
     
     args = parser.parse_args()
+    if args.submit and args.local is not None:
+        parser.error("--submit and --local are mutually exclusive")
+    if args.local is not None and args.local < 1:
+        parser.error("--local needs at least one job slot")
     
-    # Load configuration
+    # Load and compile configuration
     try:
         config = AlignmentConfig(Path(args.config))
+        # NOTE: Scans raw files and writes indexes, so not for --plan, which
+        # only reads the indexes that exist.
+        if config.raw_index and not args.plan:
+            build_indexes(config)
+        dag_manager = DAGManager(config, resume=args.resume)
     except FileNotFoundError as e:
         print(f"Error: {e}")
         print("Please check your configuration file.")
@@ -218,22 +587,53 @@ def main():
         print(f"Configuration error: {e}")
         return 1
     
+    if dag_manager.plan is not None:
+        dag_manager.plan.print(dag_manager.snap.plan)
+    elif args.plan:
+        print("Configuration error: --plan needs a \"plan\" section")
+        return 1
+    if args.plan:
+        return 0
+    
+    if args.resume:
+        start, iters = dag_manager.start, dag_manager.snap.iters
+        if start == iters:
+            print(f"All {iters} iterations are complete, nothing to resume.")
+            return 0
+        print(f"Resuming from iteration {start} "
+              f"({start}/{iters} iterations complete)")
+    
     # Create DAG
-    dag_manager = DAGManager(config)
     dag_manager.archive_config()
     dag_manager.validate_paths()
     dag_manager.create_data_dirs()
+    dag_manager.reset_quorum()
     dag_manager.create_dag_dirs()
+    dag_manager.create_env_snapshots()
     dag_manager.copy_first_inputforalign()
     dag_manager.create_reco_exe_files()
     dag_manager.create_reco_submit_files()
     dag_manager.create_mille_exe_files()
     dag_manager.create_mille_submit_files()
+    dag_manager.create_cond_exe_files()
+    dag_manager.create_cond_submit_files()
     dag_path = dag_manager.create_dag_file()
+    dag_manager.flush()
     dag_dir = dag_path.parent
     
+    if args.local is not None:
+        dag_manager.set_aside_outputs()
+        print(f"\nRunning DAG locally with {args.local} job slot(s)...")
+        return dag_manager.run_local(args.local)
+    
     if args.submit:
-        import subprocess
+        # NOTE: DAGMan holds the lock file while the DAG runs; its outputs
+        # must not be moved under it.
+        lock = dag_path.with_name(f"{dag_path.name}.lock")
+        if lock.exists():
+            print(f"Error: {lock} exists, the DAG is still running")
+            return 1
+        dag_manager.set_aside_outputs()
         print("\nSubmitting DAG to HTCondor...")
         
         try:
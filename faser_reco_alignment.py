@@ -8,10 +8,12 @@ FASER 实验数据重建脚本
 将原始数据转换为物理分析所需的重建对象（如径迹、簇等）。
 
 用法:
-    ./faser_reco.py [--geom=runtype] filepath 
+    ./faser_reco.py [--geom=runtype] filepath [filepath ...]
+    ./faser_reco.py [--geom=runtype] --filelist files.txt
     
 参数:
-    filepath - 输入原始数据文件的完整路径，支持远程文件
+    filepath - 输入原始数据文件的完整路径，支持远程文件；可给出多个文件，
+               在同一个事例循环中处理，只付一次 Athena 启动开销
     例如: "root://hepatl30//atlas/local/torrence/faser/commissioning/TestBeamData/Run-004150/Faser-Physics-004150-00000.raw"
     
     runtype - 可选的数据类型 (TI12Data, TI12Data02, TI12Data03, TestBeamData)
@@ -20,6 +22,15 @@ FASER 实验数据重建脚本
     --isMC - 处理蒙特卡罗模拟数据时需要
     --testBeam - 快捷方式，指定测试束流几何配置
     --alignment - 开启对准模式，仅允许一种跟踪算法
+    --alignmentLite - 精简对准模式，只调度 KF 对准输出所需的算法，不写 xAOD
+    --alignmentSlim - kfalignment 文件只保留 millepede 读取的分支 (SlimOutput.py)
+    --writeClusters - 额外写出紧凑的 SCT 簇文件 ({filestem}-Clusters.root)
+    --fromClusters - 输入为 --writeClusters 写出的簇文件，跳过字节流解码和成簇
+    --eventList - 只对列表中的事例（及 --eventMargin 抽样的安全余量）做径迹重建
+    --recordEvents - 记录产生对准径迹的事例号 ({filestem}-events.txt)
+    --profile - 开启 PerfMonMT 逐算法计时和内存监控，写出 {filestem}-perfmonmt.json
+    --jobConfig - 目录中按标志集合保存的配置 (JobConfig.py)：存在则载入并替换
+                  输入文件、输出名和事例范围，否则照常配置并保存
 
 Copyright (C) 2002-2017 CERN for the benefit of the ATLAS collaboration
 """
@@ -40,9 +51,11 @@ a = time.time()
 # 设置命令行参数解析器，处理用户输入的各种配置选项
 parser = argparse.ArgumentParser(description="Run FASER reconstruction")
 
-# 必需参数：输入文件路径
-parser.add_argument("file_path",
-                    help="Fully qualified path of the raw input file")
+# 输入文件路径：一个或多个文件，或通过 --filelist 给出
+parser.add_argument("file_path", nargs="*",
+                    help="Fully qualified path(s) of the raw input file(s)")
+parser.add_argument("--filelist", default="",
+                    help="Text file with one input path per line (# starts a comment)")
 
 # 几何配置选项
 parser.add_argument("-g", "--geom", default="",
@@ -91,14 +104,55 @@ parser.add_argument("--noBackward", action='store_true', default=False,
                     help="Turn off backward CKF tracking")
 parser.add_argument("--alignment", action='store_true', default=False,
                     help="Turn on alignment: Only one tracking algorithm (3ST/4ST Forward/Backwards) allowed")
+parser.add_argument("--alignmentLite", action='store_true', default=False,
+                    help="Alignment without waveform/calo/LHC reco and without xAOD output (implies --alignment)")
+parser.add_argument("--alignmentSlim", action='store_true', default=False,
+                    help="Keep only the kfalignment branches read by millepede, LZ4 compressed (implies --alignment)")
+parser.add_argument("--writeClusters", action='store_true', default=False,
+                    help="Also write SCT clusters to {filestem}-Clusters.root for later iterations")
+parser.add_argument("--fromClusters", action='store_true', default=False,
+                    help="Input files were written by --writeClusters: skip bytestream decoding and clusterization (implies --alignmentLite)")
+parser.add_argument("--eventList", default="",
+                    help="Only reconstruct tracks in events of this list (written by --recordEvents)")
+parser.add_argument("--eventMargin", type=float, default=0.0,
+                    help="Fraction of unlisted events also reconstructed with --eventList (default: 0)")
+parser.add_argument("--recordEvents", action='store_true', default=False,
+                    help="Write events with alignment tracks to {filestem}-events.txt")
+parser.add_argument("--profile", action='store_true', default=False,
+                    help="Per-algorithm CPU time and memory monitoring (PerfMonMT), written to {filestem}-perfmonmt.json")
+parser.add_argument("--inputIndex", nargs="*", default=[],
+                    help="Event offset indexes of the raw inputs (RawIndex.py), in input order: tag the entries of several inputs with their source")
+parser.add_argument("--jobConfig", default="",
+                    help="Directory of stored job configurations: load the one of this flag set, or store it")
 args = parser.parse_args()
 
+if args.writeClusters and args.fromClusters:
+    print("--writeClusters and --fromClusters are mutually exclusive")
+    sys.exit(1)
+
+# 簇文件中没有波形等原始数据，只能运行精简对准模式
+if args.fromClusters:
+    args.alignmentLite = True
+
+# 精简对准模式和精简输出隐含对准模式
+if args.alignmentLite or args.alignmentSlim:
+    args.alignment = True
+
 # ====================================
 # 几何配置自动识别
 # ====================================
 # 输入文件的路径处理
 from pathlib import Path
-filepath = Path(args.file_path)
+input_files = list(args.file_path)
+if args.filelist:
+    with open(args.filelist) as f:
+        input_files += [line.strip() for line in f
+                        if line.strip() and not line.strip().startswith("#")]
+if not input_files:
+    print("No input files given (use file_path or --filelist)")
+    sys.exit(1)
+# 几何识别与输出命名以第一个输入文件为准
+filepath = Path(input_files[0])
 
 # 确定 FASER 的几何版本，存储在 runtype 变量中
 if len(args.geom) > 0:  # 用户已指定运行类型
@@ -137,10 +191,117 @@ else:
 
 # 打印基础的重建信息
 print(f"Starting reconstruction of {filepath.name} with type {runtype}")
+if len(input_files) > 1:
+    print(f"Processing {len(input_files)} input files in one event loop")
 if args.nevents > 0:
     print(f"Reconstructing {args.nevents} events by command-line option")
 if args.skip > 0:
     print(f"Skipping {args.skip} events by command-line option")
+if args.fromClusters:
+    print("Reading cached SCT clusters, skipping bytestream decoding and clusterization")
+
+# 输出文件名的词干，所有输出文件以此命名
+filestem = filepath.stem
+
+# 删除任何文件类型修饰符
+if filestem[-4:] == "-RDO":
+    filestem = filestem[:-4]
+# 簇文件的输出命名与原始数据相同
+if filestem[-9:] == "-Clusters":
+    filestem = filestem[:-9]
+# 多个输入文件合并为一个输出，文件名附加最后一个文件的编号
+# 例如 Faser-Physics-008294-00101-00104
+if len(input_files) > 1:
+    laststem = Path(input_files[-1]).stem
+    if laststem[-4:] == "-RDO":
+        laststem = laststem[:-4]
+    filestem += "-" + laststem.split("-")[-1]
+if len(args.reco) > 0:
+    filestem += f"-{args.reco}"
+
+# 多个原始文件合并为一个输出时，kfalignment 的每个条目标记来源文件的序号
+# (source_index 分支，对应 {filestem}-inputs.json 中的 inputs)：按各输入的
+# 事例数统计每个输入结束时的条目数 (AlignmentAlgs.InputEntryCounter)，
+# 运行结束后写入分支 (SlimOutput.tag_sources)。事例数只取自 --inputIndex
+# 的索引，不预先扫描原始文件，否则 EOS 上的输入要读两遍
+sourceCounts = []
+sourcesFile = f"{filestem}-sources.json"
+if args.alignment and not args.fromClusters and len(input_files) > 1:
+    import RawIndex
+    indexes = [RawIndex.load(Path(i), Path(f)) for i, f in zip(args.inputIndex, input_files)]
+    if len(indexes) == len(input_files) and all(indexes):
+        sourceCounts = [index.count for index in indexes]
+    else:
+        print("No up-to-date event offset index for every input, entries are not tagged with their source")
+
+# ====================================
+# 执行重建并完成
+# ====================================
+def runReconstruction(acc):
+    """执行重建流水线，记录输入文件并以重建状态退出"""
+    # 旧的来源统计（例如同一检查点的上一块）不能用于本次输出
+    Path(sourcesFile).unlink(missing_ok=True)
+    sc = acc.run(maxEvents=args.nevents)
+
+    # 计算执行时间
+    b = time.time()
+    from AthenaCommon.Logging import log
+    log.info(f"Finish execution in {b-a} seconds")
+
+    # 标记每个条目的来源文件，在精简之前，精简保留 source_index 分支
+    if sc.isSuccess() and sourceCounts:
+        import json
+        from SlimOutput import tag_sources
+        try:
+            with open(sourcesFile) as f:
+                sources = json.load(f)
+            tag_sources(Path(sources["file"]), sources["entry_ends"])
+            log.info(f"Tagged {sources['file']} with the source of its entries")
+        except Exception as e:
+            log.warning(f"Failed to tag the entries with their source: {e}")
+
+    # 精简 kfalignment 输出；失败时保留完整文件，仍可用于 millepede
+    if sc.isSuccess() and args.alignmentSlim:
+        from SlimOutput import slim
+        for kfalignFile in sorted(Path(".").glob(f"{filestem}*kfalignment.root")):
+            try:
+                before, after = slim(kfalignFile)
+                log.info(f"Slimmed {kfalignFile}: {before / 1024 ** 2:.1f} MB -> {after / 1024 ** 2:.1f} MB")
+            except Exception as e:
+                log.warning(f"Failed to slim {kfalignFile}, keeping the full file: {e}")
+
+    # 记录合并输出所包含的输入文件，条目的 source_index 即其在 inputs 中的序号
+    if sc.isSuccess():
+        import json
+        with open(f"{filestem}-inputs.json", "w") as f:
+            json.dump({"output_stem": filestem, "inputs": input_files}, f, indent=2)
+
+    # 错误信号处理
+    if sc.isSuccess():
+        log.info("Execution succeeded")
+        sys.exit(0)
+    else:
+        log.info("Execution failed, return 1")
+        sys.exit(1)
+
+# 同一迭代、同一标志集合的作业配置完全相同：载入保存的配置，
+# 只替换输入文件、输出名和事例范围，跳过整个 Python 配置过程
+if args.jobConfig:
+    from JobConfig import config_key, load_config, store_config
+    # 是否统计来源决定配置中有无 InputEntryCounter，计入配置的键
+    jobConfigFile = Path(args.jobConfig) / f"{config_key({**vars(args), 'tagSources': bool(sourceCounts)}, runtype)}.pkl"
+    try:
+        storedAcc = load_config(jobConfigFile, input_files, filestem, args.skip, args.eventList)
+        if storedAcc is not None and sourceCounts:
+            counter = storedAcc.getEventAlgo("InputEntryCounter")
+            counter.EventCounts = sourceCounts
+            counter.Skip = args.skip
+    except Exception as e:
+        # 无法载入时（例如文件损坏）照常配置，并覆盖保存的配置
+        print(f"Failed to load job configuration {jobConfigFile}: {e}")
+        storedAcc = None
+    if storedAcc is not None:
+        runReconstruction(storedAcc)
 
 # ====================================
 # Athena 框架初始化和配置标志设置
@@ -255,20 +416,18 @@ if useCKF:
 # ====================================
 # 设置输出文件名
 # 必须使用原始输入字符串，因为 pathlib 会破坏路径名中的双斜杠 //
-configFlags.Input.Files = [ args.file_path ]
-filestem = filepath.stem
-
-# 删除任何文件类型修饰符
-if filestem[-4:] == "-RDO":
-    filestem = filestem[:-4]
-if len(args.reco) > 0:
-    filestem += f"-{args.reco}"
+configFlags.Input.Files = input_files
 
 # 配置输出文件名
 configFlags.addFlag("Output.xAODFileName", f"{filestem}-xAOD.root")
 configFlags.Output.ESDFileName = f"{filestem}-ESD.root"
 configFlags.Output.doWriteESD = False  # 不写入 ESD 格式
-configFlags.addFlag("Output.doWritexAOD", True)  # 写入 xAOD 格式
+configFlags.addFlag("Output.doWritexAOD", not args.alignmentLite)  # 写入 xAOD 格式（精简对准模式除外）
+configFlags.addFlag("Output.ClustersFileName", f"{filestem}-Clusters.root")  # 簇缓存文件
+# 逐算法的计时和内存监控，结果写入 JSON，由 ProfileSummary.py 汇总
+if args.profile:
+    configFlags.PerfMon.doFullMonMT = True
+    configFlags.PerfMon.OutputJSON = f"{filestem}-perfmonmt.json"
 # Play around with this?
 # configFlags.Concurrency.NumThreads = 2
 # configFlags.Concurrency.NumConcurrentEvents = 2
@@ -282,8 +441,14 @@ from AthenaPoolCnvSvc.PoolWriteConfig import PoolWriteCfg # 配置 ROOT 文件
 acc = MainServicesCfg(configFlags)
 acc.merge(PoolWriteCfg(configFlags))
 
+# PerfMonMT 服务尽早加入，以便监控所有组件的初始化
+if args.profile:
+    from PerfMonComps.PerfMonCompsConfig import PerfMonMTSvcCfg
+    acc.merge(PerfMonMTSvcCfg(configFlags))
+
 # Set up RAW data access
-if args.isMC or args.isOverlay:
+# 簇文件是 POOL 文件，与 MC 输入一样通过 PoolReadCfg 读取
+if args.isMC or args.isOverlay or args.fromClusters:
     from AthenaPoolCnvSvc.PoolReadConfig import PoolReadCfg
     acc.merge(PoolReadCfg(configFlags))
 else:    
@@ -295,6 +460,12 @@ else:
 from FaserGeoModel.FaserGeoModelConfig import FaserGeometryCfg
 acc.merge(FaserGeometryCfg(configFlags))
 
+# 精简对准模式：KF 对准输出只需要径迹重建，跳过 LHC、波形和量能器重建
+if args.alignmentLite:
+    print("Alignment-lite: skipping LHC, waveform and calorimeter reconstruction, no xAOD output")
+    useLHC = False
+    useCal = False
+
 if useLHC and not args.isOverlay:
     from LHCDataAlgs.LHCDataAlgConfig import LHCDataAlgCfg
     acc.merge(LHCDataAlgCfg(configFlags))
@@ -302,7 +473,7 @@ if useLHC and not args.isOverlay:
 # ====================================
 # 重建算法链配置
 # ====================================
-if not args.isOverlay:
+if not args.isOverlay and not args.alignmentLite:
     # 波形重建算法 - 从原始电子学信号重建物理量
     from WaveRecAlgs.WaveRecAlgsConfig import WaveformReconstructionCfg    
     acc.merge(WaveformReconstructionCfg(configFlags))
@@ -313,13 +484,26 @@ if not args.isOverlay:
         acc.merge(CalorimeterReconstructionCfg(configFlags, MC_calibTag=args.MC_calibTag))
 
 # 跟踪器簇重建 - 将相邻的硅条信号聚集成簇
-from TrackerPrepRawDataFormation.TrackerPrepRawDataFormationConfig import FaserSCT_ClusterizationCfg
-# acc.merge(FaserSCT_ClusterizationCfg(configFlags, DataObjectName="Pos_SCT_RDOs"))
-acc.merge(FaserSCT_ClusterizationCfg(configFlags, DataObjectName="SCT_RDOs", checkBadChannels=True))
+# 簇只由原始数据决定，与对准常数无关，读取簇文件时直接跳过
+if not args.fromClusters:
+    from TrackerPrepRawDataFormation.TrackerPrepRawDataFormationConfig import FaserSCT_ClusterizationCfg
+    # acc.merge(FaserSCT_ClusterizationCfg(configFlags, DataObjectName="Pos_SCT_RDOs"))
+    acc.merge(FaserSCT_ClusterizationCfg(configFlags, DataObjectName="SCT_RDOs", checkBadChannels=True))
+
+# 事例预选 - 只让上一轮产生对准径迹的事例（及安全余量）进入空间点和径迹重建
+# 过滤放在成簇之后，写出的簇缓存仍包含全部事例
+recoSeq = None  # None 表示默认序列 AthAlgSeq
+if args.eventList:
+    from AthenaCommon.CFElements import seqAND
+    from AlignmentAlgs import EventListFilter
+    recoSeq = "AlignmentEventSeq"
+    acc.addSequence(seqAND(recoSeq))
+    acc.addEventAlgo(EventListFilter(EventList=args.eventList, Margin=args.eventMargin),
+                     sequenceName=recoSeq)
 
 # 空间点重建 - 从硅条簇计算三维空间点
 from TrackerSpacePointFormation.TrackerSpacePointFormationConfig import TrackerSpacePointFinderCfg
-acc.merge(TrackerSpacePointFinderCfg(configFlags))
+acc.merge(TrackerSpacePointFinderCfg(configFlags), sequenceName=recoSeq)
 
 # 径迹段拟合算法（Dave 的新拟合器）
 # 放宽 ReducedChi2Cut 直到对准改善
@@ -328,7 +512,8 @@ acc.merge(SegmentFitAlgCfg(configFlags,
                            ReducedChi2Cut=25.,      # 减少卡方阈值
                            SharedHitFraction=0.61,  # 共享击中比例阈值
                            MinClustersPerFit=5,     # 每次拟合的最小簇数
-                           TanThetaXZCut=0.083))    # tan(角度) 阈值
+                           TanThetaXZCut=0.083),    # tan(角度) 阈值
+          sequenceName=recoSeq)
 
 # ====================================
 # 组合卡尔曼滤波器（CKF）跟踪配置
@@ -337,11 +522,13 @@ acc.merge(SegmentFitAlgCfg(configFlags,
 if useCKF:
     # Ghost 径迹清理算法 - 移除虚假径迹
     from FaserActsKalmanFilter.GhostBustersConfig import GhostBustersCfg
-    acc.merge(GhostBustersCfg(configFlags))
+    acc.merge(GhostBustersCfg(configFlags), sequenceName=recoSeq)
 
     # 卡尔曼滤波器用于径迹重建
     # 同时进行前向和后向跟踪
     from FaserActsKalmanFilter.CKF2Config import CKF2Cfg
+    # 对准径迹所在的集合，供 --recordEvents 使用
+    alignmentTracks = []
     
     # 前向跟踪算法
     if not args.noForward:
@@ -352,14 +539,18 @@ if useCKF:
                             OutputCollection="CKFTrackCollectionWithoutIFT",
                             BackwardPropagation=False,
                             alignmentWriter=args.alignment,
-                            noDiagnostics=True))
+                            noDiagnostics=True),
+                      sequenceName=recoSeq)
+            alignmentTracks.append("CKFTrackCollectionWithoutIFT")
         else:
             # 4-station forward only if not overlay
             if not args.isOverlay:
                 acc.merge(CKF2Cfg(configFlags,
                                 actsOutputTag=f"{filestem}_4station_forward",
                                 alignmentWriter=args.alignment,
-                                noDiagnostics=True))
+                                noDiagnostics=True),
+                          sequenceName=recoSeq)
+                alignmentTracks.append("CKFTrackCollection")
 
     # 后向跟踪算法
     if not args.noBackward:
@@ -370,7 +561,9 @@ if useCKF:
                             OutputCollection="CKFTrackCollectionBackwardWithoutIFT",
                             BackwardPropagation=True,
                             alignmentWriter=args.alignment,
-                            noDiagnostics=True))
+                            noDiagnostics=True),
+                      sequenceName=recoSeq)
+            alignmentTracks.append("CKFTrackCollectionBackwardWithoutIFT")
         else:
             # 4-station backward only if not overlay
             if not args.isOverlay:
@@ -379,72 +572,103 @@ if useCKF:
                                 OutputCollection="CKFTrackCollectionBackward",
                                 BackwardPropagation=True,
                                 alignmentWriter=args.alignment,
-                                noDiagnostics=True))
+                                noDiagnostics=True),
+                          sequenceName=recoSeq)
+                alignmentTracks.append("CKFTrackCollectionBackward")
+
+    # 记录产生对准径迹的事例，下一轮迭代只重建这些事例
+    if args.recordEvents:
+        from AlignmentAlgs import AlignmentEventRecorder
+        acc.addEventAlgo(AlignmentEventRecorder(TrackCollections=alignmentTracks,
+                                                Output=f"{filestem}-events.txt"),
+                         sequenceName=recoSeq)
+
+    # 统计每个输入文件结束时的条目数；放在默认序列中，
+    # 使 --eventList 过滤掉的事例也计入输入文件的位置
+    if sourceCounts:
+        from AlignmentAlgs import InputEntryCounter
+        acc.addEventAlgo(InputEntryCounter(EventCounts=sourceCounts, Skip=args.skip,
+                                           Output=sourcesFile))
 
 # ====================================
 # 输出配置和数据对象定义
 # ====================================
-# 配置输出流
-from OutputStreamAthenaPool.OutputStreamConfig import OutputStreamCfg
-# 定义要输出到 xAOD 文件的数据对象
-itemList = [ "xAOD::EventInfo#*"                      # 事件信息
-             , "xAOD::EventAuxInfo#*"                  # 事件辅助信息
-             , "xAOD::FaserTriggerData#*"              # FASER 触发数据
-             , "xAOD::FaserTriggerDataAux#*"           # 触发数据辅助信息
-             , "FaserSiHitCollection#*"                # Strip hits, do we want this?
-             , "FaserSCT_RDO_Container#*"              # SCT 原始数据容器
-             , "FaserSCT_SpacePointContainer#*"        # 空间点容器
-             , "Tracker::FaserSCT_ClusterContainer#*"  # 跟踪器簇容器
-             , "TrackCollection#*"                     # 径迹集合
-             , "xAOD::FaserEventInfo#*"                # FASER 事件信息
-             , "xAOD::FaserEventInfoAux#*"             # FASER 事件信息辅助
-]
-
-# 添加 LHC 数据对象（如果使用）
-if useLHC and not args.isOverlay:
-    itemList.extend( ["xAOD::FaserLHCData#*", "xAOD::FaserLHCDataAux#*"] )
-
-# 为蒙特卡罗数据添加真实信息
-if args.isMC and not args.isOverlay:
-    # 创建 xAOD 版本的真实信息
-    from Reconstruction.xAODTruthCnvAlgConfig import xAODTruthCnvAlgCfg
-    acc.merge(xAODTruthCnvAlgCfg(configFlags))
-
-    # 添加 MC 信息到输出列表
-    itemList.extend( ["McEventCollection#*", "TrackerSimDataCollection#*"] )
-
-# 输出流配置
-acc.merge(OutputStreamCfg(configFlags, "xAOD", itemList, disableEventTag=True))
-
-# 元数据配置（蒙特卡罗数据）
-if args.isMC:
-    from xAODMetaDataCnv.InfileMetaDataConfig import SetupMetaDataForStreamCfg
-    acc.merge(SetupMetaDataForStreamCfg(configFlags, "xAOD"))
-
-# Try to turn off annoying INFO message, as we don't use this
-# disableEventTag=True doesn't seem to work...
-tagBuilder = CompFactory.EventInfoTagBuilder()
-tagBuilder.PropagateInput=False
-acc.addEventAlgo(tagBuilder)
-
-# 添加重建算法的输出配置
-if not args.isOverlay:
-    # 波形重建输出
-    from WaveRecAlgs.WaveRecAlgsConfig import WaveformReconstructionOutputCfg    
-    acc.merge(WaveformReconstructionOutputCfg(configFlags))
-
-    # 量能器重建输出
-    from CaloRecAlgs.CaloRecAlgsConfig import CalorimeterReconstructionOutputCfg
-    acc.merge(CalorimeterReconstructionOutputCfg(configFlags))
+# 精简对准模式不写 xAOD，跳过整个输出配置
+if not args.alignmentLite:
+    # 配置输出流
+    from OutputStreamAthenaPool.OutputStreamConfig import OutputStreamCfg
+    # 定义要输出到 xAOD 文件的数据对象
+    itemList = [ "xAOD::EventInfo#*"                      # 事件信息
+                 , "xAOD::EventAuxInfo#*"                  # 事件辅助信息
+                 , "xAOD::FaserTriggerData#*"              # FASER 触发数据
+                 , "xAOD::FaserTriggerDataAux#*"           # 触发数据辅助信息
+                 , "FaserSiHitCollection#*"                # Strip hits, do we want this?
+                 , "FaserSCT_RDO_Container#*"              # SCT 原始数据容器
+                 , "FaserSCT_SpacePointContainer#*"        # 空间点容器
+                 , "Tracker::FaserSCT_ClusterContainer#*"  # 跟踪器簇容器
+                 , "TrackCollection#*"                     # 径迹集合
+                 , "xAOD::FaserEventInfo#*"                # FASER 事件信息
+                 , "xAOD::FaserEventInfoAux#*"             # FASER 事件信息辅助
+    ]
+
+    # 添加 LHC 数据对象（如果使用）
+    if useLHC and not args.isOverlay:
+        itemList.extend( ["xAOD::FaserLHCData#*", "xAOD::FaserLHCDataAux#*"] )
+
+    # 为蒙特卡罗数据添加真实信息
+    if args.isMC and not args.isOverlay:
+        # 创建 xAOD 版本的真实信息
+        from Reconstruction.xAODTruthCnvAlgConfig import xAODTruthCnvAlgCfg
+        acc.merge(xAODTruthCnvAlgCfg(configFlags))
+
+        # 添加 MC 信息到输出列表
+        itemList.extend( ["McEventCollection#*", "TrackerSimDataCollection#*"] )
+
+    # 输出流配置
+    acc.merge(OutputStreamCfg(configFlags, "xAOD", itemList, disableEventTag=True))
+
+    # 元数据配置（蒙特卡罗数据）
+    if args.isMC:
+        from xAODMetaDataCnv.InfileMetaDataConfig import SetupMetaDataForStreamCfg
+        acc.merge(SetupMetaDataForStreamCfg(configFlags, "xAOD"))
+
+    # Try to turn off annoying INFO message, as we don't use this
+    # disableEventTag=True doesn't seem to work...
+    tagBuilder = CompFactory.EventInfoTagBuilder()
+    tagBuilder.PropagateInput=False
+    acc.addEventAlgo(tagBuilder)
+
+    # 添加重建算法的输出配置
+    if not args.isOverlay:
+        # 波形重建输出
+        from WaveRecAlgs.WaveRecAlgsConfig import WaveformReconstructionOutputCfg    
+        acc.merge(WaveformReconstructionOutputCfg(configFlags))
+
+        # 量能器重建输出
+        from CaloRecAlgs.CaloRecAlgsConfig import CalorimeterReconstructionOutputCfg
+        acc.merge(CalorimeterReconstructionOutputCfg(configFlags))
+
+
+# 簇缓存输出：只保存事件信息、触发数据和 SCT 簇，供后续迭代从空间点开始重建
+if args.writeClusters:
+    from OutputStreamAthenaPool.OutputStreamConfig import OutputStreamCfg
+    clusterItemList = [ "xAOD::EventInfo#*"
+                        , "xAOD::EventAuxInfo#*"
+                        , "xAOD::FaserTriggerData#*"
+                        , "xAOD::FaserTriggerDataAux#*"
+                        , "Tracker::FaserSCT_ClusterContainer#*"
+    ]
+    acc.merge(OutputStreamCfg(configFlags, "Clusters", clusterItemList, disableEventTag=True))
 
 # ====================================
 # 服务配置和执行设置
 # ====================================
 
 # Check what we have
-from OutputStreamAthenaPool.OutputStreamConfig import outputStreamName
-print( "Writing out xAOD objects:" )
-print( acc.getEventAlgo(outputStreamName("xAOD")).ItemList )
+if not args.alignmentLite:
+    from OutputStreamAthenaPool.OutputStreamConfig import outputStreamName
+    print( "Writing out xAOD objects:" )
+    print( acc.getEventAlgo(outputStreamName("xAOD")).ItemList )
 
 # Hack to avoid problem with our use of MC databases when isMC = False
 if not args.isMC:
@@ -473,21 +697,13 @@ acc.foreach_component("*ClassID*").OutputLevel = INFO
 
 acc.getService("MessageSvc").Format = "% F%40W%S%7W%R%T %0W%M"
 
-# ====================================
-# 执行重建并完成
-# ====================================
-# 执行重建流水线
-sc = acc.run(maxEvents=args.nevents)
-
-# 计算执行时间
-b = time.time()
-from AthenaCommon.Logging import log
-log.info(f"Finish execution in {b-a} seconds")
-
-# 错误信号处理
-if sc.isSuccess():
-    log.info("Execution succeeded")
-    sys.exit(0)
-else:
-    log.info("Execution failed, return 1")
-    sys.exit(1)
\ No newline at end of file
+# 保存配置，供本迭代的后续作业载入
+# 保存失败不影响本作业的重建
+if args.jobConfig:
+    try:
+        store_config(acc, jobConfigFile, input_files, filestem, args.eventList)
+        print(f"Stored job configuration {jobConfigFile}")
+    except Exception as e:
+        print(f"Failed to store job configuration {jobConfigFile}: {e}")
+
+runReconstruction(acc)
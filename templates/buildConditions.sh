@@ -0,0 +1,78 @@
+#!/bin/bash
+
+# Build the alignment conditions DB of one iteration, once for all reco jobs.
+# Usage: ./buildConditions.sh <CONSTANTS> <OUTPUT> <SRC_DIR> <CALYPSO_ASETUP> <CALYPSO_SETUP> [ENV_SNAPSHOT]
+CONSTANTS=$1
+OUTPUT=$2
+SRC_DIR=$3
+CALYPSO_ASETUP=$4
+CALYPSO_SETUP=$5
+ENV_SNAPSHOT=$6
+echo "Running with parameters:"
+echo " Constants: $CONSTANTS"
+echo " Output: $OUTPUT"
+echo " SrcDir: $SRC_DIR"
+echo " CalypsoAsetup: $CALYPSO_ASETUP"
+echo " CalypsoSetup: $CALYPSO_SETUP"
+echo ""
+
+# Setup environment
+# A snapshot captured by dag_manager.py on the same OS replaces the full setup
+if [ -n "$ENV_SNAPSHOT" ] && python3 "$SRC_DIR/EnvSnapshot.py" check "$ENV_SNAPSHOT"; then
+    source "$ENV_SNAPSHOT"
+    echo "=== Restored environment from snapshot $ENV_SNAPSHOT ==="
+else
+    export ATLAS_LOCAL_ROOT_BASE=/cvmfs/atlas.cern.ch/repo/ATLASLocalRootBase 
+    source ${ATLAS_LOCAL_ROOT_BASE}/user/atlasLocalSetup.sh
+    asetup --input=$CALYPSO_ASETUP Athena,24.0.41
+    source $CALYPSO_SETUP
+    echo "=== Sourced environment from ==="
+fi
+
+# Work on local disk of the execute node
+if [ -n "$_CONDOR_SCRATCH_DIR" ]; then
+    WORK_DIR="$_CONDOR_SCRATCH_DIR/conditions"
+else
+    WORK_DIR="/tmp/faser_conditions_$$"
+fi
+mkdir -p "$WORK_DIR"
+cd "$WORK_DIR"
+echo "=== Work directory: $WORK_DIR ==="
+
+export ATLAS_POOLCOND_PATH="$WORK_DIR/data"
+
+# Copy templates and database
+cp $SRC_DIR/templates/aligndb_template_head.sh ./
+cp $SRC_DIR/templates/aligndb_template_tail.sh ./
+cp $SRC_DIR/templates/WriteAlignment* ./
+rm -rf data
+mkdir -p data/sqlite200
+mkdir -p data/poolcond
+cp /cvmfs/faser.cern.ch/repo/sw/database/DBRelease/current/sqlite200/ALLP200.db data/sqlite200
+echo "=== Copied templates and database ==="
+
+# Same build as runAlignment.sh does per job
+cat aligndb_template_head.sh >./aligndb_copy.sh
+ALIGN_VAR=$(cat "$CONSTANTS")
+echo "python WriteAlignmentConfig_Faser04.py 'AlignDbTool.AlignmentConstants={$ALIGN_VAR}' >& writeAlignment_Faser04.log" >>./aligndb_copy.sh
+cat aligndb_template_tail.sh >>./aligndb_copy.sh
+chmod 755 ./aligndb_copy.sh
+./aligndb_copy.sh >& aligndb_copy.log
+echo "=== Finished aligndb_copy.sh ==="
+
+if ! ls data/poolcond/*_Align.pool.root >/dev/null 2>&1; then
+    echo "Error: no alignment pool file was built"
+    cat aligndb_copy.log
+    exit 1
+fi
+
+# Pack data/ without the catalog symlink, which points into this work dir.
+# Write under a temporary name and rename, so jobs never read a partial file.
+mkdir -p "$(dirname "$OUTPUT")"
+tar -cf "$OUTPUT.part" --exclude=PoolCat_oflcond.xml data
+mv "$OUTPUT.part" "$OUTPUT"
+echo "=== Wrote conditions to $OUTPUT ==="
+
+cd /tmp
+rm -rf "$WORK_DIR"
+echo "=== Finished conditions build ==="
@@ -0,0 +1,21 @@
+# HTCondor submit file for conditions DB build
+universe = vanilla
+executable = {exe_path}
+
+output = {out_path}
+error  = {err_path}
+log    = {log_path}
+
+request_cpus = 1
+request_memory = 2 GB
+request_disk = 2 GB
+should_transfer_files = YES
+when_to_transfer_output = ON_EXIT
+
++JobFlavour = "microcentury"
+on_exit_remove = (ExitBySignal == False) && (ExitCode == 0)
+max_retries = 2
+requirements = (OpSysAndVer =?= "AlmaLinux9")
+
+arguments = {constants} {conditions} {src_dir} {calypso_asetup} {calypso_setup} {env_snapshot}
+queue
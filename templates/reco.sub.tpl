@@ -6,9 +6,9 @@ output = {out_path}
 error  = {err_path}
 log    = {log_path}
 
-request_cpus = 2
-request_memory = 4 GB
-request_disk = 8 GB
+request_cpus = {request_cpus}
+request_memory = {request_memory}
+request_disk = {request_disk}
 should_transfer_files = YES
 when_to_transfer_output = ON_EXIT
 transfer_output_files = logs/
@@ -18,5 +18,5 @@ on_exit_remove = (ExitBySignal == False) && (ExitCode == 0)
 max_retries = 3
 requirements = (Machine =!= LastRemoteHost) && (OpSysAndVer =?= "AlmaLinux9")
 
-arguments = {year} {run} {stations} {file_str} {reco_dir} {kfalign_dir} {src_dir} {calypso_asetup} {calypso_setup} {verbosity}
+arguments = {year} {run} {stations} {file_str} {reco_dir} {kfalign_dir} {src_dir} {calypso_asetup} {calypso_setup} {verbosity} {extra_args}
 queue
\ No newline at end of file
@@ -1,6 +1,30 @@
 #!/bin/bash
 
-# Usage: ./runAlignment.sh <YEAR> <RUN> <STATIONS> <FILE> <RECO_DIR> <KFALIGN_DIR> <SRC_DIR> <CALYPSO_ASETUP> <CALYPSO_SETUP>
+# Usage: ./runAlignment.sh <YEAR> <RUN> <STATIONS> <FILE> <RECO_DIR> <KFALIGN_DIR> <SRC_DIR> <CALYPSO_ASETUP> <CALYPSO_SETUP> [VERBOSITY] [options]
+# Options:
+#   --conditions <TAR>   Prebuilt conditions DB of the iteration (buildConditions.sh)
+#   --lite               Alignment-lite reconstruction, no xAOD output
+#   --slim               Keep only the kfalignment branches read by millepede
+#   --inputs <N1,N2,..>  Raw file numbers reconstructed together as task <FILE>
+#   --skip <N>           Skip the first N events (event-range shard)
+#   --nevents <N>        Process N events, -1 for all remaining
+#   --index <IDX,..>     Event offset indexes of the raw files (RawIndex.py), in input
+#                        order: a shard reads only its events instead of skipping
+#                        through the file, several inputs are tagged with their source
+#   --raw-cache <DIR>    Node-local cache of raw files (RawCache.py), kept between jobs
+#   --raw-cache-gb <N>   Size cap of the raw file cache in GB (default 50)
+#   --raw-cache-checksum Verify cached raw files by adler32 on every hit
+#   --clusters <FILE>    SCT cluster cache of the task: read it if it exists,
+#                        otherwise reconstruct from raw data and write it
+#   --record-events <F>  Write the events with alignment tracks to F
+#   --event-list <F>     Only track events listed in F (previous iteration), if it exists
+#   --event-margin <X>   Fraction of unlisted events tracked as well
+#   --env-snapshot <F>   Environment snapshot used instead of the setup if it matches this OS
+#   --job-config <DIR>   Stored job configurations of the iteration: load or store ours
+#   --profile            Per-algorithm PerfMonMT profile, copied next to the output
+#   --checkpoint <DIR>   Checkpoint directory of the task (Checkpoint.py): run the events
+#                        in chunks and resume after the last finished one on a retry
+#   --checkpoint-events <N> Events per checkpointed chunk
 YEAR=$1
 RUN=$2
 STATIONS=$3
@@ -11,6 +35,50 @@ SRC_DIR=$7
 CALYPSO_ASETUP=$8
 CALYPSO_SETUP=$9
 VERBOSITY=${10:-INFO}
+shift 10 2>/dev/null || shift $#
+CONDITIONS=""
+ALIGN_FLAG="--alignment"
+SLIM_FLAG=""
+INPUTS=""
+SKIP=0
+NEVENTS=-1
+INDEX=""
+CLUSTERS=""
+RAW_CACHE=""
+RAW_CACHE_GB=50
+RAW_CACHE_CHECKSUM=""
+RECORD_EVENTS=""
+EVENT_LIST=""
+EVENT_MARGIN=0
+ENV_SNAPSHOT=""
+JOB_CONFIG=""
+PROFILE=""
+CHECKPOINT=""
+CHECKPOINT_EVENTS=0
+while [ $# -gt 0 ]; do
+    case "$1" in
+        --conditions) CONDITIONS=$2; shift 2 ;;
+        --lite) ALIGN_FLAG="--alignmentLite"; shift ;;
+        --slim) SLIM_FLAG="--alignmentSlim"; shift ;;
+        --inputs) INPUTS=$2; shift 2 ;;
+        --skip) SKIP=$2; shift 2 ;;
+        --nevents) NEVENTS=$2; shift 2 ;;
+        --index) INDEX=$2; shift 2 ;;
+        --clusters) CLUSTERS=$2; shift 2 ;;
+        --raw-cache) RAW_CACHE=$2; shift 2 ;;
+        --raw-cache-gb) RAW_CACHE_GB=$2; shift 2 ;;
+        --raw-cache-checksum) RAW_CACHE_CHECKSUM="--checksum"; shift ;;
+        --record-events) RECORD_EVENTS=$2; shift 2 ;;
+        --event-list) EVENT_LIST=$2; shift 2 ;;
+        --event-margin) EVENT_MARGIN=$2; shift 2 ;;
+        --env-snapshot) ENV_SNAPSHOT=$2; shift 2 ;;
+        --job-config) JOB_CONFIG=$2; shift 2 ;;
+        --profile) PROFILE="--profile"; shift ;;
+        --checkpoint) CHECKPOINT=$2; shift 2 ;;
+        --checkpoint-events) CHECKPOINT_EVENTS=$2; shift 2 ;;
+        *) echo "Error: unknown option $1"; exit 1 ;;
+    esac
+done
 echo "Running with parameters:"
 echo " Year: $YEAR"
 echo " Run: $RUN"
@@ -22,18 +90,40 @@ echo " SrcDir: $SRC_DIR"
 echo " CalypsoAsetup: $CALYPSO_ASETUP"
 echo " CalypsoSetup: $CALYPSO_SETUP"
 echo " Verbosity: $VERBOSITY"
+echo " Conditions: ${CONDITIONS:-build in job}"
+echo " Mode: $ALIGN_FLAG $SLIM_FLAG"
+echo " Inputs: ${INPUTS:-$FILE}"
+echo " Events: skip $SKIP, process $NEVENTS"
+echo " Clusters: ${CLUSTERS:-none}"
+echo " Raw cache: ${RAW_CACHE:-none}"
+echo " Event list: ${EVENT_LIST:-none} (margin $EVENT_MARGIN)"
+echo " Job config: ${JOB_CONFIG:-configure in job}"
+echo " Checkpoint: ${CHECKPOINT:-none}"
 echo ""
 
+# Millepede already started on a quorum of files, this job is not needed
+QUORUM_MARKER="$KFALIGN_DIR/.quorum"
+if [ -f "$QUORUM_MARKER" ]; then
+    echo "=== Quorum reached for this iteration, skipping job ==="
+    exit 0
+fi
+
 # Dir for condor to store logs
 mkdir -p logs
 echo "=== Create logs directory on execute node ==="
 
 # Setup environment
-export ATLAS_LOCAL_ROOT_BASE=/cvmfs/atlas.cern.ch/repo/ATLASLocalRootBase 
-source ${ATLAS_LOCAL_ROOT_BASE}/user/atlasLocalSetup.sh
-asetup --input=$CALYPSO_ASETUP Athena,24.0.41
-source $CALYPSO_SETUP
-echo "=== Sourced environment from ==="
+# A snapshot captured by dag_manager.py on the same OS replaces the full setup
+if [ -n "$ENV_SNAPSHOT" ] && python3 "$SRC_DIR/EnvSnapshot.py" check "$ENV_SNAPSHOT"; then
+    source "$ENV_SNAPSHOT"
+    echo "=== Restored environment from snapshot $ENV_SNAPSHOT ==="
+else
+    export ATLAS_LOCAL_ROOT_BASE=/cvmfs/atlas.cern.ch/repo/ATLASLocalRootBase 
+    source ${ATLAS_LOCAL_ROOT_BASE}/user/atlasLocalSetup.sh
+    asetup --input=$CALYPSO_ASETUP Athena,24.0.41
+    source $CALYPSO_SETUP
+    echo "=== Sourced environment from ==="
+fi
 
 # Create working directory on HTCondor execute node (local disk, not AFS)
 # Use $_CONDOR_SCRATCH_DIR if available, otherwise use /tmp
@@ -51,48 +141,223 @@ export ATLAS_POOLCOND_PATH="$WORK_DIR/data"
 export EOS_MGM_URL=root://eosuser.cern.ch
 echo "=== Setup pool path ${ATLAS_POOLCOND_PATH} ==="
 
-# Copy templates and database to local execute node
-cp $SRC_DIR/templates/aligndb_copy.sh ./
-cp $SRC_DIR/templates/aligndb_template_head.sh ./
-cp $SRC_DIR/templates/aligndb_template_tail.sh ./
-cp $SRC_DIR/templates/WriteAlignment* ./
-rm -rf data
-mkdir -p data/sqlite200
-mkdir -p data/poolcond
-cp /cvmfs/faser.cern.ch/repo/sw/database/DBRelease/current/sqlite200/ALLP200.db data/sqlite200
-echo "=== Copied templates and database to execute node ==="
-
-# Run aligndb_copy.sh
-rm aligndb_copy.sh
-touch aligndb_copy.sh
-cat aligndb_template_head.sh >./aligndb_copy.sh
-ALIGN_VAR=$(cat "$RECO_DIR/inputforalign.txt")
-echo "python WriteAlignmentConfig_Faser04.py 'AlignDbTool.AlignmentConstants={$ALIGN_VAR}' >& writeAlignment_Faser04.log" >>./aligndb_copy.sh
-cat aligndb_template_tail.sh >>./aligndb_copy.sh
-chmod 755 ./aligndb_copy.sh
-./aligndb_copy.sh >& aligndb_copy.log
-echo "=== Finished aligndb_copy.sh ==="
+if [ -n "$CONDITIONS" ]; then
+    # Conditions were built once for this iteration, just unpack them
+    rm -rf data
+    tar -xf "$CONDITIONS"
+    ln -s ${PWD}/data/poolcond/PoolFileCatalog.xml ${PWD}/data/poolcond/PoolCat_oflcond.xml
+    echo "=== Unpacked prebuilt conditions from $CONDITIONS ==="
+else
+    # Copy templates and database to local execute node
+    cp $SRC_DIR/templates/aligndb_copy.sh ./
+    cp $SRC_DIR/templates/aligndb_template_head.sh ./
+    cp $SRC_DIR/templates/aligndb_template_tail.sh ./
+    cp $SRC_DIR/templates/WriteAlignment* ./
+    rm -rf data
+    mkdir -p data/sqlite200
+    mkdir -p data/poolcond
+    cp /cvmfs/faser.cern.ch/repo/sw/database/DBRelease/current/sqlite200/ALLP200.db data/sqlite200
+    echo "=== Copied templates and database to execute node ==="
+
+    # Run aligndb_copy.sh
+    rm aligndb_copy.sh
+    touch aligndb_copy.sh
+    cat aligndb_template_head.sh >./aligndb_copy.sh
+    ALIGN_VAR=$(cat "$RECO_DIR/inputforalign.txt")
+    echo "python WriteAlignmentConfig_Faser04.py 'AlignDbTool.AlignmentConstants={$ALIGN_VAR}' >& writeAlignment_Faser04.log" >>./aligndb_copy.sh
+    cat aligndb_template_tail.sh >>./aligndb_copy.sh
+    chmod 755 ./aligndb_copy.sh
+    ./aligndb_copy.sh >& aligndb_copy.log
+    echo "=== Finished aligndb_copy.sh ==="
+fi
 
 # Build the command based on number of stations
-FILE_PATH="/eos/experiment/faser/raw/${YEAR}/${RUN}/Faser-Physics-${RUN}-${FILE}.raw"
+# A task reconstructs its own file, or all files given by --inputs in one process
+FILE_PATHS=""
+RAW_FILES=""
+for NUM in $(echo "${INPUTS:-$FILE}" | tr ',' ' '); do
+    RAW_FILES="$RAW_FILES /eos/experiment/faser/raw/${YEAR}/${RUN}/Faser-Physics-${RUN}-${NUM}.raw"
+done
+# Read the raw files through the node-local cache; a file that cannot be
+# cached is read from EOS
+if [ -n "$RAW_CACHE" ] && [ ! -f "$CLUSTERS" ]; then
+    CACHED_FILES=$(python3 "$SRC_DIR/RawCache.py" fetch "$RAW_CACHE" $RAW_FILES --max-gb "$RAW_CACHE_GB" $RAW_CACHE_CHECKSUM)
+    if [ $? -eq 0 ] && [ -n "$CACHED_FILES" ]; then
+        # Hold a shared lock on each cached copy until this job exits, so no
+        # other job evicts it (RawCache.py); a copy already evicted is read
+        # from EOS
+        SOURCES=($RAW_FILES)
+        RAW_FILES=""
+        I=0
+        for CACHED in $CACHED_FILES; do
+            if [ "$CACHED" != "${SOURCES[$I]}" ]; then
+                exec {USE_FD}>>"$(dirname "$CACHED").use"
+                flock -s $USE_FD
+                if [ ! -f "$CACHED" ]; then
+                    echo "=== Cached copy $CACHED was evicted, reading ${SOURCES[$I]} ==="
+                    CACHED=${SOURCES[$I]}
+                fi
+            fi
+            RAW_FILES="$RAW_FILES $CACHED"
+            I=$((I + 1))
+        done
+    fi
+    echo "=== Raw files via cache $RAW_CACHE: $(echo $RAW_FILES) ==="
+fi
+# Copy only this shard's events into a local raw file, so the reconstruction
+# does not read and decode every skipped event; without a usable index the
+# shard skips through the whole file as before
+INDEX_FILES=$(echo "$INDEX" | tr ',' ' ')
+if [ -n "$INDEX" ] && [ -f "$INDEX" ] && [ ! -f "$CLUSTERS" ] && [ $(echo $RAW_FILES | wc -w) -eq 1 ]; then
+    SLICE_FILE="$WORK_DIR/slice/$(basename $RAW_FILES)"
+    if python3 "$SRC_DIR/RawIndex.py" slice "$INDEX" $RAW_FILES "$SKIP" "$NEVENTS" "$SLICE_FILE"; then
+        RAW_FILES=$SLICE_FILE
+        SKIP=0
+        NEVENTS=-1
+        echo "=== Reading event slice $SLICE_FILE ==="
+    fi
+fi
+for RAW_FILE in $RAW_FILES; do
+    FILE_PATHS="$FILE_PATHS \"$RAW_FILE\""
+done
+# Clusters cached by an earlier iteration replace the raw input; they already
+# hold only this task's event range, so --skip/--nevents are not applied again
+CLUSTER_FLAG=""
+if [ -n "$CLUSTERS" ]; then
+    if [ -f "$CLUSTERS" ]; then
+        FILE_PATHS="\"$CLUSTERS\""
+        CLUSTER_FLAG="--fromClusters"
+        SKIP=0
+        NEVENTS=-1
+        echo "=== Reading cached clusters from $CLUSTERS ==="
+    else
+        CLUSTER_FLAG="--writeClusters"
+        echo "=== No cached clusters yet, writing them to $CLUSTERS ==="
+    fi
+fi
+# Output names of faser_reco_alignment.py: the stem of the first input, with
+# the number of the last raw file appended for several inputs, and the
+# kfalignment file of the backward CKF (--noForward, 3 stations use --noIFT)
+if [ "$CLUSTER_FLAG" = "--fromClusters" ]; then
+    STEM=$(basename "$CLUSTERS" -Clusters.root)
+else
+    NUMS=${INPUTS:-$FILE}
+    STEM="Faser-Physics-${RUN}-${NUMS%%,*}"
+    if [ "$NUMS" != "${NUMS%%,*}" ]; then
+        STEM="${STEM}-${NUMS##*,}"
+    fi
+fi
+KFALIGN_FILE="${STEM}_${STATIONS}station_backward_kfalignment.root"
 if [ "$STATIONS" = "3" ]; then
-    CMD="python $SRC_DIR/faser_reco_alignment.py \"$FILE_PATH\" --alignment --noForward --noIFT --output_level $VERBOSITY"
+    CMD="python $SRC_DIR/faser_reco_alignment.py $FILE_PATHS $ALIGN_FLAG --noForward --noIFT --output_level $VERBOSITY"
 elif [ "$STATIONS" = "4" ]; then
-    CMD="python $SRC_DIR/faser_reco_alignment.py \"$FILE_PATH\" --alignment --noForward --output_level $VERBOSITY"
+    CMD="python $SRC_DIR/faser_reco_alignment.py $FILE_PATHS $ALIGN_FLAG --noForward --output_level $VERBOSITY"
 else
     echo "Error: STATIONS must be 3 or 4, got: $STATIONS"
     exit 1
 fi
+# Cluster files cannot be merged, so jobs writing or reading them run in one piece
+if [ -n "$CHECKPOINT" ] && [ -n "$CLUSTER_FLAG" ]; then
+    echo "=== Cluster cache in use, running without checkpoints ==="
+    CHECKPOINT=""
+fi
+# PerfMonMT profiles of several chunks cannot be merged either
+if [ -n "$CHECKPOINT" ] && [ -n "$PROFILE" ]; then
+    echo "=== Profiling, running without checkpoints ==="
+    CHECKPOINT=""
+fi
+if [ -z "$CHECKPOINT" ] && { [ "$SKIP" != "0" ] || [ "$NEVENTS" != "-1" ]; }; then
+    CMD="$CMD --skip $SKIP --nevents $NEVENTS"
+fi
+CMD="$CMD $CLUSTER_FLAG"
+# Event counts of several inputs, to tag the merged output with the source of
+# every entry; never counted by reading the raw files
+if [ "$CLUSTER_FLAG" != "--fromClusters" ] && [ $(echo $RAW_FILES | wc -w) -gt 1 ] && [ -n "$INDEX" ]; then
+    CMD="$CMD --inputIndex $INDEX_FILES"
+fi
+# Without the previous iteration's list (e.g. its job skipped by a quorum)
+# all events are tracked
+if [ -n "$EVENT_LIST" ]; then
+    if [ -f "$EVENT_LIST" ]; then
+        CMD="$CMD --eventList \"$EVENT_LIST\" --eventMargin $EVENT_MARGIN"
+    else
+        echo "=== Event list $EVENT_LIST not found, tracking all events ==="
+    fi
+fi
+if [ -n "$RECORD_EVENTS" ]; then
+    CMD="$CMD --recordEvents"
+fi
+CMD="$CMD $PROFILE $SLIM_FLAG"
+# The first job of a flag set stores its configuration, later ones load it
+if [ -n "$JOB_CONFIG" ]; then
+    mkdir -p "$JOB_CONFIG"
+    CMD="$CMD --jobConfig \"$JOB_CONFIG\""
+fi
+# Run the event range in chunks, each finished chunk is kept in the checkpoint
+# directory; a retry continues after the last one and the parts are merged
+if [ -n "$CHECKPOINT" ]; then
+    INDEX_FLAG=""
+    if [ -n "$INDEX" ]; then
+        INDEX_FLAG="--index $INDEX_FILES"
+    fi
+    CMD="python3 $SRC_DIR/Checkpoint.py run \"$CHECKPOINT\" --chunk $CHECKPOINT_EVENTS --skip $SKIP --nevents $NEVENTS --raw $RAW_FILES $INDEX_FLAG -- $CMD"
+fi
 echo "=== Running command: $CMD ==="
 eval $CMD
+RECO_STATUS=$?
+
+# Store the clusters for later iterations, independent of the quorum below
+if [ "$CLUSTER_FLAG" = "--writeClusters" ] && [ $RECO_STATUS -eq 0 ]; then
+    mkdir -p "$(dirname "$CLUSTERS")"
+    cp "${STEM}-Clusters.root" "$CLUSTERS.part" && mv "$CLUSTERS.part" "$CLUSTERS"
+    echo "=== Copied clusters to $CLUSTERS ==="
+fi
+
+# Store the event list for the next iteration, independent of the quorum below
+if [ -n "$RECORD_EVENTS" ] && [ $RECO_STATUS -eq 0 ]; then
+    mkdir -p "$(dirname "$RECORD_EVENTS")"
+    cp "${STEM}-events.txt" "$RECORD_EVENTS.part" && mv "$RECORD_EVENTS.part" "$RECORD_EVENTS"
+    echo "=== Copied event list to $RECORD_EVENTS ==="
+fi
 
 # Copy output files from execute node to final destination
 # Create output directory if it doesn't exist
 mkdir -p "$KFALIGN_DIR"
 
+# The profile is kept even for late jobs, it describes the job not the output
+if [ -n "$PROFILE" ] && [ $RECO_STATUS -eq 0 ]; then
+    cp "${STEM}-perfmonmt.json" "$KFALIGN_DIR/kfalignment_${RUN}_${FILE}-perfmon.json"
+    echo "=== Copied profile to $KFALIGN_DIR ==="
+fi
+
 # Copy the kfalignment root file to the final destination
-cp Faser-Physics-*kfalignment.root "$KFALIGN_DIR/kfalignment_${RUN}_${FILE}.root"
-echo "=== Copied output file to $KFALIGN_DIR/kfalignment_${RUN}_${FILE}.root ==="
+# Copy under a temporary name and rename, so millepede never sees a partial file
+# A failed reconstruction stores nothing and fails the job below, so
+# HTCondor retries it (resuming from the checkpoint, if any)
+OUTPUT="$KFALIGN_DIR/kfalignment_${RUN}_${FILE}.root"
+if [ $RECO_STATUS -ne 0 ]; then
+    echo "=== Reconstruction failed with status $RECO_STATUS, no output stored ==="
+elif ! cp "$KFALIGN_FILE" "$OUTPUT.part"; then
+    RECO_STATUS=1
+    echo "=== No kfalignment output $KFALIGN_FILE found ==="
+elif [ -f "$QUORUM_MARKER" ]; then
+    # Late job: millepede is already running without this file
+    rm -f "$OUTPUT.part"
+    echo "=== Quorum reached while running, output dropped ==="
+else
+    mv "$OUTPUT.part" "$OUTPUT"
+    echo "=== Copied output file to $OUTPUT ==="
+    # List of raw files merged into the output, entries carry source_index
+    if [ -n "$INPUTS" ]; then
+        cp "${STEM}-inputs.json" "${OUTPUT%.root}.json"
+    fi
+fi
+
+# The output is stored, the checkpoint of this task is not needed anymore
+if [ -n "$CHECKPOINT" ] && [ $RECO_STATUS -eq 0 ]; then
+    rm -rf "$CHECKPOINT"
+    echo "=== Removed checkpoint $CHECKPOINT ==="
+fi
 
 # Remove xAOD file (not needed)
 rm -f Faser-Physics-*-xAOD.root
@@ -103,4 +368,5 @@ cd /tmp
 rm -rf "$WORK_DIR"
 echo "=== Cleaned up working directory on execute node ==="
 
-echo "=== Finished alignment ==="
\ No newline at end of file
+echo "=== Finished alignment with status $RECO_STATUS ==="
+exit $RECO_STATUS
\ No newline at end of file
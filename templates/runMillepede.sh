@@ -8,20 +8,41 @@ if [ "${TO_NEXT_ITER}" = "True" ]; then
     NEXT_RECO_DIR=$4
     ENV_PEDE=$5
     ENV_ROOT=$6
+    ENV_SNAPSHOT=$7
 else
     # Skip the 4th parameter (empty NEXT_RECO_DIR)
     ENV_PEDE=$4
     ENV_ROOT=$5
+    ENV_SNAPSHOT=$6
 fi
 
 set -e
 
 echo "Setting up environment..."
-export PATH="$ENV_PEDE:$PATH" # millipede2 directory
-source $ENV_ROOT
+# A snapshot captured by dag_manager.py on the same OS replaces the full setup
+if [ -n "$ENV_SNAPSHOT" ] && python3 "$SRC_DIR/EnvSnapshot.py" check "$ENV_SNAPSHOT"; then
+    source "$ENV_SNAPSHOT"
+    echo "Restored environment from snapshot $ENV_SNAPSHOT"
+else
+    export PATH="$ENV_PEDE:$PATH" # millipede2 directory
+    source $ENV_ROOT
+fi
+
+# With a quorum, millepede reads only the outputs listed in the marker: a
+# late reco job may still have moved its output in after the marker was written
+INPUT_DIR=${KFALIGN_DIR}
+if [ -f "${KFALIGN_DIR}/.quorum" ]; then
+    INPUT_DIR="${KFALIGN_DIR%/}_quorum"
+    rm -rf "$INPUT_DIR"
+    mkdir -p "$INPUT_DIR"
+    for NAME in $(python3 -c 'import json, sys; print(" ".join(json.load(open(sys.argv[1]))["files"]))' "${KFALIGN_DIR}/.quorum"); do
+        ln -s "${KFALIGN_DIR}/${NAME}" "${INPUT_DIR}/${NAME}"
+    done
+    echo "Quorum reached, reading the $(ls "$INPUT_DIR" | wc -l) outputs listed in ${KFALIGN_DIR}/.quorum"
+fi
 
 echo "Running Millepede..."
-python3 ${SRC_DIR}/millepede/bin/millepede.py -i ${KFALIGN_DIR}
+python3 ${SRC_DIR}/millepede/bin/millepede.py -i ${INPUT_DIR}
 
 echo "Millepede completed successfully."
 
@@ -0,0 +1,27 @@
+"""Shared fixtures of the test suite."""
+
+import os
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+# The scripts under test live in the repository root, not in a package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Event header of a raw file: marker, tag, trigger bits, version,
+# header size and payload size
+EVENT_HEADER = struct.Struct("<BBHHHI")
+
+
+@pytest.fixture
+def make_raw():
+    """Builder of synthetic raw files, one event per payload size."""
+    def make(path: Path, payload_sizes: list[int]) -> list[bytes]:
+        events = [EVENT_HEADER.pack(0xBB, i % 256, 0, 0, EVENT_HEADER.size, size)
+                  + os.urandom(size)
+                  for i, size in enumerate(payload_sizes)]
+        path.write_bytes(b"".join(events))
+        return events
+    return make
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for the convergence POST script (check_convergence.py).
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPT = Path(__file__).resolve().parent.parent / "check_convergence.py"
+CONVERGED = 42
+
+
+def check(old, new, *tols):
+    args = [sys.executable, str(SCRIPT), "0", str(old), str(new)]
+    for tol in tols:
+        args += ["--tol", tol]
+    return subprocess.run(args, capture_output=True, text=True).returncode
+
+
+def write(path, text):
+    path.write_text(text)
+    return path
+
+
+def test_empty_template_is_not_converged(tmp_path):
+    old = write(tmp_path / "old.txt", "")
+    new = write(tmp_path / "new.txt", '"00": [0.5, 0, 0, 0, 0, 0], "000": [0.01, 0, 0, 0, 0, 0]')
+    assert check(old, new, "layer=1e-3,1e-5", "module=1e-3,1e-5") == 0
+
+
+def test_empty_template_nominal_result_converges(tmp_path):
+    old = write(tmp_path / "old.txt", "")
+    new = write(tmp_path / "new.txt", '"00": [0, 0, 0, 0, 0, 0]')
+    assert check(old, new, "layer=1e-3,1e-5") == CONVERGED
+
+
+def test_within_tolerance_converges(tmp_path):
+    old = write(tmp_path / "old.txt", '"00": [1.0, 0.2, 0, 0.001, 0.06, 0.004]')
+    new = write(tmp_path / "new.txt", '"00": [1.0005, 0.2, 0, 0.001, 0.060001, 0.004]')
+    assert check(old, new, "layer=1e-3,1e-5") == CONVERGED
+
+
+def test_outside_tolerance_continues(tmp_path):
+    old = write(tmp_path / "old.txt", '"00": [1.0, 0.2, 0, 0.001, 0.06, 0.004]')
+    new = write(tmp_path / "new.txt", '"00": [1.01, 0.2, 0, 0.001, 0.06, 0.004]')
+    assert check(old, new, "layer=1e-3,1e-5") == 0
+
+
+def test_unreadable_constants_do_not_fail(tmp_path):
+    old = write(tmp_path / "old.txt", '"00": [1.0')
+    new = write(tmp_path / "new.txt", '"00": [1.0, 0, 0, 0, 0, 0]')
+    assert check(old, new, "layer=1e-3,1e-5") == 0
+    assert check(tmp_path / "missing.txt", new, "layer=1e-3,1e-5") == 0
+
+
+def test_failed_job_is_propagated(tmp_path):
+    old = write(tmp_path / "old.txt", "")
+    args = [sys.executable, str(SCRIPT), "3", str(old), str(old), "--tol", "layer=1,1"]
+    assert subprocess.run(args, capture_output=True).returncode == 3
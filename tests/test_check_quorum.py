@@ -0,0 +1,61 @@
+"""Tests for the quorum PRE script (check_quorum.py)."""
+
+import json
+import os
+import sys
+
+import check_quorum
+
+DEFER = 75
+
+
+def run(monkeypatch, kfalign_dir, required, total, *options):
+    monkeypatch.setattr(sys, "argv", ["check_quorum.py", str(kfalign_dir), str(required),
+                                      str(total), "--defer-code", str(DEFER), *options])
+    return check_quorum.main()
+
+
+def make_outputs(kfalign_dir, labels):
+    for label in labels:
+        (kfalign_dir / f"kfalignment_008294_{label}.root").write_text("root")
+
+
+def test_below_quorum_defers(tmp_path, monkeypatch):
+    make_outputs(tmp_path, ["00100"])
+    assert run(monkeypatch, tmp_path, 2, 3) == DEFER
+    assert (tmp_path / check_quorum.WAIT_STAMP).is_file()
+    assert not (tmp_path / check_quorum.MARKER).exists()
+
+
+def test_quorum_writes_marker(tmp_path, monkeypatch):
+    make_outputs(tmp_path, ["00101", "00100"])
+    # Other files in the directory do not count
+    (tmp_path / "kfalignment_008294_00102.json").write_text("{}")
+    assert run(monkeypatch, tmp_path, 2, 3) == 0
+    marker = json.loads((tmp_path / check_quorum.MARKER).read_text())
+    assert marker["files"] == ["kfalignment_008294_00100.root",
+                               "kfalignment_008294_00101.root"]
+    assert marker["total"] == 3
+
+
+def test_marker_is_final(tmp_path, monkeypatch):
+    make_outputs(tmp_path, ["00100", "00101"])
+    assert run(monkeypatch, tmp_path, 2, 3) == 0
+    make_outputs(tmp_path, ["00102"])
+    assert run(monkeypatch, tmp_path, 2, 3) == 0
+    marker = json.loads((tmp_path / check_quorum.MARKER).read_text())
+    assert len(marker["files"]) == 2
+
+
+def test_outputs_set_aside_do_not_count(tmp_path, monkeypatch):
+    stale = tmp_path / "stale_20260101-000000"
+    stale.mkdir()
+    make_outputs(stale, ["00100", "00101"])
+    assert run(monkeypatch, tmp_path, 2, 3) == DEFER
+
+
+def test_timeout_fails(tmp_path, monkeypatch):
+    stamp = tmp_path / check_quorum.WAIT_STAMP
+    stamp.touch()
+    os.utime(stamp, (0, 0))
+    assert run(monkeypatch, tmp_path, 2, 3, "--timeout", "60") == 1
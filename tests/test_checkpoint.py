@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for checkpointed reco jobs (Checkpoint.py).
+
+A small Python script stands in for faser_reco_alignment.py and writes one
+line per chunk; a shell script on PATH stands in for ROOT's hadd.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+import Checkpoint
+
+FAKE_RECO = """\
+import os, sys
+args = sys.argv
+skip, n = int(args[args.index('--skip') + 1]), int(args[args.index('--nevents') + 1])
+crash = os.environ.get('CRASH_AT')
+if crash is not None and skip >= int(crash):
+    sys.exit(3)
+with open('calls.txt', 'a') as f:
+    f.write(f"{skip} {n}\\n")
+with open('Faser-Physics-008294-00101-kfalignment.root', 'w') as f:
+    f.write(f"root {skip} {n}\\n")
+with open('Faser-Physics-008294-00101-events.txt', 'w') as f:
+    f.write(f"# events\\n8294 {skip}\\n")
+"""
+
+FAKE_HADD = """\
+#!/bin/sh
+shift
+OUT=$1
+shift
+cat "$@" > "$OUT"
+"""
+
+
+def test_chunks_full_file():
+    assert Checkpoint.chunks(0, -1, 25, 10) == [(0, 10), (10, 10), (20, 5)]
+
+
+def test_chunks_range_inside_file():
+    assert Checkpoint.chunks(5, 12, 100, 10) == [(5, 10), (15, 2)]
+
+
+def test_chunks_range_past_end():
+    assert Checkpoint.chunks(20, 50, 25, 10) == [(20, 5)]
+
+
+def test_chunks_empty_range_runs_once():
+    assert Checkpoint.chunks(30, -1, 25, 10) == [(30, -1)]
+
+
+class Job:
+    """A checkpointed job over one raw file of 25 events, in chunks of 10."""
+
+    def __init__(self, base: Path, make_raw):
+        self.work = base / "work"
+        self.work.mkdir()
+        self.ckpt = base / "checkpoint"
+        self.raw = base / "Faser-Physics-008294-00101.raw"
+        make_raw(self.raw, [8] * 25)
+        reco = base / "fake_reco.py"
+        reco.write_text(FAKE_RECO)
+        self.command = [sys.executable, str(reco)]
+
+    def run(self, skip=0):
+        return Checkpoint.run(self.ckpt, self.command, [self.raw], [], skip, -1, 10,
+                              self.work)
+
+    def calls(self):
+        return (self.work / "calls.txt").read_text().split("\n")[:-1]
+
+
+@pytest.fixture
+def job(tmp_path, make_raw, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    hadd = bin_dir / "hadd"
+    hadd.write_text(FAKE_HADD)
+    hadd.chmod(0o755)
+    monkeypatch.setenv("PATH", str(bin_dir), prepend=os.pathsep)
+    monkeypatch.delenv("CRASH_AT", raising=False)
+    return Job(tmp_path, make_raw)
+
+
+def test_resume_after_crash(job, monkeypatch):
+    monkeypatch.setenv("CRASH_AT", "20")
+    assert job.run() == 3
+    state = Checkpoint.read_state(job.ckpt)
+    assert len(state["done"]) == 2
+    assert state["done"][-1]["last_event"] == 19
+
+    monkeypatch.delenv("CRASH_AT")
+    assert job.run() == 0
+    # The retry only ran the chunk that crashed
+    assert job.calls() == ["0 10", "10 10", "20 5"]
+
+
+def test_merge(job):
+    assert job.run() == 0
+    merged = (job.work / "Faser-Physics-008294-00101-kfalignment.root").read_text()
+    assert merged == "root 0 10\nroot 10 10\nroot 20 5\n"
+    events = (job.work / "Faser-Physics-008294-00101-events.txt").read_text()
+    assert events.count("# events") == 3
+    assert "8294 20\n" in events
+
+
+def test_other_range_starts_over(job, monkeypatch):
+    monkeypatch.setenv("CRASH_AT", "10")
+    job.run()
+    monkeypatch.delenv("CRASH_AT")
+    assert job.run(skip=5) == 0
+    assert job.calls() == ["0 10", "5 10", "15 10"]
+    assert len(list(job.ckpt.glob("part-000-*"))) == 2
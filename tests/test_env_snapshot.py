@@ -0,0 +1,73 @@
+"""Tests for environment snapshots of the job setups (EnvSnapshot.py)."""
+
+import subprocess
+
+import pytest
+
+import EnvSnapshot
+
+SETUP = "export ALIGN_TEST_RELEASE=24.0.41\nexport PATH=\"/opt/align-test/bin:$PATH\""
+VERIFY = '[ -n "$ALIGN_TEST_RELEASE" ]'
+
+
+def source(path, command):
+    """Output of command in a bash that sourced the snapshot."""
+    return subprocess.run(["bash", "-c", f"source {path}\n{command}"], check=True,
+                          stdout=subprocess.PIPE, text=True).stdout.strip()
+
+
+def test_capture_restores_environment(tmp_path):
+    path = tmp_path / "env" / "calypso.env"
+    EnvSnapshot.capture(SETUP, path, VERIFY)
+    assert source(path, "echo $ALIGN_TEST_RELEASE") == "24.0.41"
+    assert source(path, "echo $PATH").startswith("/opt/align-test/bin:")
+    header = EnvSnapshot.read_header(path)
+    assert header["os"] == EnvSnapshot.os_tag()
+
+
+def test_capture_unsets_removed_variables(tmp_path, monkeypatch):
+    monkeypatch.setenv("ALIGN_TEST_OLD", "1")
+    path = tmp_path / "calypso.env"
+    EnvSnapshot.capture("unset ALIGN_TEST_OLD", path)
+    assert "unset ALIGN_TEST_OLD\n" in path.read_text()
+
+
+@pytest.mark.parametrize("setup", [
+    # A failing command before the last one
+    f"false\n{SETUP}",
+    f"export ALIGN_TEST_RELEASE=24.0.41\nsource /nonexistent/atlasLocalSetup.sh\nexport B=1",
+])
+def test_failing_setup_line_writes_nothing(tmp_path, setup):
+    path = tmp_path / "calypso.env"
+    with pytest.raises(subprocess.CalledProcessError):
+        EnvSnapshot.capture(setup, path, VERIFY)
+    assert not path.exists()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failing_verify_writes_nothing(tmp_path):
+    # The setup exits 0 without setting up a release
+    path = tmp_path / "calypso.env"
+    with pytest.raises(subprocess.CalledProcessError):
+        EnvSnapshot.capture("export ATLAS_LOCAL_ROOT_BASE=/cvmfs", path,
+                            '[ -n "$AtlasVersion" ] && command -v athena.py')
+    assert not path.exists()
+
+
+def test_usable(tmp_path):
+    path = tmp_path / "calypso.env"
+    assert not EnvSnapshot.usable(path)
+    EnvSnapshot.capture(SETUP, path, VERIFY)
+    assert EnvSnapshot.usable(path)
+    assert EnvSnapshot.usable(path, SETUP, VERIFY)
+    # Another setup or check needs a new snapshot
+    assert not EnvSnapshot.usable(path, SETUP)
+    assert not EnvSnapshot.usable(path, f"{SETUP}\nexport B=1", VERIFY)
+
+
+def test_usable_other_os(tmp_path):
+    path = tmp_path / "calypso.env"
+    EnvSnapshot.capture(SETUP, path, VERIFY)
+    text = path.read_text().replace(EnvSnapshot.os_tag(), "otheros1-x86_64")
+    path.write_text(text)
+    assert not EnvSnapshot.usable(path, SETUP, VERIFY)
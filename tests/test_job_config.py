@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests for the stored job configuration (JobConfig.py).
+
+A small tree of mock configurables stands in for the ComponentAccumulator:
+services, an event algorithm with private tools, with job values spread
+over their properties and other properties that merely look like them.
+"""
+
+from pathlib import Path
+
+import pytest
+
+import JobConfig
+
+
+class Comp:
+    """Mock configurable: properties kept in _properties like Gaudi's."""
+
+    def __init__(self, name, **props):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_properties", dict(props))
+
+    def __getattr__(self, key):
+        try:
+            return self.__dict__["_properties"][key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def __setattr__(self, key, value):
+        self._properties[key] = value
+
+
+class Acc:
+    """Mock ComponentAccumulator."""
+
+    def __init__(self, services, tools, algs, cond_algs):
+        self.services, self.tools, self.algs, self.cond_algs = services, tools, algs, cond_algs
+
+    def getServices(self):
+        return self.services
+
+    def getPublicTools(self):
+        return self.tools
+
+    def getEventAlgos(self):
+        return self.algs
+
+    def getCondAlgos(self):
+        return self.cond_algs
+
+    def getService(self, name):
+        return next(s for s in self.services if s._name == name)
+
+
+STEM = "Faser-Physics-008294-00101-00104"
+INPUTS = ["/eos/Faser-Physics-008294-00101.raw", "/eos/Faser-Physics-008294-00104.raw"]
+
+
+def make_acc(workdir: str) -> Acc:
+    event_list = f"{workdir}/{STEM}-events.txt"
+    writer = Comp("Writer", FilePath=f"{STEM}_3station_backward_kfalignment.root",
+                  # Shares the file stem as a prefix but is not derived from it
+                  Label=f"{STEM}0_other", Level=3)
+    ckf = Comp("CKF_Back", actsOutputTag=f"{STEM}_3station_backward",
+               Tools=[writer, Comp("Fitter", Steps=[1, 2])],
+               Extrapolator=Comp("Extrapolator", Output=f"{workdir}/{STEM}.log"))
+    selector = Comp("EventSelector", Input=list(INPUTS), SkipEvents=0)
+    return Acc(services=[selector, Comp("MessageSvc", Format="%s")],
+               tools=[Comp("Public", Files=list(INPUTS[:1]))],
+               algs=[ckf, Comp("EventListFilter", EventList=event_list)],
+               cond_algs=[])
+
+
+class Stored:
+    """A configuration stored from the stored/ directory, loaded in job/."""
+
+    def __init__(self, base: Path, monkeypatch):
+        self.monkeypatch = monkeypatch
+        self.job_dir = base / "job"
+        self.job_dir.mkdir()
+        self.pkl = base / "configs" / "key.pkl"
+        stored_dir = base / "stored"
+        stored_dir.mkdir()
+        monkeypatch.chdir(stored_dir)
+        acc = make_acc(str(stored_dir))
+        JobConfig.store_config(acc, self.pkl, INPUTS, STEM, acc.algs[1].EventList)
+
+    def load(self, inputs, stem, skip=0):
+        self.monkeypatch.chdir(self.job_dir)
+        return JobConfig.load_config(self.pkl, inputs, stem, skip,
+                                     f"{self.job_dir}/{stem}-events.txt")
+
+
+@pytest.fixture
+def stored(tmp_path, monkeypatch):
+    return Stored(tmp_path, monkeypatch)
+
+
+def test_round_trip_patches_job_properties(stored):
+    inputs = ["/eos/Faser-Physics-008294-00105.raw", "/eos/Faser-Physics-008294-00108.raw"]
+    stem = "Faser-Physics-008294-00105-00108"
+    acc = stored.load(inputs, stem, skip=200)
+    ckf = acc.algs[0]
+    assert ckf.actsOutputTag == f"{stem}_3station_backward"
+    assert ckf.Tools[0].FilePath == f"{stem}_3station_backward_kfalignment.root"
+    assert ckf.Extrapolator.Output == f"{stored.job_dir}/{stem}.log"
+    assert acc.algs[1].EventList == f"{stored.job_dir}/{stem}-events.txt"
+    selector = acc.getService("EventSelector")
+    assert selector.Input == inputs
+    assert selector.SkipEvents == 200
+
+
+def test_other_properties_untouched(stored):
+    acc = stored.load(["/eos/a.raw", "/eos/b.raw"], "Faser-Physics-008294-00105-00108")
+    ckf = acc.algs[0]
+    assert ckf.Tools[0].Label == f"{STEM}0_other"
+    assert ckf.Tools[0].Level == 3
+    assert ckf.Tools[1].Steps == [1, 2]
+    assert acc.getService("MessageSvc").Format == "%s"
+    # A list that is not the input list keeps its value
+    assert acc.tools[0].Files == INPUTS[:1]
+
+
+def test_stem_prefix_of_new_stem(stored):
+    # The new stem extends the stored one: patching must not apply twice
+    stem = f"{STEM}-reco"
+    acc = stored.load(INPUTS, stem)
+    assert acc.algs[0].actsOutputTag == f"{stem}_3station_backward"
+    assert acc.algs[0].Tools[0].Label == f"{STEM}0_other"
+
+
+def test_missing_file(tmp_path):
+    assert JobConfig.load_config(tmp_path / "none.pkl", INPUTS, STEM, 0, "") is None
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for the size-aware reco job planner (Planner.py).
+
+Raw files are sparse files of the wanted size in a temporary directory;
+the cost model charges one second per MB on top of a 10 s startup, with a
+100 s target per job.
+"""
+
+from dataclasses import replace
+
+import pytest
+
+from CompiledConfig import PlanPolicy, RecoTask
+from Planner import Planner
+
+MB = 1000 ** 2
+
+
+@pytest.fixture
+def planner(tmp_path) -> Planner:
+    policy = PlanPolicy(
+        target=100.0, startup=10.0, seconds_per_mb=1.0,
+        bytes_per_event=10000.0, seconds_per_event=None, slots=4,
+        path=f"{tmp_path}/{{year}}/{{run}}/Faser-Physics-{{run}}-{{file}}.raw")
+    return Planner(policy, max_workers=4)
+
+
+def make_files(planner: Planner, sizes_mb: dict[str, float]) -> tuple[str, ...]:
+    """Create raw files of the given sizes, return their numbers."""
+    for file_str, size in sizes_mb.items():
+        path = planner.raw_path("2022", "008294", file_str)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.truncate(int(size * MB))
+    return tuple(sizes_mb)
+
+
+def test_packing_stays_under_target(planner):
+    files = make_files(planner, {"00100": 30, "00101": 30, "00102": 30,
+                                 "00103": 30, "00104": 5})
+    plan = planner.plan("2022", "008294", files)
+    assert list(plan.tasks) == ["00100-00102", "00103-00104"]
+    assert plan.tasks["00100-00102"] == RecoTask("00100-00102", ("00100", "00101", "00102"))
+    assert plan.costs["00100-00102"] == 100.0
+    assert plan.costs["00103-00104"] == 45.0
+    for cost in plan.costs.values():
+        assert cost <= planner.policy.target
+
+
+def test_single_small_file_keeps_its_label(planner):
+    files = make_files(planner, {"00100": 50, "00101": 60})
+    plan = planner.plan("2022", "008294", files)
+    assert list(plan.tasks) == ["00100", "00101"]
+    assert plan.tasks["00101"].files == ("00101",)
+
+
+def test_large_file_split_into_shards(planner):
+    # 250 s of work at 90 s per shard: 3 shards of 25000 events
+    files = make_files(planner, {"00100": 20, "00101": 250, "00102": 20})
+    plan = planner.plan("2022", "008294", files)
+    assert list(plan.tasks) == ["00100", "00101_s0", "00101_s1", "00101_s2", "00102"]
+    shards = [plan.tasks[f"00101_s{i}"] for i in range(3)]
+    assert [t.skip for t in shards] == [0, 8334, 16668]
+    assert [t.nevents for t in shards] == [8334, 8334, -1]
+    for task in shards:
+        assert task.files == ("00101",)
+        assert plan.costs[task.label] == pytest.approx(10.0 + 250.0 / 3)
+
+
+def test_split_uses_event_counts(planner):
+    planner.policy = replace(planner.policy, seconds_per_event=0.01)
+    files = make_files(planner, {"00100": 1})
+    plan = planner.plan("2022", "008294", files, {"00100": 20000})
+    assert len(plan.tasks) == 3
+    assert [t.skip for t in plan.tasks.values()] == [0, 6667, 13334]
+    assert plan.tasks["00100_s2"].nevents == -1
+
+
+def test_missing_file_at_median_cost(planner):
+    files = make_files(planner, {"00100": 20, "00102": 40, "00103": 60})
+    files = (files[0], "00101", *files[1:])
+    plan = planner.plan("2022", "008294", files)
+    assert plan.missing == ["00101"]
+    assert plan.sizes["00101"] is None
+    # A missing file keeps a job of its own, between the neighbouring groups
+    assert list(plan.tasks) == ["00100", "00101", "00102", "00103"]
+    assert plan.costs["00101"] == 10.0 + 40.0
+
+
+def test_all_files_missing(planner):
+    plan = planner.plan("2022", "008294", ("00100", "00101"))
+    assert plan.missing == ["00100", "00101"]
+    assert plan.costs == {"00100": 100.0, "00101": 100.0}
+
+
+def test_makespan(planner):
+    files = make_files(planner, {"00100": 80, "00101": 80, "00102": 80})
+    plan = planner.plan("2022", "008294", files)
+    assert plan.makespan(2) == 180.0
+    assert plan.makespan(8) == 90.0
@@ -0,0 +1,145 @@
+"""
+Tests for the node-local raw file cache (RawCache.py).
+
+A plain temporary directory stands in for EOS.
+"""
+
+import fcntl
+import os
+import threading
+
+import pytest
+
+from RawCache import RawCache, adler32
+
+
+@pytest.fixture
+def eos(tmp_path):
+    path = tmp_path / "eos"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return tmp_path / "cache"
+
+
+def make_source(eos, name, size):
+    path = eos / name
+    path.write_bytes(os.urandom(size))
+    return path
+
+
+def hold_use(local):
+    """Shared lock of a job reading a cached copy, as runAlignment.sh takes it."""
+    f = open(f"{local.parent}.use", 'a')
+    fcntl.flock(f, fcntl.LOCK_SH)
+    return f
+
+
+def test_miss_then_hit(eos, cache_dir):
+    src = make_source(eos, "Faser-Physics-008294-00101.raw", 1000)
+    cache = RawCache(cache_dir, 10_000)
+    local = cache.fetch(src)
+    assert local != src
+    assert local.name == src.name
+    assert local.read_bytes() == src.read_bytes()
+    # A hit returns the same copy without filling again
+    mtime = local.stat().st_mtime_ns
+    assert cache.fetch(src) == local
+    assert local.stat().st_mtime_ns == mtime
+
+
+def test_changed_source_refills(eos, cache_dir):
+    src = make_source(eos, "Faser-Physics-008294-00101.raw", 1000)
+    cache = RawCache(cache_dir, 10_000)
+    cache.fetch(src)
+    src.write_bytes(os.urandom(1200))
+    assert cache.fetch(src).read_bytes() == src.read_bytes()
+
+
+def test_changed_source_in_use_reads_source(eos, cache_dir):
+    src = make_source(eos, "Faser-Physics-008294-00101.raw", 1000)
+    cache = RawCache(cache_dir, 10_000)
+    local = cache.fetch(src)
+    old = local.read_bytes()
+    src.write_bytes(os.urandom(1200))
+    with hold_use(local):
+        assert cache.fetch(src) == src
+        assert local.read_bytes() == old
+
+
+def test_checksum_detects_corrupt_copy(eos, cache_dir):
+    src = make_source(eos, "Faser-Physics-008294-00101.raw", 1000)
+    cache = RawCache(cache_dir, 10_000, checksum=True)
+    local = cache.fetch(src)
+    # Same size, different content: only the checksum notices
+    stat = local.stat()
+    local.write_bytes(bytes(1000))
+    os.utime(local, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.fetch(src).read_bytes() == src.read_bytes()
+    assert adler32(local) == adler32(src)
+
+
+def make_lru(eos, cache_dir):
+    """Cache holding two copies, the second the least recently used."""
+    files = [make_source(eos, f"Faser-Physics-008294-0010{i}.raw", 400) for i in range(3)]
+    cache = RawCache(cache_dir, 1000)
+    first = cache.fetch(files[0])
+    second = cache.fetch(files[1])
+    meta = cache_dir / f"{second.parent.name}.json"
+    old = meta.stat().st_mtime - 10
+    os.utime(meta, (old, old))
+    return cache, files, first, second
+
+
+def test_lru_eviction(eos, cache_dir):
+    cache, files, first, second = make_lru(eos, cache_dir)
+    cache.fetch(files[2])
+    assert first.exists()
+    assert not second.exists()
+    assert sum(e[1] for e in cache.entries()) <= 1000
+
+
+def test_eviction_skips_copies_in_use(eos, cache_dir):
+    cache, files, first, second = make_lru(eos, cache_dir)
+    with hold_use(second):
+        third = cache.fetch(files[2])
+    # The next least recently used copy goes instead
+    assert second.exists()
+    assert not first.exists()
+    assert third != files[2]
+
+
+def test_no_space_while_all_in_use(eos, cache_dir):
+    cache, files, first, second = make_lru(eos, cache_dir)
+    with hold_use(first), hold_use(second):
+        assert cache.fetch(files[2]) == files[2]
+    assert first.exists() and second.exists()
+
+
+def test_too_large_reads_source(eos, cache_dir):
+    src = make_source(eos, "Faser-Physics-008294-00101.raw", 2000)
+    assert RawCache(cache_dir, 1000).fetch(src) == src
+
+
+def test_missing_source_falls_back(eos, cache_dir):
+    src = eos / "Faser-Physics-008294-00999.raw"
+    assert RawCache(cache_dir, 1000).fetch(src) == src
+
+
+def test_concurrent_fetch_fills_once(eos, cache_dir):
+    src = make_source(eos, "Faser-Physics-008294-00101.raw", 100_000)
+    cache = RawCache(cache_dir, 1_000_000)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.fetch(src)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == 1
+    assert results[0].read_bytes() == src.read_bytes()
+    assert len(cache.entries()) == 1
+    assert list(cache_dir.rglob("*.part")) == []
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the event offset index of raw files (RawIndex.py).
+
+Synthetic raw files hold events of a bare header and a random payload.
+"""
+
+from pathlib import Path
+
+import pytest
+
+import RawIndex
+
+PAYLOAD_SIZES = [10, 200, 0, 35, 4096, 7, 64, 1, 300, 12]
+
+
+@pytest.fixture
+def raw(tmp_path, make_raw) -> tuple[Path, list[bytes]]:
+    """A raw file of ten events and the bytes of every event."""
+    path = tmp_path / "Faser-Physics-008294-00101.raw"
+    return path, make_raw(path, PAYLOAD_SIZES)
+
+
+def test_scan(raw):
+    path, events = raw
+    index = RawIndex.scan(path)
+    assert index.count == 10
+    assert list(index.sizes) == [len(e) for e in events]
+    assert index.source_size == path.stat().st_size
+    assert index.offsets()[-1] == index.source_size
+
+
+def test_scan_ignores_truncated_event(raw, tmp_path, make_raw):
+    path, _ = raw
+    extra = make_raw(tmp_path / "extra.raw", [100])[0]
+    with open(path, 'ab') as f:
+        f.write(extra[:-90])
+    assert RawIndex.scan(path).count == 10
+
+
+def test_scan_rejects_bad_marker(tmp_path):
+    path = tmp_path / "bad.raw"
+    path.write_bytes(bytes(64))
+    with pytest.raises(ValueError):
+        RawIndex.scan(path)
+
+
+def test_write_read(raw, tmp_path, make_raw):
+    path, _ = raw
+    index_path = tmp_path / "index" / "Faser-Physics-008294-00101.idx"
+    index_path.parent.mkdir()
+    index = RawIndex.scan(path)
+    RawIndex.write(index, index_path)
+    assert RawIndex.read(index_path) == index
+    assert RawIndex.load(index_path, path) == index
+    # Stale once the raw file changes size
+    make_raw(path, [1, 2])
+    assert RawIndex.load(index_path, path) is None
+
+
+def test_read_rejects_truncated_index(raw, tmp_path):
+    path, _ = raw
+    index_path = tmp_path / "bad.idx"
+    RawIndex.write(RawIndex.scan(path), index_path)
+    index_path.write_bytes(index_path.read_bytes()[:-2])
+    with pytest.raises(ValueError):
+        RawIndex.read(index_path)
+    assert RawIndex.load(index_path) is None
+
+
+def test_slice_events(raw, tmp_path):
+    path, events = raw
+    index = RawIndex.scan(path)
+    out = tmp_path / "slice" / path.name
+    assert RawIndex.slice_events(index, path, 3, 4, out) == 4
+    assert out.read_bytes() == b"".join(events[3:7])
+    # The slice is a valid raw file of its own
+    assert RawIndex.scan(out).count == 4
+
+
+def test_slice_to_end(raw, tmp_path):
+    path, events = raw
+    index = RawIndex.scan(path)
+    out = tmp_path / "tail.raw"
+    assert RawIndex.slice_events(index, path, 8, -1, out) == 2
+    assert out.read_bytes() == b"".join(events[8:])
+
+
+def test_slice_empty_range(raw, tmp_path):
+    path, _ = raw
+    index = RawIndex.scan(path)
+    with pytest.raises(ValueError):
+        RawIndex.slice_events(index, path, 10, 5, tmp_path / "empty.raw")
+
+
+def test_build_all(raw, tmp_path):
+    path, _ = raw
+    raws = {"00101": path, "00102": tmp_path / "missing.raw"}
+    indexes = {label: tmp_path / "index" / f"{label}.idx" for label in raws}
+    assert RawIndex.build_all(raws, indexes) == {"00101": 10}
+    assert indexes["00101"].is_file()
+    assert not indexes["00102"].exists()
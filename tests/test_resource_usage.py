@@ -0,0 +1,105 @@
+"""Tests for measured resource usage from HTCondor user logs (ResourceUsage.py)."""
+
+import pytest
+
+from ResourceUsage import (Requests, Usage, collect, format_size, parse_user_log,
+                           percentile, recommend)
+
+TERMINATED = """\
+005 (123.000.000) 2026-10-01 12:00:00 Job terminated.
+	(1) Normal termination (return value 0)
+	Partitionable Resources :    Usage  Request Allocated
+	   Cpus                 :     {cpus}        2         2
+	   Disk (KB)            :   {disk}  8388608   8400000
+	   Memory (MB)          :     {memory}     4096      4096
+...
+"""
+SUBMITTED = """\
+000 (123.000.000) 2026-10-01 11:00:00 Job submitted from host: <127.0.0.1>
+...
+"""
+DEFAULT = Requests(cpus=2, memory_mb=4096, disk_kb=8 * 1024 ** 2)
+
+
+def write_log(path, *events):
+    path.write_text("".join(events))
+    return path
+
+
+def test_parse_terminated_events(tmp_path):
+    log = write_log(tmp_path / "reco.log", SUBMITTED,
+                    TERMINATED.format(cpus="0.98", disk="812345", memory="2311"),
+                    TERMINATED.format(cpus="1.50", disk="900000", memory="3000"))
+    assert parse_user_log(log) == [Usage(cpus=0.98, memory_mb=2311.0, disk_kb=812345.0),
+                                   Usage(cpus=1.5, memory_mb=3000.0, disk_kb=900000.0)]
+
+
+def test_parse_empty_usage_column(tmp_path):
+    # A job evicted before its first update has no usage yet
+    log = write_log(tmp_path / "reco.log",
+                    TERMINATED.format(cpus="", disk="", memory="2311"),
+                    TERMINATED.format(cpus="", disk="", memory=""))
+    assert parse_user_log(log) == [Usage(cpus=None, memory_mb=2311.0, disk_kb=None)]
+
+
+def test_parse_unreadable_log(tmp_path):
+    assert parse_user_log(tmp_path / "missing.log") == []
+
+
+def test_collect(tmp_path):
+    logs = [write_log(tmp_path / f"reco_{i}.log",
+                      TERMINATED.format(cpus="1", disk="1000", memory=str(1000 * i)))
+            for i in (1, 2)]
+    assert [u.memory_mb for u in collect([*logs, tmp_path / "missing.log"])] == [1000, 2000]
+
+
+def test_percentile():
+    assert percentile([5.0], 90) == 5.0
+    assert percentile([4.0, 1.0, 3.0, 2.0], 0) == 1.0
+    assert percentile([4.0, 1.0, 3.0, 2.0], 100) == 4.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == pytest.approx(2.5)
+    assert percentile([0.0, 10.0], 95) == pytest.approx(9.5)
+
+
+@pytest.mark.parametrize("kb, text", [
+    (8 * 1024 ** 2, "8 GB"),
+    (2304 * 1024, "2304 MB"),
+    (1536, "1536 KB"),
+    (1024, "1 MB"),
+])
+def test_format_size(kb, text):
+    assert format_size(kb) == text
+
+
+def test_template_fields():
+    assert DEFAULT.template_fields() == {"request_cpus": "2", "request_memory": "4 GB",
+                                         "request_disk": "8 GB"}
+
+
+def test_recommend_rounds_to_units():
+    usages = [Usage(cpus=1.2, memory_mb=1000.0, disk_kb=500000.0)] * 5
+    requests, used = recommend(usages, DEFAULT, q=95, headroom=0.2, min_samples=5)
+    assert used == 5
+    # CPUs without headroom, rounded up to whole cores
+    assert requests.cpus == 2
+    # 1200 MB rounded up to 128 MB, 600000 KB rounded up to 1024 KB
+    assert requests.memory_mb == 1280
+    assert requests.disk_kb == 600064
+
+
+def test_recommend_keeps_default_below_min_samples():
+    usages = [Usage(cpus=1.0, memory_mb=1000.0, disk_kb=None)] * 5 + \
+             [Usage(cpus=None, memory_mb=None, disk_kb=500000.0)] * 2
+    requests, used = recommend(usages, DEFAULT, q=95, headroom=0.0, min_samples=5)
+    assert used == 7
+    assert requests == Requests(cpus=1, memory_mb=1024, disk_kb=DEFAULT.disk_kb)
+
+
+def test_recommend_without_usage():
+    assert recommend([], DEFAULT, q=95, headroom=0.2, min_samples=1) == (DEFAULT, 0)
+
+
+def test_recommend_never_below_one_unit():
+    usages = [Usage(cpus=0.0, memory_mb=0.0, disk_kb=0.0)]
+    requests, _ = recommend(usages, DEFAULT, q=95, headroom=0.2, min_samples=1)
+    assert requests == Requests(cpus=1, memory_mb=128, disk_kb=1024)